@@ -0,0 +1,73 @@
+import json
+from typing import Any, Dict, Type, TypeVar
+
+from pydantic import BaseModel
+
+Model = TypeVar("Model", bound=BaseModel)
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json_object(text: str) -> Dict[str, Any]:
+    """First complete JSON object in a model reply.
+
+    Handles a bare object, a ```json fenced block or an object surrounded by prose. Unlike
+    a greedy regex this stops at the object's closing brace, so trailing text with braces
+    in it does not corrupt the match.
+    """
+    start = text.find('{')
+    while start != -1:
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            start = text.find('{', start + 1)
+            continue
+        if isinstance(value, dict):
+            return value
+        start = text.find('{', start + 1)
+    raise ValueError("No JSON object found in response")
+
+
+def parse_structured(text: str, model: Type[Model]) -> Model:
+    """Parse a model reply into `model`; raises ValueError (incl. ValidationError) when it does not fit"""
+    return model.model_validate(extract_json_object(text))
+
+
+def build_repair_prompt(reply: str, error: Exception, max_reply_chars: int = 4000) -> str:
+    """Follow-up message asking the model to fix a reply that failed validation"""
+    return (
+        "Your previous reply could not be used because it did not match the required JSON schema.\n"
+        f"Validation error: {str(error)[:1000]}\n"
+        f"Previous reply:\n{reply[:max_reply_chars]}\n"
+        "Reply again with only the corrected JSON object, no other text."
+    )
+
+
+class StructuredOutputStats:
+    """How often model replies validate first time, after one repair, or not at all"""
+
+    def __init__(self):
+        self.responses = 0
+        self.first_try = 0
+        self.repaired = 0
+        self.failed = 0
+
+    def record(self, attempts: int, parsed: bool) -> None:
+        self.responses += 1
+        if not parsed:
+            self.failed += 1
+        elif attempts == 1:
+            self.first_try += 1
+        else:
+            self.repaired += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "responses": self.responses,
+            "first_try": self.first_try,
+            "repaired": self.repaired,
+            "failed": self.failed,
+            # Replies that needed a repair call, and replies that were unusable even after it
+            "parse_failure_rate": round((self.responses - self.first_try) / self.responses, 4) if self.responses else 0.0,
+            "final_failure_rate": round(self.failed / self.responses, 4) if self.responses else 0.0,
+        }
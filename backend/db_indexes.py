@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Every collection is looked up by its application-level `id`; the compound indexes
+# back the filtered/sorted list views and their (sort field, id) keyset pagination.
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "quotes": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ],
+    "quote_requests": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ],
+    "saved_projects": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Draft saves find a draft's project by its quote
+        IndexModel([("quote_id", ASCENDING)], name="quote_id"),
+        IndexModel([("category", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)], name="category_updated_at"),
+        IndexModel([("updated_at", DESCENDING), ("id", DESCENDING)], name="updated_at_id"),
+    ],
+    "cost_adjustments": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("quote_id", ASCENDING), ("created_at", ASCENDING)], name="quote_id_created_at"),
+        # Watermark scan of the pricing correction learner
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+    ],
+    "quote_revisions": [
+        # One event per revision number: the unique key is what makes compare-and-set work
+        IndexModel([("quote_id", ASCENDING), ("revision", ASCENDING)], unique=True, name="quote_id_revision_unique"),
+    ],
+    "quote_jobs": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Workers claim queued or lease-expired jobs, oldest first
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+    ],
+    "idempotency_keys": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    "suppliers": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Nearest-supplier search: $geoNear on location, filtered by component inside the index
+        IndexModel([("location", GEOSPHERE), ("components", ASCENDING)], name="location_2dsphere_components"),
+    ],
+}
+
+
+class IndexManager:
+    """Builds the indexes in INDEX_SPECS and tracks whether the database is ready to serve.
+
+    A failed build (for example duplicate ids blocking a unique index) is retried with
+    backoff; the error is reported through status() until it succeeds.
+    """
+
+    def __init__(self, db, specs: Dict[str, List[IndexModel]] = INDEX_SPECS, max_backoff: float = 60):
+        self.db = db
+        self.specs = specs
+        self.max_backoff = max_backoff
+        self.state = "pending"
+        self.collections: Dict[str, Dict[str, Any]] = {
+            name: {"status": "pending", "indexes": [index.document["name"] for index in indexes]}
+            for name, indexes in specs.items()
+        }
+        self.attempts = 0
+        self.started_at = None
+        self.completed_at = None
+        self.build_seconds = None
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._build_until_ready())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def _build_until_ready(self) -> None:
+        backoff = 1.0
+        while not self.ready:
+            await self.build()
+            if not self.ready:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def build(self) -> None:
+        self.attempts += 1
+        self.state = "building"
+        self.started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+
+        failed = False
+        for name, indexes in self.specs.items():
+            if self.collections[name]["status"] == "ready":
+                continue
+            self.collections[name]["status"] = "building"
+            try:
+                await self.db[name].create_indexes(indexes)
+                self.collections[name].update({"status": "ready", "error": None})
+            except Exception as e:
+                failed = True
+                self.collections[name].update({"status": "failed", "error": str(e)})
+                logger.error(f"Index build failed for {name}: {str(e)}")
+
+        self.build_seconds = round(time.perf_counter() - started, 3)
+        if failed:
+            self.state = "failed"
+        else:
+            self.state = "ready"
+            self.completed_at = datetime.now(timezone.utc)
+            logger.info(f"MongoDB indexes ready after {self.build_seconds}s")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": self.state,
+            "attempts": self.attempts,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "build_seconds": self.build_seconds,
+            "collections": self.collections,
+        }
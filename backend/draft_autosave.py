@@ -0,0 +1,210 @@
+import asyncio
+import copy
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from draft_store import DraftStore, split_draft
+from json_patch import JSON_PATCH_TYPE, MERGE_PATCH_TYPE, PatchError, apply_json_patch, apply_merge_patch
+from project_reads import fetch_project_quote
+from quote_revisions import RevisionConflict
+
+logger = logging.getLogger(__name__)
+
+DRAFT_FIELDS = {"project_name", "notes", "request"}
+
+# Drafts whose unsaved patches were dropped, remembered until a client is told
+LOST_DRAFTS_MAX = 1000
+
+
+class DraftChangesLost(RevisionConflict):
+    """Patches that were already acknowledged could not be saved: the draft changed elsewhere"""
+
+    def __init__(self, draft_id: str, lost_revision: int, current: int):
+        super().__init__(draft_id, lost_revision, current)
+        self.args = (f"Unsaved changes to draft {draft_id} up to revision {lost_revision} were lost; "
+                     f"it was changed elsewhere and is at revision {current}",)
+
+
+class _Draft:
+    def __init__(self, document: Dict[str, Any], revision: int):
+        self.document = document
+        self.revision = revision
+        self.persisted_revision = revision
+        self.dirty_since: Optional[float] = None
+        self.last_patch: Optional[float] = None
+        self.flush_task: Optional[asyncio.Task] = None
+
+
+class DraftAutosave:
+    """Applies JSON Patch / merge patch deltas to drafts in memory and writes them out in batches.
+
+    A draft is the document {project_name, notes, request}. Every patch bumps its revision
+    straight away, so clients can send If-Match on the next one. The write to MongoDB
+    waits until the draft has been quiet for `quiet_seconds`, and waits no longer than
+    `max_delay_seconds` after the first unsaved patch. It goes through DraftStore with
+    compare-and-set on the last saved revision. A burst of edits becomes one write.
+
+    Only drafts with unsaved patches are held, in this process only; reads of anything else
+    go to MongoDB. If another process writes the same draft in the meantime, the flush
+    conflicts and the pending edits are dropped. The next patch to that draft is then
+    refused with DraftChangesLost, so the client learns of it and can re-send its changes.
+    """
+
+    def __init__(self, store: DraftStore, db, quiet_seconds: float = 2.0, max_delay_seconds: float = 10.0):
+        self.store = store
+        self.db = db
+        self.quiet_seconds = quiet_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._drafts: Dict[str, _Draft] = {}  # drafts with unsaved patches
+        self._lost: Dict[str, int] = {}  # draft id -> last revision whose patches were dropped
+        self._locks: Dict[str, list] = {}  # draft id -> [lock, holders and waiters]
+        self.patches = 0
+        self.flushes = 0
+        self.conflicts = 0
+        self.failures = 0
+
+    @asynccontextmanager
+    async def _locked(self, draft_id: str):
+        # One lock per draft, dropped once nobody holds or waits for it
+        entry = self._locks.setdefault(draft_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[draft_id]
+
+    async def _load(self, draft_id: str) -> Optional[_Draft]:
+        """The held draft, or a fresh copy of the stored one (not held until it is patched)"""
+        draft = self._drafts.get(draft_id)
+        if draft is not None:
+            return draft
+
+        stored = await fetch_project_quote(self.db, draft_id, by="quote_id")
+        if not stored or not stored["quote"] or stored["quote"].get("confidence_level") != "Draft":
+            return None
+        project, request = stored["project"], stored["request"] or {}
+        document = {
+            "project_name": project.get("project_name", ""),
+            "notes": project.get("notes"),
+            "request": {key: value for key, value in request.items() if key not in ("id", "created_at", "updated_at")},
+        }
+        return _Draft(document, stored["quote"].get("draft_revision") or 0)
+
+    async def get(self, draft_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """The draft as the server currently holds it (including unsaved patches) and its revision"""
+        async with self._locked(draft_id):
+            draft = await self._load(draft_id)
+            if draft is None:
+                return None
+            return copy.deepcopy(draft.document), draft.revision
+
+    async def patch(self, draft_id: str, patch: Any, content_type: str, expected_revision: Optional[int] = None) -> int:
+        """Apply a patch and return the new revision; the write to MongoDB happens later"""
+        async with self._locked(draft_id):
+            draft = await self._load(draft_id)
+            if draft is None:
+                raise KeyError(draft_id)
+            if draft_id in self._lost:
+                raise DraftChangesLost(draft_id, self._lost.pop(draft_id), draft.revision)
+            if expected_revision is not None and expected_revision != draft.revision:
+                raise RevisionConflict(draft_id, expected_revision, draft.revision)
+
+            if content_type == JSON_PATCH_TYPE:
+                document = apply_json_patch(draft.document, patch)
+            elif content_type == MERGE_PATCH_TYPE:
+                document = apply_merge_patch(draft.document, patch)
+            else:
+                raise PatchError(f"Unsupported patch type: {content_type}")
+            if not isinstance(document, dict) or not set(document) <= DRAFT_FIELDS:
+                raise PatchError(f"A draft only has the fields {sorted(DRAFT_FIELDS)}")
+            if not isinstance(document.get("request"), dict) or not isinstance(document.get("project_name"), str):
+                raise PatchError("A draft needs a request object and a project_name string")
+
+            now = time.monotonic()
+            self._drafts[draft_id] = draft
+            draft.document = document
+            draft.revision += 1
+            draft.last_patch = now
+            draft.dirty_since = draft.dirty_since or now
+            if draft.flush_task is None:
+                draft.flush_task = asyncio.create_task(self._flush_when_due(draft_id, draft))
+            self.patches += 1
+            return draft.revision
+
+    async def _flush_when_due(self, draft_id: str, draft: _Draft) -> None:
+        while True:
+            due = min(draft.last_patch + self.quiet_seconds, draft.dirty_since + self.max_delay_seconds)
+            wait = due - time.monotonic()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        draft.flush_task = None
+        await self.flush(draft_id)
+
+    async def flush(self, draft_id: str) -> None:
+        """Write a draft's pending patches now and release it from memory"""
+        async with self._locked(draft_id):
+            draft = self._drafts.get(draft_id)
+            if draft is None:
+                return
+            request, project = split_draft(draft.document)
+            try:
+                await self.store.save(draft_id, request, project,
+                                      expected_revision=draft.persisted_revision, new_revision=draft.revision)
+            except RevisionConflict as e:
+                self.conflicts += 1
+                logger.warning(f"Dropped unsaved patches to draft {draft_id}: {str(e)}")
+                self._lost[draft_id] = draft.revision
+                if len(self._lost) > LOST_DRAFTS_MAX:
+                    del self._lost[next(iter(self._lost))]
+            except Exception as e:
+                # Keep the patches and try again once the quiet period has passed
+                self.failures += 1
+                logger.error(f"Error saving draft {draft_id}: {str(e)}")
+                draft.dirty_since = draft.last_patch = time.monotonic()
+                if draft.flush_task is None:
+                    draft.flush_task = asyncio.create_task(self._flush_when_due(draft_id, draft))
+                return
+            else:
+                self.flushes += 1
+
+            if draft.flush_task is not None:
+                draft.flush_task.cancel()
+            del self._drafts[draft_id]
+
+    def replaced(self, draft_id: str) -> None:
+        """A full save replaced the draft; earlier lost patches no longer need reporting"""
+        self._lost.pop(draft_id, None)
+
+    async def stop(self) -> None:
+        """Write every pending draft; called on shutdown"""
+        for draft_id in list(self._drafts):
+            await self.flush(draft_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "quiet_seconds": self.quiet_seconds,
+            "max_delay_seconds": self.max_delay_seconds,
+            "drafts_pending": len(self._drafts),
+            "drafts_lost_unreported": len(self._lost),
+            "patches": self.patches,
+            "flushes": self.flushes,
+            "conflicts": self.conflicts,
+            "failures": self.failures,
+        }
+
+
+def create_draft_autosave(store: DraftStore, db) -> DraftAutosave:
+    """Build the autosave coalescer configured by DRAFT_AUTOSAVE_QUIET_SECONDS / DRAFT_AUTOSAVE_MAX_DELAY_SECONDS"""
+    return DraftAutosave(
+        store,
+        db,
+        quiet_seconds=float(os.environ.get('DRAFT_AUTOSAVE_QUIET_SECONDS', 2)),
+        max_delay_seconds=float(os.environ.get('DRAFT_AUTOSAVE_MAX_DELAY_SECONDS', 10)),
+    )
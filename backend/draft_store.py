@@ -0,0 +1,147 @@
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from quote_revisions import RevisionConflict, match_revision
+
+logger = logging.getLogger(__name__)
+
+# Standalone mongod: "Transaction numbers are only allowed on a replica set member or mongos"
+ILLEGAL_OPERATION = 20
+
+# Request fields the server owns; a draft's copy of them is ignored
+SERVER_REQUEST_FIELDS = ("_id", "id", "created_at", "updated_at")
+
+
+def split_draft(document: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Quote request and saved-project fields of a draft document ({project_name, notes, request})"""
+    request = {key: value for key, value in document["request"].items() if key not in SERVER_REQUEST_FIELDS}
+    project = {
+        "project_name": document["project_name"],
+        "client_name": (request.get("client_info") or {}).get("name", ""),
+        "notes": document.get("notes"),
+    }
+    return request, project
+
+
+class DraftStore:
+    """Writes a draft's quote, request and saved project as one unit.
+
+    The draft id is the quote's id. New drafts give the request and project the same id;
+    drafts saved by the old /save-draft flow keep their own request and project ids, which
+    are found through the quote's request_id and the project's quote_id. Every write is an
+    upsert, so an autosave repeated any number of times leaves exactly one of each. On a replica set the writes run in a single
+    transaction. A standalone server cannot do transactions; there the writes go quote,
+    request, project in order. A retry of an interrupted save then completes it, and the
+    project (what the draft list shows) is written last.
+
+    Every save bumps the quote's draft_revision (or sets it to `new_revision`, for callers
+    that number revisions themselves). With `expected_revision` the change is a
+    compare-and-set and a stale caller gets RevisionConflict. The quote's own `revision`
+    belongs to the cost-adjustment log in quote_revisions and is left alone.
+    """
+
+    def __init__(self, client, db, transactions: str = "auto"):
+        self.client = client
+        self.db = db
+        self.transactions = transactions != "off"
+        self.saves = 0
+        self.transactional_saves = 0
+        self.conflicts = 0
+
+    async def save(self, draft_id: str, request: Dict[str, Any], project: Dict[str, Any],
+                   expected_revision: Optional[int] = None, new_revision: Optional[int] = None) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        transactional = False
+        try:
+            if self.transactions:
+                try:
+                    revision = await self._save_in_transaction(draft_id, request, project, expected_revision, new_revision, now)
+                    transactional = True
+                except (OperationFailure, NotImplementedError) as e:
+                    if isinstance(e, OperationFailure) and e.code != ILLEGAL_OPERATION:
+                        raise
+                    logger.warning("MongoDB does not support transactions here; saving drafts with ordered upserts")
+                    self.transactions = False
+            if not transactional:
+                revision = await self._write(draft_id, request, project, expected_revision, new_revision, now, None)
+        except DuplicateKeyError:
+            # The revision filter missed an existing draft, so the upsert tried to insert a second one
+            self.conflicts += 1
+            current = await self.db.quotes.find_one({"id": draft_id}, {"draft_revision": 1})
+            raise RevisionConflict(draft_id, expected_revision, (current or {}).get("draft_revision", 0))
+
+        self.saves += 1
+        self.transactional_saves += transactional
+        return {"draft_id": draft_id, "revision": revision, "transactional": transactional}
+
+    async def _save_in_transaction(self, draft_id, request, project, expected_revision, new_revision, now) -> int:
+        async with await self.client.start_session() as session:
+            return await session.with_transaction(
+                lambda s: self._write(draft_id, request, project, expected_revision, new_revision, now, s)
+            )
+
+    async def _write(self, draft_id: str, request: Dict[str, Any], project: Dict[str, Any],
+                     expected_revision: Optional[int], new_revision: Optional[int], now: datetime, session) -> int:
+        quote_filter: Dict[str, Any] = {"id": draft_id}
+        if expected_revision is not None:
+            quote_filter["draft_revision"] = match_revision(expected_revision)
+        if new_revision is None:
+            quote_update = {"$set": {"updated_at": now}, "$inc": {"draft_revision": 1}}
+        else:
+            quote_update = {"$set": {"updated_at": now, "draft_revision": new_revision}}
+        # Placeholder estimate only on insert: a draft that has since been priced keeps its costs.
+        # The document as it was before tells us the request id and the revision we moved on from.
+        previous = await self.db.quotes.find_one_and_update(
+            quote_filter,
+            {
+                **quote_update,
+                "$setOnInsert": {
+                    "request_id": draft_id,
+                    "total_cost": 0,
+                    "cost_breakdown": [],
+                    "ai_analysis": "Draft project - not yet estimated",
+                    "confidence_level": "Draft",
+                    "created_at": now,
+                },
+            },
+            projection={"_id": 0, "draft_revision": 1, "request_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+            session=session,
+        ) or {}
+
+        await self.db.quote_requests.update_one(
+            {"id": previous.get("request_id") or draft_id},
+            {"$set": {**request, "updated_at": now}, "$setOnInsert": {"created_at": now}},
+            upsert=True,
+            session=session,
+        )
+
+        await self.db.saved_projects.update_one(
+            {"quote_id": draft_id},
+            {
+                "$set": {**project, "updated_at": now},
+                "$setOnInsert": {"id": draft_id, "category": "Draft", "total_cost": 0, "created_at": now},
+            },
+            upsert=True,
+            session=session,
+        )
+        return (previous.get("draft_revision") or 0) + 1 if new_revision is None else new_revision
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "transactions": self.transactions,
+            "saves": self.saves,
+            "transactional_saves": self.transactional_saves,
+            "conflicts": self.conflicts,
+        }
+
+
+def create_draft_store(client, db) -> DraftStore:
+    """Build the draft store; DRAFT_TRANSACTIONS=off skips the transaction attempt"""
+    return DraftStore(client, db, transactions=os.environ.get('DRAFT_TRANSACTIONS', 'auto'))
@@ -0,0 +1,92 @@
+import csv
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from quote_cache import POSTCODE_PATTERN, REGION_PATTERN
+
+DEFAULT_CENTROIDS_FILE = Path(__file__).parent / 'data' / 'postcode_centroids.csv'
+
+# Where an address is placed when its postcode is not in the table
+STATE_CAPITALS = {
+    "NSW": "2000", "VIC": "3000", "QLD": "4000", "SA": "5000",
+    "WA": "6000", "TAS": "7000", "ACT": "2600", "NT": "0800",
+}
+
+
+class GeoPoint(NamedTuple):
+    latitude: float
+    longitude: float
+    postcode: str
+    precision: str  # "postcode" or "state"
+
+    def geojson(self) -> Dict:
+        return {"type": "Point", "coordinates": [self.longitude, self.latitude]}
+
+
+def postcode_state(postcode: str) -> Optional[str]:
+    """State a postcode belongs to, from Australia Post's postcode ranges"""
+    number = int(postcode)
+    if 800 <= number <= 999:
+        return "NT"
+    if 2600 <= number <= 2618 or 2900 <= number <= 2920:
+        return "ACT"
+    for low, high, state in ((1000, 2999, "NSW"), (3000, 3999, "VIC"), (8000, 8999, "VIC"), (4000, 4999, "QLD"),
+                             (9000, 9999, "QLD"), (5000, 5999, "SA"), (6000, 6999, "WA"), (7000, 7999, "TAS")):
+        if low <= number <= high:
+            return state
+    return None
+
+
+class PostcodeGeocoder:
+    """Offline geocoder: an address's postcode looked up in a centroid table.
+
+    Results are memoised per normalised address in an LRU cache, so repeat lookups for
+    the same client skip the parsing entirely.
+    """
+
+    def __init__(self, centroids: Dict[str, GeoPoint], cache_size: int = 10000):
+        self.centroids = centroids
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @classmethod
+    def from_csv(cls, path, cache_size: int = 10000) -> "PostcodeGeocoder":
+        with open(path, newline='') as f:
+            rows = csv.DictReader(line for line in f if not line.startswith('#'))
+            centroids = {
+                row["postcode"].zfill(4): GeoPoint(float(row["latitude"]), float(row["longitude"]), row["postcode"].zfill(4), "postcode")
+                for row in rows
+            }
+        return cls(centroids, cache_size)
+
+    def geocode(self, address: Optional[str]) -> Optional[GeoPoint]:
+        """Centroid of the address's postcode, its state capital as a fallback, or None"""
+        return self.lookup(re.sub(r'\s+', ' ', (address or '').strip().upper()))
+
+    def _lookup(self, address: str) -> Optional[GeoPoint]:
+        region = REGION_PATTERN.search(address)
+        postcodes = POSTCODE_PATTERN.findall(address)
+        postcode = (region.group(2) if region and region.group(2) else None) or (postcodes[-1] if postcodes else None)
+
+        if postcode and postcode in self.centroids:
+            return self.centroids[postcode]
+
+        state = region.group(1).upper() if region else (postcode_state(postcode) if postcode else None)
+        capital = self.centroids.get(STATE_CAPITALS.get(state, ''))
+        if capital is None:
+            return None
+        return capital._replace(postcode=postcode or capital.postcode, precision="state")
+
+    def stats(self) -> Dict[str, int]:
+        info = self.lookup.cache_info()
+        return {"postcodes": len(self.centroids), "cached": info.currsize, "hits": info.hits, "misses": info.misses}
+
+
+def create_geocoder() -> PostcodeGeocoder:
+    """Build the geocoder from POSTCODE_CENTROIDS_FILE (defaults to the bundled subset)"""
+    return PostcodeGeocoder.from_csv(
+        os.environ.get('POSTCODE_CENTROIDS_FILE') or DEFAULT_CENTROIDS_FILE,
+        cache_size=int(os.environ.get('GEOCODE_CACHE_SIZE', 10000)),
+    )
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+
+class IdempotencyError(Exception):
+    """A key that cannot be used for this request; carries the HTTP status to answer with"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def payload_hash(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Remembers the response to each Idempotency-Key so a retried request is not applied twice.
+
+    `begin` claims the key (or returns the stored response for a completed one), `complete`
+    stores the response and `release` frees the key after a failure so the client can retry.
+    Keys expire through a TTL index on `expires_at`. A claim whose holder died is taken over
+    once `lock_seconds` have passed.
+    """
+
+    def __init__(self, collection, ttl_seconds: float = 24 * 60 * 60, lock_seconds: float = 30):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.claimed = 0
+        self.replayed = 0
+        self.rejected = 0
+
+    async def begin(self, scope: str, key: str, payload: Any) -> Optional[Dict[str, Any]]:
+        """Claim `key`; returns the stored response instead when it was already completed"""
+        now = datetime.now(timezone.utc)
+        digest = payload_hash(payload)
+        document = {
+            "_id": f"{scope}:{key}",
+            "request_hash": digest,
+            "status": "pending",
+            "locked_until": now + timedelta(seconds=self.lock_seconds),
+            "expires_at": now + timedelta(seconds=self.ttl_seconds),
+        }
+        try:
+            await self.collection.insert_one(document)
+            self.claimed += 1
+            return None
+        except DuplicateKeyError:
+            pass
+
+        existing = await self.collection.find_one({"_id": document["_id"]})
+        if existing is None:
+            # Expired between the insert and the read; treat as a fresh claim next time
+            self.rejected += 1
+            raise IdempotencyError(409, "Request with this Idempotency-Key is being retried; try again")
+        if existing["request_hash"] != digest:
+            self.rejected += 1
+            raise IdempotencyError(422, "Idempotency-Key was already used with a different request body")
+        if existing["status"] == "done":
+            self.replayed += 1
+            return existing["response"]
+
+        taken = await self.collection.update_one(
+            {"_id": document["_id"], "status": "pending", "locked_until": {"$lt": now}},
+            {"$set": {"locked_until": document["locked_until"]}},
+        )
+        if taken.modified_count:
+            self.claimed += 1
+            return None
+        self.rejected += 1
+        raise IdempotencyError(409, "A request with this Idempotency-Key is still in progress")
+
+    async def complete(self, scope: str, key: str, response: Dict[str, Any]) -> None:
+        await self.collection.update_one(
+            {"_id": f"{scope}:{key}"}, {"$set": {"status": "done", "response": response}}
+        )
+
+    async def release(self, scope: str, key: str) -> None:
+        await self.collection.delete_one({"_id": f"{scope}:{key}", "status": "pending"})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "claimed": self.claimed,
+            "replayed": self.replayed,
+            "rejected": self.rejected,
+        }
+
+
+def create_idempotency_store(db) -> IdempotencyStore:
+    """Build the store configured by IDEMPOTENCY_TTL_SECONDS"""
+    return IdempotencyStore(
+        db.idempotency_keys,
+        ttl_seconds=float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60)),
+    )
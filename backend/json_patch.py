@@ -0,0 +1,141 @@
+import copy
+from typing import Any, Dict, List
+
+JSON_PATCH_TYPE = "application/json-patch+json"
+MERGE_PATCH_TYPE = "application/merge-patch+json"
+
+
+class PatchError(ValueError):
+    """A patch that is malformed or does not apply to the document"""
+
+
+class PatchTestFailed(PatchError):
+    """A JSON Patch "test" operation did not match"""
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """RFC 7396 merge patch: objects merge recursively, null deletes, anything else replaces"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def _tokens(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not (token.isascii() and token.isdigit()) or (len(token) > 1 and token.startswith("0")):
+        raise PatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index out of range: {token}")
+    return index
+
+
+def _parent(document: Any, pointer: str):
+    tokens = _tokens(pointer)
+    if not tokens:
+        raise PatchError("Operation cannot target the whole document")
+    node = document
+    for token in tokens[:-1]:
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token, allow_end=False)]
+        else:
+            raise PatchError(f"Path not found: {pointer}")
+    return node, tokens[-1]
+
+
+def _get(document: Any, pointer: str) -> Any:
+    if pointer == "":
+        return document
+    parent, token = _parent(document, pointer)
+    if isinstance(parent, dict) and token in parent:
+        return parent[token]
+    if isinstance(parent, list):
+        return parent[_index(parent, token, allow_end=False)]
+    raise PatchError(f"Path not found: {pointer}")
+
+
+def _add(document: Any, pointer: str, value: Any) -> None:
+    parent, token = _parent(document, pointer)
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    else:
+        raise PatchError(f"Path not found: {pointer}")
+
+
+def _remove(document: Any, pointer: str) -> Any:
+    parent, token = _parent(document, pointer)
+    if isinstance(parent, dict) and token in parent:
+        return parent.pop(token)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, token, allow_end=False))
+    raise PatchError(f"Path not found: {pointer}")
+
+
+def _equal(left: Any, right: Any) -> bool:
+    """JSON equality as RFC 6902 "test" defines it: numbers by value, everything else by type and value"""
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+        return left == right
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(_equal(left[key], right[key]) for key in left)
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(_equal(a, b) for a, b in zip(left, right))
+    return type(left) is type(right) and left == right
+
+
+def apply_json_patch(document: Any, operations: List[Dict[str, Any]]) -> Any:
+    """RFC 6902 JSON Patch. Applied to a copy; the input is left untouched if any operation fails."""
+    if not isinstance(operations, list):
+        raise PatchError("JSON Patch must be an array of operations")
+    result = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict) or "path" not in operation:
+            raise PatchError(f"Invalid operation: {operation!r}")
+        op, path = operation.get("op"), operation["path"]
+        if not isinstance(path, str):
+            raise PatchError(f"Invalid operation path: {path!r}")
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"'{op}' needs a value")
+
+        if op == "add":
+            _add(result, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(result, path)
+        elif op == "replace":
+            _get(result, path)
+            _remove(result, path)
+            _add(result, path, copy.deepcopy(operation["value"]))
+        elif op in ("move", "copy"):
+            source = operation.get("from")
+            if not isinstance(source, str):
+                raise PatchError(f"'{op}' needs a from path")
+            if op == "move" and (path + "/").startswith(source + "/") and path != source:
+                raise PatchError("Cannot move a value into itself")
+            value = _remove(result, source) if op == "move" else copy.deepcopy(_get(result, source))
+            _add(result, path, value)
+        elif op == "test":
+            if not _equal(_get(result, path), operation["value"]):
+                raise PatchTestFailed(f"Test failed at {path}")
+        else:
+            raise PatchError(f"Unknown operation: {op!r}")
+    return result
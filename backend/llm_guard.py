@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Stops calling a failing provider for a while.
+
+    closed:    calls go through; `failure_threshold` consecutive failures open the circuit
+    open:      calls are refused until `reset_seconds` have passed
+    half_open: a single trial call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+        if self.state != "closed":
+            logger.info("LLM circuit closed")
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or (self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(f"LLM circuit opened after {self.consecutive_failures} consecutive failures")
+
+    def record_cancelled(self) -> None:
+        """The caller went away mid-call: no verdict, but free the half-open trial slot"""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[Any]],
+    hedge: Optional[Callable[[], Awaitable[Any]]],
+    hedge_after: float,
+) -> Tuple[Any, str]:
+    """Run `primary`; start `hedge` too once it has run `hedge_after` seconds or has failed.
+
+    Returns the first valid result and which call produced it ("primary"/"hedge"). A call
+    that raises or returns None (an answer that failed validation) does not win; the other
+    is still awaited, and the loser is cancelled. With no valid result, (None, label) is
+    returned if either call answered at all; otherwise the last error is raised.
+    """
+    primary_task = asyncio.ensure_future(primary())
+    tasks = {primary_task: "primary"}
+    try:
+        if hedge is None or hedge_after <= 0:
+            return await primary_task, "primary"
+
+        done, _ = await asyncio.wait({primary_task}, timeout=hedge_after)
+        if not done or primary_task.exception() is not None or primary_task.result() is None:
+            # Still running, or already finished without a usable answer
+            tasks[asyncio.ensure_future(hedge())] = "hedge"
+
+        pending = set(tasks)
+        error = None
+        invalid = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif task.result() is None:
+                    invalid = tasks[task]
+                else:
+                    return task.result(), tasks[task]
+        if invalid is not None:
+            # The provider answered, just not usefully; the caller falls back without a breaker failure
+            return None, invalid
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+class LlmGuard:
+    """Deadline, hedging and circuit breaker settings plus outcome counters for LLM estimates"""
+
+    def __init__(self, deadline_seconds: float, hedge_after_seconds: float, hedge_model: Optional[str], breaker: CircuitBreaker):
+        self.deadline_seconds = deadline_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.hedge_model = hedge_model
+        self.breaker = breaker
+        self.outcomes = Counter()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "deadline_seconds": self.deadline_seconds,
+            "hedge_after_seconds": self.hedge_after_seconds or None,
+            "hedge_model": self.hedge_model if self.hedge_after_seconds else None,
+            "breaker": self.breaker.stats(),
+            "outcomes": dict(self.outcomes),
+        }
+
+
+def create_llm_guard() -> LlmGuard:
+    """Build the LLM guard configured by LLM_DEADLINE_SECONDS, LLM_HEDGE_* and LLM_BREAKER_*"""
+    return LlmGuard(
+        deadline_seconds=float(os.environ.get('LLM_DEADLINE_SECONDS', 25)),
+        hedge_after_seconds=float(os.environ.get('LLM_HEDGE_AFTER_SECONDS', 0)),
+        hedge_model=os.environ.get('LLM_HEDGE_MODEL') or None,
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.environ.get('LLM_BREAKER_FAILURES', 5)),
+            reset_seconds=float(os.environ.get('LLM_BREAKER_RESET_SECONDS', 30)),
+        ),
+    )
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+
+class LlmClientPool:
+    """Hands out a fresh LLM chat session per quote, bounded by a concurrency semaphore.
+
+    A chat client keeps the conversation history of its session, so sharing one across
+    quotes lets every call carry the others' messages. Each quote gets its own short-lived
+    session instead; HTTP connections live below the chat client and are shared process-wide.
+    """
+
+    def __init__(self, factory: Callable[[str], Any], max_concurrency: int = 16):
+        self.factory = factory
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self.sessions = 0
+        self.calls = 0
+        self.errors = 0
+        self._wait_seconds = deque(maxlen=500)
+        self._call_seconds = deque(maxlen=500)
+
+    @asynccontextmanager
+    async def session(self, session_id: str, **options):
+        """A chat client for one quote; holds a concurrency slot until the block exits.
+
+        `options` (e.g. the model to use) are passed through to the client factory.
+        """
+        self._waiting += 1
+        queued = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._wait_seconds.append(time.perf_counter() - queued)
+
+        self._in_flight += 1
+        self.sessions += 1
+        try:
+            yield _TimedChat(self, self.factory(session_id, **options))
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        def summary(samples):
+            if not samples:
+                return {"avg_ms": None, "p95_ms": None}
+            ordered = sorted(samples)
+            return {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+            }
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "sessions": self.sessions,
+            "calls": self.calls,
+            "errors": self.errors,
+            "slot_wait": summary(self._wait_seconds),
+            "call_time": summary(self._call_seconds),
+        }
+
+
+class _TimedChat:
+    """Wraps a chat client so every send_message is counted and timed by the pool"""
+
+    def __init__(self, pool: LlmClientPool, chat):
+        self._pool = pool
+        self._chat = chat
+
+    async def send_message(self, message) -> str:
+        started = time.perf_counter()
+        self._pool.calls += 1
+        try:
+            return await self._chat.send_message(message)
+        except Exception:
+            self._pool.errors += 1
+            raise
+        finally:
+            self._pool._call_seconds.append(time.perf_counter() - started)
+
+
+def create_llm_pool(factory: Callable[[str], Any]) -> LlmClientPool:
+    """Build the LLM session pool configured by LLM_MAX_CONCURRENCY"""
+    return LlmClientPool(factory, max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', 16)))
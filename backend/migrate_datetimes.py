@@ -0,0 +1,65 @@
+"""One-off migration: convert ISO-string timestamps to native BSON dates.
+
+Documents written before the switch to native datetime storage hold `created_at` /
+`updated_at` as strings produced by isoformat() (or by the frontend for drafts). This
+rewrites them in place, in batches, and is safe to re-run.
+
+    python migrate_datetimes.py [--dry-run]
+"""
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from mongo_codec import CODEC_OPTIONS, DATETIME_FIELDS, coerce_datetimes
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+COLLECTIONS = ["quotes", "quote_requests", "saved_projects", "cost_adjustments"]
+BATCH_SIZE = 1000
+
+
+def migrate_collection(collection, dry_run: bool) -> dict:
+    string_dated = {"$or": [{field: {"$type": "string"}} for field in DATETIME_FIELDS]}
+    projection = {field: 1 for field in DATETIME_FIELDS}
+
+    converted, unparseable, batch = 0, 0, []
+    for doc in collection.find(string_dated, projection).batch_size(BATCH_SIZE):
+        coerced = coerce_datetimes(dict(doc))
+        updates = {field: coerced[field] for field in DATETIME_FIELDS if isinstance(doc.get(field), str) and not isinstance(coerced[field], str)}
+        unparseable += sum(1 for field in DATETIME_FIELDS if isinstance(coerced.get(field), str))
+        if not updates:
+            continue
+
+        converted += 1
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": updates}))
+        if len(batch) >= BATCH_SIZE:
+            if not dry_run:
+                collection.bulk_write(batch, ordered=False)
+            batch = []
+
+    if batch and not dry_run:
+        collection.bulk_write(batch, ordered=False)
+
+    return {"converted": converted, "unparseable_fields": unparseable}
+
+
+def main():
+    dry_run = "--dry-run" in sys.argv
+    client = MongoClient(os.environ['MONGO_URL'])
+    db = client.get_database(os.environ['DB_NAME'], codec_options=CODEC_OPTIONS)
+
+    try:
+        for name in COLLECTIONS:
+            result = migrate_collection(db[name], dry_run)
+            action = "would convert" if dry_run else "converted"
+            print(f"{name}: {action} {result['converted']} documents, {result['unparseable_fields']} unparseable fields left as strings")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import re
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+# USD per million tokens (input, output); used to estimate spend per model in /api/metrics
+MODEL_PRICES = {
+    "openai/gpt-4o": (2.50, 10.00),
+    "openai/gpt-4o-mini": (0.15, 0.60),
+    "openai/gpt-4.1": (2.00, 8.00),
+    "openai/gpt-4.1-mini": (0.40, 1.60),
+}
+
+# Notes mentioning any of these describe work the standard scope does not cover
+UNUSUAL_NOTES_PATTERN = re.compile(
+    r'\b(asbestos|structural|load[- ]bearing|heritage|strata|mou?ld\w*|rot(ten)?|termites?|subsidence|'
+    r'relocat\w*|move (the )?(toilet|shower|drain|waste)|wheelchair|accessib\w*|disabled|second storey|upstairs)\b',
+    re.IGNORECASE
+)
+
+
+def request_complexity(request, max_subtasks: int, max_notes_chars: int) -> List[str]:
+    """Reasons a request is too complex for the small model; empty when it is simple"""
+    reasons = []
+    subtasks = sum(
+        sum(1 for v in details.get('subtasks', {}).values() if v)
+        for details in (request.detailed_components or {}).values()
+        if isinstance(details, dict) and details.get('enabled')
+    )
+    if subtasks > max_subtasks:
+        reasons.append("subtasks")
+
+    notes = (request.additional_notes or '').strip()
+    if len(notes) > max_notes_chars:
+        reasons.append("long_notes")
+    if UNUSUAL_NOTES_PATTERN.search(notes):
+        reasons.append("unusual_notes")
+    return reasons
+
+
+class ModelRouter:
+    """Picks the model tier per quote and keeps per-model latency, token and cost figures.
+
+    Simple requests go to the small model. Complex ones go straight to the large model, and
+    a small-model answer with Low confidence (or one that never validated) is escalated.
+    """
+
+    def __init__(self, small_model: Optional[str], large_model: str, max_subtasks: int = 12, max_notes_chars: int = 300):
+        self.models = {"small": small_model or large_model, "large": large_model}
+        self.routing_enabled = bool(small_model) and small_model != large_model
+        self.max_subtasks = max_subtasks
+        self.max_notes_chars = max_notes_chars
+        self.tiers = Counter()
+        self.escalations = Counter()
+        self._models: Dict[str, Dict[str, Any]] = {}
+
+    def choose(self, request) -> Tuple[str, List[str]]:
+        if not self.routing_enabled:
+            return "large", ["routing_disabled"]
+        reasons = request_complexity(request, self.max_subtasks, self.max_notes_chars)
+        return ("large" if reasons else "small"), reasons
+
+    def should_escalate(self, tier: str, ai_data: Optional[Dict[str, Any]]) -> Optional[str]:
+        if tier != "small" or not self.routing_enabled:
+            return None
+        if ai_data is None:
+            return "invalid_response"
+        if ai_data.get("confidence") == "Low":
+            return "low_confidence"
+        return None
+
+    def record_tier(self, tier: str) -> None:
+        self.tiers[tier] += 1
+
+    def record_escalation(self, reason: str) -> None:
+        self.escalations[reason] += 1
+        self.tiers["escalated"] += 1
+
+    def record_call(self, model: str, seconds: float, input_tokens: int, output_tokens: int) -> None:
+        entry = self._models.setdefault(model, {
+            "calls": 0, "input_tokens": 0, "output_tokens": 0, "latency": deque(maxlen=500)
+        })
+        entry["calls"] += 1
+        entry["input_tokens"] += input_tokens
+        entry["output_tokens"] += output_tokens
+        entry["latency"].append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        models = {}
+        for model, entry in self._models.items():
+            latency = sorted(entry["latency"])
+            prices = MODEL_PRICES.get(model)
+            cost = None
+            if prices:
+                cost = round((entry["input_tokens"] * prices[0] + entry["output_tokens"] * prices[1]) / 1_000_000, 4)
+            models[model] = {
+                "calls": entry["calls"],
+                "avg_ms": round(sum(latency) / len(latency) * 1000, 1) if latency else None,
+                "p95_ms": round(latency[min(len(latency) - 1, int(len(latency) * 0.95))] * 1000, 1) if latency else None,
+                "input_tokens": entry["input_tokens"],
+                "output_tokens": entry["output_tokens"],
+                "estimated_cost_usd": cost,
+            }
+
+        return {
+            "small_model": self.models["small"] if self.routing_enabled else None,
+            "large_model": self.models["large"],
+            "tiers": dict(self.tiers),
+            "escalations": dict(self.escalations),
+            "models": models,
+        }
+
+
+def create_model_router(default_model: str) -> ModelRouter:
+    """Build the router configured by LLM_SMALL_MODEL / LLM_LARGE_MODEL ("provider/model").
+
+    Setting LLM_SMALL_MODEL to an empty string sends every quote to the large model.
+    """
+    return ModelRouter(
+        small_model=os.environ.get('LLM_SMALL_MODEL', 'openai/gpt-4o-mini'),
+        large_model=os.environ.get('LLM_LARGE_MODEL', default_model),
+        max_subtasks=int(os.environ.get('LLM_ROUTER_MAX_SUBTASKS', 12)),
+        max_notes_chars=int(os.environ.get('LLM_ROUTER_MAX_NOTES_CHARS', 300)),
+    )
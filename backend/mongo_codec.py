@@ -0,0 +1,43 @@
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Iterable
+
+from bson.codec_options import CodecOptions, TypeRegistry
+from bson.decimal128 import Decimal128
+
+# Top-level fields that hold timestamps. Only used to coerce ISO strings arriving in raw
+# JSON payloads (drafts) - model-validated documents already carry datetime objects.
+DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+def fallback_encoder(value: Any) -> Any:
+    """Encode values BSON has no native type for, so documents can be inserted as-is"""
+    if isinstance(value, date):
+        return datetime.combine(value, time.min, tzinfo=timezone.utc)
+    if isinstance(value, Decimal):
+        return Decimal128(value)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+# Datetimes are stored as BSON dates and decoded as timezone-aware UTC datetimes, so
+# documents go straight from Pydantic .dict() to Mongo and back without a Python walk.
+CODEC_OPTIONS = CodecOptions(
+    tz_aware=True,
+    type_registry=TypeRegistry(fallback_encoder=fallback_encoder),
+)
+
+
+def coerce_datetimes(doc: Dict[str, Any], fields: Iterable[str] = DATETIME_FIELDS) -> Dict[str, Any]:
+    """Parse ISO-8601 strings in the known timestamp fields of an unvalidated payload"""
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, str):
+            try:
+                parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                continue
+            doc[field] = parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return doc
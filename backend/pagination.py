@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(doc: Dict[str, Any], sort_field: str) -> str:
+    """Opaque keyset cursor pointing just past `doc` in (sort_field desc, id desc) order"""
+    value = doc.get(sort_field)
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    raw = json.dumps([value, doc["id"]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if isinstance(value, dict) and "$date" in value:
+            value = datetime.fromisoformat(value["$date"])
+    except Exception:
+        raise InvalidCursor("Invalid pagination cursor")
+    return value, doc_id
+
+
+def keyset_query(query: Dict[str, Any], sort_field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """Restrict `query` to documents after the cursor in (sort_field desc, id desc) order"""
+    if not cursor:
+        return query
+    value, doc_id = decode_cursor(cursor)
+    after = {"$or": [
+        {sort_field: {"$lt": value}},
+        {sort_field: value, "id": {"$lt": doc_id}},
+    ]}
+    return {"$and": [query, after]} if query else after
+
+
+def keyset_sort(sort_field: str):
+    return [(sort_field, -1), ("id", -1)]
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], required: Iterable[str]) -> Optional[Dict[str, int]]:
+    """Turn a `fields=a,b,c` parameter into a Mongo projection (None means full documents)"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    projection = {field: 1 for field in [*required, *requested]}
+    projection["_id"] = 0
+    return projection
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def profile_hash(user_profile: Dict[str, Any]) -> str:
+    encoded = json.dumps(user_profile, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def proposal_cache_key(quote_id: str, revision: int, user_profile: Dict[str, Any], proposal_date: str) -> str:
+    """Identity of a rendered proposal.
+
+    The proposal date is printed on the cover page, so it is part of the key as well.
+    """
+    raw = f"{quote_id}:{revision}:{profile_hash(user_profile)}:{proposal_date}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class DiskPdfCache:
+    """Size-bounded LRU cache of rendered PDFs on local disk.
+
+    The LRU order lives in memory and is rebuilt from file modification times on start,
+    so the cache survives restarts. Renders are written to a temp file in the cache
+    directory and moved into place with an atomic rename.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._load()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _load(self) -> None:
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pdf'):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name[:-len('.pdf')], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._entries.values())
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Open a cached PDF for streaming, or None on a miss.
+
+        The handle stays readable even if the entry is evicted while it is being sent.
+        """
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        try:
+            pdf_file = open(self._path(key), 'rb')
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return pdf_file
+
+    def new_temp_path(self) -> str:
+        """Scratch file inside the cache directory, so put_file() is an atomic rename"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        return path
+
+    def put_file(self, key: str, path: str) -> None:
+        """Move a rendered file into the cache; files that cannot be cached are removed"""
+        try:
+            size = os.path.getsize(path)
+            if size > self.max_bytes:
+                os.remove(path)
+                return
+            os.replace(path, self._path(key))
+        except OSError as e:
+            # A cache write failure must never fail the download itself
+            logger.warning(f"PDF cache write failed: {str(e)}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return
+
+        self._entries[key] = size
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, _ = self._entries.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def create_pdf_cache() -> DiskPdfCache:
+    """Build the proposal cache configured by PDF_CACHE_DIR / PDF_CACHE_MAX_MB"""
+    directory = os.environ.get('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bathroom_proposal_cache'))
+    max_bytes = int(float(os.environ.get('PDF_CACHE_MAX_MB', 256)) * 1024 * 1024)
+    return DiskPdfCache(directory, max_bytes)
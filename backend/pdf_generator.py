@@ -1,5 +1,6 @@
 from reportlab.lib.pagesizes import A4, letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak, Flowable
+from reportlab.platypus.tableofcontents import TableOfContents
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, mm
 from reportlab.lib import colors
@@ -9,86 +10,281 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
 import os
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from functools import lru_cache
+import copy
 import io
 import base64
 
+def _build_stylesheet():
+    """Sample stylesheet plus the custom styles matching the professional template"""
+    styles = getSampleStyleSheet()
+    
+    # Title style
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Title'],
+        fontSize=24,
+        textColor=colors.HexColor('#2563eb'),
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Subtitle style
+    styles.add(ParagraphStyle(
+        name='CustomSubtitle',
+        parent=styles['Normal'],
+        fontSize=16,
+        textColor=colors.HexColor('#1e40af'),
+        spaceAfter=12,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Section header style
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#1e40af'),
+        spaceAfter=12,
+        spaceBefore=20,
+        fontName='Helvetica-Bold',
+        backColor=colors.HexColor('#eff6ff'),
+        borderPadding=8
+    ))
+    
+    # Professional body text
+    styles.add(ParagraphStyle(
+        name='ProfessionalBody',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.HexColor('#374151'),
+        spaceAfter=8,
+        alignment=TA_JUSTIFY,
+        fontName='Helvetica'
+    ))
+    
+    # Task list style
+    styles.add(ParagraphStyle(
+        name='TaskList',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#4b5563'),
+        spaceAfter=4,
+        leftIndent=20,
+        fontName='Helvetica'
+    ))
+    
+    # Table of contents entries in merged batch documents
+    styles.add(ParagraphStyle(
+        name='TOCEntry',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.HexColor('#374151'),
+        leading=16,
+        fontName='Helvetica'
+    ))
+    
+    return styles
+
+
+# Built once per process and shared by every render - treat as read-only
+STYLES = _build_stylesheet()
+
+
+def _fresh(template: List) -> List:
+    """Per-render copies of prebuilt flowables.
+
+    Paragraph markup is parsed once when the template is built; the shallow copies share
+    the parsed fragments but keep their own layout state, so renders never interfere.
+    """
+    return [copy.copy(flowable) for flowable in template]
+
+
+STAGE_TASKS = [
+    ("STAGE 1: DEMOLITION & PREPARATION", [
+        "Site protection and preparation",
+        "Removal of existing fixtures and fittings",
+        "Demolition of wall and ceiling linings (as selected)",
+        "Removal of floor tiles and substrate (as selected)",
+        "Plumbing rough-in modifications",
+        "Electrical rough-in work",
+        "Waste disposal and site cleanup"
+    ]),
+    ("STAGE 2: CONSTRUCTION & INSTALLATION", [
+        "Framing and structural modifications",
+        "New wall and ceiling sheet installation",
+        "Plasterboard fixing and finishing",
+        "Waterproofing membrane application",
+        "Tile bed preparation and installation",
+        "Wall and floor tiling (as per specifications)",
+        "Grout and silicone application"
+    ]),
+    ("STAGE 3: COMPLETION & HANDOVER", [
+        "Fixture and fitting installation",
+        "Electrical and plumbing connections",
+        "Painting and final finishes",
+        "Accessory installation",
+        "Professional cleaning",
+        "Quality inspection and testing",
+        "Project handover and documentation"
+    ]),
+]
+
+TERMS_TEXT = """
+<b>Payment Terms:</b><br/>
+• 10% deposit upon acceptance of proposal<br/>
+• 40% progress payment at completion of Stage 1<br/>
+• 40% progress payment at completion of Stage 2<br/>
+• 10% final payment upon project completion<br/><br/>
+
+<b>Project Timeline:</b><br/>
+• Estimated completion: 2-3 weeks from commencement<br/>
+• Weather and unforeseen circumstances may affect timeline<br/>
+• Client will be notified of any delays immediately<br/><br/>
+
+<b>Warranty & Guarantee:</b><br/>
+• 12 months warranty on all workmanship<br/>
+• Manufacturer warranty applies to all supplied products<br/>
+• 7-year structural warranty where applicable<br/><br/>
+
+<b>Variations & Changes:</b><br/>
+• All variations must be agreed in writing<br/>
+• Additional costs will be quoted separately<br/>
+• Client approval required before proceeding with variations<br/><br/>
+
+<b>Important Notes:</b><br/>
+• This proposal is valid for 30 days from issue date<br/>
+• All work complies with current building codes and regulations<br/>
+• Permits and approvals are the responsibility of the client<br/>
+• Access to water and electricity required during construction
+"""
+
+
+def _build_stage_sections() -> List:
+    elements = [Paragraph("DETAILED SCOPE OF WORKS", STYLES['SectionHeader'])]
+    for index, (title, tasks) in enumerate(STAGE_TASKS):
+        if index:
+            elements.append(Spacer(1, 10*mm))
+        elements.append(Paragraph(f"<b>{title}</b>", STYLES['Heading2']))
+        for task in tasks:
+            elements.append(Paragraph(f"• {task}", STYLES['TaskList']))
+    return elements
+
+
+def _build_terms_section() -> List:
+    return [
+        Paragraph("TERMS & CONDITIONS", STYLES['SectionHeader']),
+        Paragraph(TERMS_TEXT, STYLES['ProfessionalBody']),
+    ]
+
+
+# Sections identical in every proposal, parsed once at import
+STAGE_SECTIONS = _build_stage_sections()
+TERMS_SECTION = _build_terms_section()
+
+
+@lru_cache(maxsize=64)
+def _company_overview_template(company_name: str, license_number: str, years_experience: str, projects_completed: str) -> List:
+    company_text = f"""
+    <b>{company_name}</b> brings years of experience 
+    in delivering exceptional bathroom renovation projects. Our commitment to quality, precision, and client 
+    satisfaction has established us as a trusted partner in residential renovations.<br/><br/>
+    
+    <b>Our Core Values:</b><br/>
+    • Precision and accuracy in all work phases<br/>
+    • Clear communication throughout the project<br/>
+    • Meeting agreed deadlines and schedules<br/>
+    • Minimizing disruption to your daily routine<br/>
+    • Transparent pricing with no hidden costs<br/>
+    • Quality materials and professional craftsmanship<br/><br/>
+    
+    <b>Professional Credentials:</b><br/>
+    • Licensed Building Contractor: {license_number}<br/>
+    • Fully Insured and Bonded<br/>
+    • Certificate IV in Building and Construction<br/>
+    • Over {years_experience} years of specialized experience<br/>
+    • {projects_completed} successful projects completed<br/><br/>
+    
+    We utilize advanced project management techniques and the latest tools, including our proprietary 
+    <b>Bathroom Quote Saver.AI</b> system, to ensure accurate pricing and efficient project execution.
+    """
+    return [
+        Paragraph("ABOUT OUR COMPANY", STYLES['SectionHeader']),
+        Paragraph(company_text, STYLES['ProfessionalBody']),
+    ]
+
+
+@lru_cache(maxsize=64)
+def _contact_info_template(contact_name: str, phone: str, email: str, license_number: str) -> List:
+    contact_text = f"""
+    <b>Project Manager:</b> {contact_name}<br/>
+    <b>Phone:</b> {phone}<br/>
+    <b>Email:</b> {email}<br/>
+    <b>License Number:</b> {license_number}<br/><br/>
+    
+    <b>Business Hours:</b><br/>
+    Monday - Friday: 7:00 AM - 6:00 PM<br/>
+    Saturday: 8:00 AM - 4:00 PM<br/>
+    Sunday: Emergency calls only<br/><br/>
+    
+    We look forward to working with you on this exciting project. Please don't hesitate to contact 
+    us with any questions or to discuss any aspects of this proposal.<br/><br/>
+    
+    <b>Thank you for considering our services for your bathroom renovation project.</b>
+    """
+    return [
+        Paragraph("CONTACT INFORMATION", STYLES['SectionHeader']),
+        Paragraph(contact_text, STYLES['ProfessionalBody']),
+        # Add signature line
+        Spacer(1, 20*mm),
+        Paragraph(
+            "Proposal prepared by: _____________________________ Date: _____________", 
+            STYLES['ProfessionalBody']
+        ),
+    ]
+
+
+class _TocMarker(Flowable):
+    """Zero-size flowable marking the start of a proposal in a merged document"""
+
+    def __init__(self, title: str, key: str):
+        super().__init__()
+        self.title = title
+        self.key = key
+
+    def wrap(self, availWidth, availHeight):
+        return (0, 0)
+
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=0)
+
+
+class _TocDocTemplate(SimpleDocTemplate):
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, _TocMarker):
+            self.notify('TOCEntry', (0, flowable.title, self.page, flowable.key))
+
+
 class BathroomProposalPDF:
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
+        self.styles = STYLES
     
-    def setup_custom_styles(self):
-        """Setup custom styles matching the professional template"""
-        # Title style
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Title'],
-            fontSize=24,
-            textColor=colors.HexColor('#2563eb'),
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Subtitle style
-        self.styles.add(ParagraphStyle(
-            name='CustomSubtitle',
-            parent=self.styles['Normal'],
-            fontSize=16,
-            textColor=colors.HexColor('#1e40af'),
-            spaceAfter=12,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Section header style
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#1e40af'),
-            spaceAfter=12,
-            spaceBefore=20,
-            fontName='Helvetica-Bold',
-            backColor=colors.HexColor('#eff6ff'),
-            borderPadding=8
-        ))
-        
-        # Professional body text
-        self.styles.add(ParagraphStyle(
-            name='ProfessionalBody',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            textColor=colors.HexColor('#374151'),
-            spaceAfter=8,
-            alignment=TA_JUSTIFY,
-            fontName='Helvetica'
-        ))
-        
-        # Task list style
-        self.styles.add(ParagraphStyle(
-            name='TaskList',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#4b5563'),
-            spaceAfter=4,
-            leftIndent=20,
-            fontName='Helvetica'
-        ))
-
-    def create_proposal(self, quote_data: Dict[str, Any], user_profile: Dict[str, Any]) -> bytes:
-        """Generate a complete professional proposal PDF"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
+    def _new_document(self, output, doc_class=SimpleDocTemplate):
+        return doc_class(
+            output,
             pagesize=A4,
             rightMargin=25*mm,
             leftMargin=25*mm,
             topMargin=25*mm,
             bottomMargin=25*mm
         )
-        
+    
+    def build_story(self, quote_data: Dict[str, Any], user_profile: Dict[str, Any]) -> List:
+        """Flowables for a single proposal"""
         story = []
         
         # Cover Page
@@ -112,10 +308,50 @@ class BathroomProposalPDF:
         # Contact Information
         story.extend(self._create_contact_info(user_profile))
         
-        doc.build(story)
+        return story
+    
+    def create_proposal(self, quote_data: Dict[str, Any], user_profile: Dict[str, Any], output=None) -> Optional[bytes]:
+        """Generate a complete professional proposal PDF.
+
+        Written to `output` (a file path or binary file object) when given, otherwise
+        returned as bytes.
+        """
+        if output is not None:
+            self._new_document(output).build(self.build_story(quote_data, user_profile))
+            return None
+        
+        buffer = io.BytesIO()
+        doc = self._new_document(buffer)
+        doc.build(self.build_story(quote_data, user_profile))
         buffer.seek(0)
         return buffer.getvalue()
     
+    def create_batch_proposal(self, proposals: List[Dict[str, Any]], user_profile: Dict[str, Any], output) -> None:
+        """Write several proposals into one PDF, preceded by a table of contents.
+
+        `output` is a file path or writable file object. The table of contents needs
+        page numbers, so the document is laid out in multiple passes (multiBuild).
+        """
+        doc = self._new_document(output, _TocDocTemplate)
+        
+        toc = TableOfContents()
+        toc.levelStyles = [STYLES['TOCEntry']]
+        
+        story = [
+            Paragraph(f"<b>{user_profile.get('company_name', 'Bathroom Quote Saver.AI')}</b>", self.styles['CustomTitle']),
+            Paragraph("RENOVATION PROPOSALS", self.styles['CustomSubtitle']),
+            Spacer(1, 10*mm),
+            toc
+        ]
+        
+        for index, quote_data in enumerate(proposals, start=1):
+            story.append(PageBreak())
+            client_name = (quote_data.get('client_info') or {}).get('name', 'Client')
+            story.append(_TocMarker(f"{index}. {client_name} ({quote_data.get('quote_id', quote_data.get('id', ''))[:8]})", f"proposal-{index}"))
+            story.extend(self.build_story(quote_data, user_profile))
+        
+        doc.multiBuild(story)
+    
     def _create_cover_page(self, quote_data: Dict[str, Any], user_profile: Dict[str, Any]) -> List:
         """Create professional cover page"""
         elements = []
@@ -184,37 +420,12 @@ class BathroomProposalPDF:
     
     def _create_company_overview(self, user_profile: Dict[str, Any]) -> List:
         """Create company overview section"""
-        elements = []
-        
-        elements.append(Paragraph("ABOUT OUR COMPANY", self.styles['SectionHeader']))
-        
-        company_text = f"""
-        <b>{user_profile.get('company_name', 'Professional Bathroom Renovations')}</b> brings years of experience 
-        in delivering exceptional bathroom renovation projects. Our commitment to quality, precision, and client 
-        satisfaction has established us as a trusted partner in residential renovations.<br/><br/>
-        
-        <b>Our Core Values:</b><br/>
-        • Precision and accuracy in all work phases<br/>
-        • Clear communication throughout the project<br/>
-        • Meeting agreed deadlines and schedules<br/>
-        • Minimizing disruption to your daily routine<br/>
-        • Transparent pricing with no hidden costs<br/>
-        • Quality materials and professional craftsmanship<br/><br/>
-        
-        <b>Professional Credentials:</b><br/>
-        • Licensed Building Contractor: {user_profile.get('license_number', 'XXXX-XXXX')}<br/>
-        • Fully Insured and Bonded<br/>
-        • Certificate IV in Building and Construction<br/>
-        • Over {user_profile.get('years_experience', '5')} years of specialized experience<br/>
-        • {user_profile.get('projects_completed', '100+')} successful projects completed<br/><br/>
-        
-        We utilize advanced project management techniques and the latest tools, including our proprietary 
-        <b>Bathroom Quote Saver.AI</b> system, to ensure accurate pricing and efficient project execution.
-        """
-        
-        elements.append(Paragraph(company_text, self.styles['ProfessionalBody']))
-        
-        return elements
+        return _fresh(_company_overview_template(
+            user_profile.get('company_name', 'Professional Bathroom Renovations'),
+            user_profile.get('license_number', 'XXXX-XXXX'),
+            user_profile.get('years_experience', '5'),
+            user_profile.get('projects_completed', '100+')
+        ))
     
     def _create_project_summary(self, quote_data: Dict[str, Any]) -> List:
         """Create project summary section"""
@@ -224,7 +435,7 @@ class BathroomProposalPDF:
         
         # Selected components
         selected_components = []
-        for component, details in quote_data.get('detailed_components', {}).items():
+        for component, details in (quote_data.get('detailed_components') or {}).items():
             if details.get('enabled'):
                 component_name = component.replace('_', ' ').title()
                 selected_components.append(component_name)
@@ -255,62 +466,8 @@ class BathroomProposalPDF:
         """Create detailed scope of works section"""
         elements = []
         
-        elements.append(Paragraph("DETAILED SCOPE OF WORKS", self.styles['SectionHeader']))
-        
-        # Stage 1: Demolition & Preparation
-        elements.append(Paragraph("<b>STAGE 1: DEMOLITION & PREPARATION</b>", 
-                                self.styles['Heading2']))
-        
-        stage1_tasks = [
-            "Site protection and preparation",
-            "Removal of existing fixtures and fittings",
-            "Demolition of wall and ceiling linings (as selected)",
-            "Removal of floor tiles and substrate (as selected)",
-            "Plumbing rough-in modifications",
-            "Electrical rough-in work",
-            "Waste disposal and site cleanup"
-        ]
-        
-        for task in stage1_tasks:
-            elements.append(Paragraph(f"• {task}", self.styles['TaskList']))
-        
-        elements.append(Spacer(1, 10*mm))
-        
-        # Stage 2: Construction & Installation
-        elements.append(Paragraph("<b>STAGE 2: CONSTRUCTION & INSTALLATION</b>", 
-                                self.styles['Heading2']))
-        
-        stage2_tasks = [
-            "Framing and structural modifications",
-            "New wall and ceiling sheet installation",
-            "Plasterboard fixing and finishing",
-            "Waterproofing membrane application",
-            "Tile bed preparation and installation",
-            "Wall and floor tiling (as per specifications)",
-            "Grout and silicone application"
-        ]
-        
-        for task in stage2_tasks:
-            elements.append(Paragraph(f"• {task}", self.styles['TaskList']))
-        
-        elements.append(Spacer(1, 10*mm))
-        
-        # Stage 3: Completion & Handover
-        elements.append(Paragraph("<b>STAGE 3: COMPLETION & HANDOVER</b>", 
-                                self.styles['Heading2']))
-        
-        stage3_tasks = [
-            "Fixture and fitting installation",
-            "Electrical and plumbing connections",
-            "Painting and final finishes",
-            "Accessory installation",
-            "Professional cleaning",
-            "Quality inspection and testing",
-            "Project handover and documentation"
-        ]
-        
-        for task in stage3_tasks:
-            elements.append(Paragraph(f"• {task}", self.styles['TaskList']))
+        # Stage task lists are the same for every proposal
+        elements.extend(_fresh(STAGE_SECTIONS))
         
         # Cost breakdown table
         elements.append(Spacer(1, 15*mm))
@@ -348,73 +505,13 @@ class BathroomProposalPDF:
     
     def _create_terms_conditions(self) -> List:
         """Create terms and conditions section"""
-        elements = []
-        
-        elements.append(Paragraph("TERMS & CONDITIONS", self.styles['SectionHeader']))
-        
-        terms_text = """
-        <b>Payment Terms:</b><br/>
-        • 10% deposit upon acceptance of proposal<br/>
-        • 40% progress payment at completion of Stage 1<br/>
-        • 40% progress payment at completion of Stage 2<br/>
-        • 10% final payment upon project completion<br/><br/>
-        
-        <b>Project Timeline:</b><br/>
-        • Estimated completion: 2-3 weeks from commencement<br/>
-        • Weather and unforeseen circumstances may affect timeline<br/>
-        • Client will be notified of any delays immediately<br/><br/>
-        
-        <b>Warranty & Guarantee:</b><br/>
-        • 12 months warranty on all workmanship<br/>
-        • Manufacturer warranty applies to all supplied products<br/>
-        • 7-year structural warranty where applicable<br/><br/>
-        
-        <b>Variations & Changes:</b><br/>
-        • All variations must be agreed in writing<br/>
-        • Additional costs will be quoted separately<br/>
-        • Client approval required before proceeding with variations<br/><br/>
-        
-        <b>Important Notes:</b><br/>
-        • This proposal is valid for 30 days from issue date<br/>
-        • All work complies with current building codes and regulations<br/>
-        • Permits and approvals are the responsibility of the client<br/>
-        • Access to water and electricity required during construction
-        """
-        
-        elements.append(Paragraph(terms_text, self.styles['ProfessionalBody']))
-        
-        return elements
+        return _fresh(TERMS_SECTION)
     
     def _create_contact_info(self, user_profile: Dict[str, Any]) -> List:
         """Create contact information section"""
-        elements = []
-        
-        elements.append(Paragraph("CONTACT INFORMATION", self.styles['SectionHeader']))
-        
-        contact_text = f"""
-        <b>Project Manager:</b> {user_profile.get('contact_name', 'Professional Team')}<br/>
-        <b>Phone:</b> {user_profile.get('phone', 'Contact for details')}<br/>
-        <b>Email:</b> {user_profile.get('email', 'info@bathroomquotesaver.ai')}<br/>
-        <b>License Number:</b> {user_profile.get('license_number', 'XXXX-XXXX')}<br/><br/>
-        
-        <b>Business Hours:</b><br/>
-        Monday - Friday: 7:00 AM - 6:00 PM<br/>
-        Saturday: 8:00 AM - 4:00 PM<br/>
-        Sunday: Emergency calls only<br/><br/>
-        
-        We look forward to working with you on this exciting project. Please don't hesitate to contact 
-        us with any questions or to discuss any aspects of this proposal.<br/><br/>
-        
-        <b>Thank you for considering our services for your bathroom renovation project.</b>
-        """
-        
-        elements.append(Paragraph(contact_text, self.styles['ProfessionalBody']))
-        
-        # Add signature line
-        elements.append(Spacer(1, 20*mm))
-        elements.append(Paragraph(
-            "Proposal prepared by: _____________________________ Date: _____________", 
-            self.styles['ProfessionalBody']
+        return _fresh(_contact_info_template(
+            user_profile.get('contact_name', 'Professional Team'),
+            user_profile.get('phone', 'Contact for details'),
+            user_profile.get('email', 'info@bathroomquotesaver.ai'),
+            user_profile.get('license_number', 'XXXX-XXXX')
         ))
-        
-        return elements
\ No newline at end of file
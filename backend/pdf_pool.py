@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from pdf_generator import BathroomProposalPDF
+
+logger = logging.getLogger(__name__)
+
+
+class PdfPoolSaturated(Exception):
+    """Raised when every render slot and queue position is taken"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"PDF render pool saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def peak_rss_kib() -> Optional[int]:
+    """High-water mark of this process's resident set size, in KiB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def limit_worker_memory(max_mb: int) -> None:
+    """Process pool initializer: cap the worker's address space.
+
+    Linux does not enforce RLIMIT_RSS, so the cap is on address space, which bounds RSS
+    from above. A render that exceeds it fails with MemoryError in that worker only.
+    """
+    if resource is None or not max_mb:
+        return
+    limit = max_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def render_proposal_file(quote_data: Dict[str, Any], user_profile: Dict[str, Any], path: str) -> Tuple[None, float, Optional[int]]:
+    """Render a proposal straight to `path` in a worker; only the path crosses processes"""
+    started = time.perf_counter()
+    BathroomProposalPDF().create_proposal(quote_data, user_profile, output=path)
+    return None, time.perf_counter() - started, peak_rss_kib()
+
+
+def render_batch_proposal(proposals: List[Dict[str, Any]], user_profile: Dict[str, Any], path: str) -> Tuple[None, float, Optional[int]]:
+    """Render a merged proposal document straight to `path` in a worker"""
+    started = time.perf_counter()
+    BathroomProposalPDF().create_batch_proposal(proposals, user_profile, path)
+    return None, time.perf_counter() - started, peak_rss_kib()
+
+
+class PdfRenderPool:
+    """Runs CPU-bound ReportLab renders off the event loop with a bounded queue.
+
+    At most `max_workers` renders run at once and `max_queue` more may wait; beyond that
+    run() raises PdfPoolSaturated instead of piling more work onto the pool.
+    """
+
+    def __init__(self, executor_kind: str = "process", max_workers: int = 2, max_queue: int = 16, max_rss_mb: int = 0):
+        self.executor_kind = executor_kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_rss_mb = max_rss_mb
+        self._executor = None
+        self._pending = 0
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.out_of_memory = 0
+        self._render_seconds = deque(maxlen=200)
+        self._wait_seconds = deque(maxlen=200)
+        self._peak_rss_kib = deque(maxlen=200)
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor_kind == "process":
+                # spawn rather than fork: the server process runs Motor's background threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=limit_worker_memory,
+                    initargs=(self.max_rss_mb,)
+                )
+            elif self.executor_kind == "thread":
+                # Threads share the server's memory, so the memory cap cannot apply here
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdf-render")
+            else:
+                raise ValueError(f"Unknown PDF_RENDER_EXECUTOR: {self.executor_kind}")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.max_workers)
+
+    def _retry_after(self) -> int:
+        average = sum(self._render_seconds) / len(self._render_seconds) if self._render_seconds else 1.0
+        return max(1, math.ceil(average * (self.queue_depth + 1) / self.max_workers))
+
+    async def run(self, func, *args):
+        """Run `func(*args)` on the pool; `func` must return (result, render_seconds, peak_rss_kib)"""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PdfPoolSaturated(self._retry_after())
+
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, render_seconds, peak_rss = await loop.run_in_executor(self._get_executor(), func, *args)
+        except (MemoryError, BrokenProcessPool) as e:
+            self.failed += 1
+            self.out_of_memory += 1
+            if isinstance(e, BrokenProcessPool):
+                # A worker died outright; start a fresh pool for the next render
+                logger.warning("PDF render worker died, recreating the pool")
+                self.shutdown()
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        self.rendered += 1
+        self._render_seconds.append(render_seconds)
+        self._wait_seconds.append(time.perf_counter() - submitted - render_seconds)
+        if peak_rss is not None:
+            self._peak_rss_kib.append(peak_rss)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        def summary(samples):
+            if not samples:
+                return {"avg_ms": None, "p95_ms": None}
+            ordered = sorted(samples)
+            return {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+            }
+
+        return {
+            "executor": self.executor_kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(self._pending, self.max_workers),
+            "queue_depth": self.queue_depth,
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "out_of_memory": self.out_of_memory,
+            "render_time": summary(self._render_seconds),
+            "queue_wait": summary(self._wait_seconds),
+            # Worker RSS high-water marks reported after each render (the server's own in thread mode)
+            "peak_rss_mb": round(max(self._peak_rss_kib) / 1024, 1) if self._peak_rss_kib else None,
+            "max_rss_mb": (self.max_rss_mb or None) if self.executor_kind == "process" else None,
+        }
+
+
+def create_pdf_render_pool() -> PdfRenderPool:
+    """Build the render pool configured by PDF_RENDER_* environment variables"""
+    return PdfRenderPool(
+        executor_kind=os.environ.get('PDF_RENDER_EXECUTOR', 'process').lower(),
+        max_workers=int(os.environ.get('PDF_RENDER_WORKERS', os.cpu_count() or 2)),
+        max_queue=int(os.environ.get('PDF_RENDER_MAX_QUEUE', 16)),
+        max_rss_mb=int(os.environ.get('PDF_RENDER_MAX_RSS_MB', 1024)),
+    )
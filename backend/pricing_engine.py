@@ -0,0 +1,398 @@
+import math
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from quote_cache import extract_region
+
+# Versioned rate tables (AUD, supply + install). Never edit a published version in place -
+# add a new one so stored quotes can always be traced back to the rates that produced them.
+#
+# components: base cost per component = fixed + per_floor_sqm * floor area + per_wall_sqm * wall area
+# subtasks:   add-on per selected sub-task, either a flat amount or an area rate
+# options:    pricing for every task_options field (see OPTION_RULES for how each is applied)
+RATE_TABLES: Dict[str, Dict[str, Any]] = {
+    "2025.1": {
+        "range": {"min": 0.85, "max": 1.2},
+        "regional_factors": {
+            "NSW": 1.08, "VIC": 1.03, "QLD": 0.98, "WA": 1.02,
+            "SA": 0.95, "TAS": 0.93, "ACT": 1.06, "NT": 1.10,
+        },
+        "components": {
+            "demolition": {"fixed": 800, "per_floor_sqm": 90, "per_wall_sqm": 20},
+            "framing": {"fixed": 600, "per_wall_sqm": 35},
+            "plumbing_rough_in": {"fixed": 1800},
+            "electrical_rough_in": {"fixed": 900},
+            "plastering": {"fixed": 400, "per_wall_sqm": 30},
+            "waterproofing": {"fixed": 450, "per_floor_sqm": 65, "per_wall_sqm": 12},
+            "tiling": {"fixed": 500},
+            "shower_screens": {"fixed": 250},
+            "pc_items_tile_supply": {"fixed": 0},
+            "fit_off": {"fixed": 650},
+        },
+        "subtasks": {
+            "demolition": {
+                "removal_internal_ware": 450,
+                "removal_wall_linings": {"per_wall_sqm": 18},
+                "removal_ceiling_linings": {"per_floor_sqm": 15},
+                "removal_ground_tiles_screed": {"per_floor_sqm": 45},
+                "removal_old_substrate": {"per_floor_sqm": 30},
+                "asbestos_removal": 2200,
+            },
+            "framing": {
+                "internal_wall_rectification": {"per_wall_sqm": 20},
+                "recessed_mirror_cabinet": 380,
+                "new_window_framing": 650,
+                "subfloor_replacement": {"per_floor_sqm": 140},
+            },
+            "plumbing_rough_in": {
+                "make_good_existing_feeds": 350,
+                "new_inlet_feed_toilet": 420,
+                "bath_inwall_mixer_outlet": 480,
+                "basin_mixer_inwall": 420,
+                "shower_outlet": 380,
+                "floor_waste": 320,
+                "new_stack_work": 1400,
+                "concrete_cutting_slab": 950,
+                "rain_head_shower": 520,
+                "inwall_cistern": 780,
+                "wall_hung_toilet": 850,
+                "vanity_install": 300,
+            },
+            "electrical_rough_in": {
+                "make_safe_old_wiring": 220,
+                "four_in_one_combo": 480,
+                "led_strip_lighting": 420,
+                "wall_lights": 260,
+                "downlight": 140,
+                "separate_extraction_fan": 380,
+                "underfloor_heating": {"per_floor_sqm": 160},
+                "lighting_switching": 180,
+            },
+            "plastering": {
+                "supply_install_ceiling_sheets": {"per_floor_sqm": 48},
+                "supply_install_wall_sheets": {"per_wall_sqm": 42},
+                "supply_compounds_finishing": {"per_wall_sqm": 12},
+                "top_coat_ceilings": {"per_floor_sqm": 10},
+            },
+            "waterproofing": {
+                "shower_waterproofing": 450,
+                "floor_waterproofing": {"per_floor_sqm": 35},
+                "wall_waterproofing": {"per_wall_sqm": 18},
+                "membrane_application": {"per_floor_sqm": 20},
+                "corner_sealing": 120,
+                "penetration_sealing": 90,
+                "compliance_certification": 250,
+            },
+            "tiling": {
+                "supply_install_sand_cement_bed": {"per_floor_sqm": 55},
+                "supply_install_floor_tiles": {"per_floor_sqm": 95},
+                "supply_install_wall_tiles": {"per_tiled_wall_sqm": 85},
+                "supply_install_shower_niche": 420,
+                "supply_install_bath_niche": 420,
+                "supply_install_nib_walls": 380,
+                "supply_grout_silicone": {"per_floor_sqm": 12},
+                "supply_install_shower_hob": 350,
+                "supply_install_bath_hob": 420,
+                "supply_install_feature_wall": {"per_feature_wall_sqm": 110},
+            },
+            "shower_screens": {
+                "fixed_panel_install": 650,
+                "shower_curtain": 120,
+            },
+            "pc_items_tile_supply": {
+                "pc_items_accessories": 450,
+            },
+            "fit_off": {
+                "accessories_install": 280,
+                "site_clean": 250,
+                "builders_clean": 450,
+                "painting": {"per_floor_sqm": 35},
+            },
+        },
+        "options": {
+            "skip_bin_size": {"4 meter bin": 420, "5 meter bin": 480, "6 meter bin": 550, "9 meter bin": 720, "12 meter bin": 890},
+            "build_niches_quantity": 380,
+            "swing_door_size": {"720mm": 520, "770mm": 560, "820mm": 600},
+            "cavity_sliding_size": {"720mm": 1150, "770mm": 1200, "820mm": 1260},
+            "water_feeds_type": {"single": 380, "double": 720, "triple": 1050},
+            "power_points_quantity": 165,
+            "plasterboard_grade": {"standard": 1.0, "moisture_resistant": 1.12, "fire_rated": 1.2, "acoustic": 1.28},
+            "cornice_type": {"standard": 14, "premium": 19, "decorative": 28, "shadowline": 36},
+            "floor_tile_grade": {
+                "budget_ceramic": 30, "standard_ceramic": 45, "premium_ceramic": 70,
+                "porcelain": 85, "natural_stone": 140, "luxury_stone": 220,
+            },
+            "wall_tile_grade": {
+                "budget_ceramic": 28, "standard_ceramic": 42, "premium_ceramic": 65,
+                "porcelain": 80, "subway_tile": 60, "mosaic": 120,
+            },
+            "feature_tile_grade": {
+                "premium": 90, "designer_porcelain": 130, "natural_stone": 160,
+                "marble": 240, "mosaic_feature": 180, "textured_stone": 150,
+            },
+            "tile_size": {
+                "300x300mm": 1.0, "400x400mm": 1.0, "600x600mm": 1.08,
+                "800x800mm": 1.18, "300x600mm": 1.05, "450x900mm": 1.15,
+            },
+            "vanity_grade": {"budget": 1000, "standard": 1600, "premium": 2750, "luxury": 4200},
+            "toilet_grade": {"budget": 500, "standard": 750, "premium": 1200, "designer": 1900},
+            "shower_screen_grade": {"standard": 750, "semi_frameless": 1150, "frameless": 1800, "premium_frameless": 2700},
+            "tapware_grade": {"budget": 450, "standard": 900, "premium": 1600, "luxury": 2600},
+            "lighting_grade": {"budget": 300, "standard": 600, "premium": 1150, "designer": 1900},
+            "mirror_grade": {"basic_mirror": 220, "standard_cabinet": 450, "premium_cabinet": 900, "luxury_cabinet": 1500},
+            "tiles_supply_grade": {"standard": 0.15, "premium_service": 0.20, "full_service": 0.25},
+        },
+    },
+}
+
+# States with a regional factor; learned corrections are keyed on these (or "*" for any region)
+STATES = {state for table in RATE_TABLES.values() for state in table["regional_factors"]}
+
+DEFAULT_RATE_TABLE_VERSION = os.environ.get('PRICING_RATE_TABLE_VERSION', '2025.1')
+
+# How each task option is priced.
+#   component: the breakdown line the option belongs to
+#   subtask:   sub-task that must be selected for the option to apply (when detailed components are sent)
+#   fallback:  line used for requests that only send the eight legacy component flags
+#   kind:      lookup (flat price per value), per_unit (quantity x rate), amount (pass-through),
+#              per_lineal_metre (price per metre of room perimeter), tile_supply (price per m2 of area),
+#              multiplier (scales the line), markup (percentage of tile supply cost)
+OPTION_RULES = {
+    "skip_bin_size": {"component": "demolition", "subtask": "supply_skip_bin", "kind": "lookup", "label": "Skip bin"},
+    "build_niches_quantity": {"component": "framing", "subtask": "build_niches", "kind": "per_unit", "label": "Niches"},
+    "swing_door_size": {"component": "framing", "subtask": "swing_door_materials", "kind": "lookup", "label": "Swing door"},
+    "cavity_sliding_size": {"component": "framing", "subtask": "cavity_sliding_unit", "kind": "lookup", "label": "Cavity sliding unit"},
+    "minor_costs_amount": {"component": "framing", "subtask": "additional_costs_allowance", "kind": "amount", "label": "Additional costs allowance"},
+    "water_feeds_type": {"component": "plumbing_rough_in", "subtask": "water_feeds_quantity", "kind": "lookup", "label": "Water feeds"},
+    "power_points_quantity": {"component": "electrical_rough_in", "subtask": "power_points_quantity", "kind": "per_unit", "label": "Power points"},
+    "plasterboard_grade": {"component": "plastering", "subtask": None, "kind": "multiplier", "label": "Plasterboard grade"},
+    "cornice_type": {"component": "plastering", "subtask": "supply_install_cornice", "kind": "per_lineal_metre", "label": "Cornice"},
+    "floor_tile_grade": {"component": "tiling", "subtask": "supply_install_floor_tiles", "kind": "tile_supply", "area": "floor", "label": "Floor tiles"},
+    "wall_tile_grade": {"component": "tiling", "subtask": "supply_install_wall_tiles", "kind": "tile_supply", "area": "tiled_wall", "label": "Wall tiles"},
+    "feature_tile_grade": {"component": "tiling", "subtask": "supply_install_feature_wall", "kind": "tile_supply", "area": "feature_wall", "label": "Feature tiles"},
+    "tile_size": {"component": "tiling", "subtask": None, "kind": "multiplier", "label": "Tile size"},
+    "vanity_grade": {"component": "pc_items_tile_supply", "subtask": "pc_items_vanity_basin", "fallback": "fit_off", "kind": "lookup", "label": "Vanity"},
+    "toilet_grade": {"component": "pc_items_tile_supply", "subtask": "pc_items_toilet_cistern", "fallback": "fit_off", "kind": "lookup", "label": "Toilet"},
+    "shower_screen_grade": {"component": "shower_screens", "subtask": None, "fallback": "fit_off", "kind": "lookup", "label": "Shower screen"},
+    "tapware_grade": {"component": "pc_items_tile_supply", "subtask": "pc_items_tapware", "fallback": "fit_off", "kind": "lookup", "label": "Tapware"},
+    "lighting_grade": {"component": "pc_items_tile_supply", "subtask": "pc_items_lighting", "fallback": "fit_off", "kind": "lookup", "label": "Lighting"},
+    "mirror_grade": {"component": "pc_items_tile_supply", "subtask": "pc_items_mirror_cabinet", "fallback": "fit_off", "kind": "lookup", "label": "Mirror/cabinet"},
+    "tiles_supply_grade": {"component": "pc_items_tile_supply", "subtask": "tiles_supply_coordination", "fallback": "tiling", "kind": "markup", "label": "Tiles supply service"},
+}
+
+# Shower screen subtasks that are priced by shower_screen_grade rather than a flat rate
+SCREEN_ENCLOSURE_SUBTASKS = {"frameless_shower_enclosure", "semi_frameless_shower_enclosure"}
+
+# Options applied after all additive pricing on their line
+DEFERRED_KINDS = {"multiplier", "markup"}
+
+
+def rate_table_versions():
+    return sorted(RATE_TABLES)
+
+
+def get_rate_table(version: Optional[str] = None) -> Dict[str, Any]:
+    version = version or DEFAULT_RATE_TABLE_VERSION
+    if version not in RATE_TABLES:
+        raise ValueError(f"Unknown rate table version: {version}")
+    return RATE_TABLES[version]
+
+
+def correction_region(region: Optional[str]) -> str:
+    """State a region from extract_region() is corrected under, or "*" when it has none"""
+    state = (region or '').split(' ')[0].upper()
+    return state if state in STATES else "*"
+
+
+def validate_task_options(options: Optional[Dict[str, Any]], version: Optional[str] = None) -> None:
+    """Raise ValueError for a task option value the rate tables cannot price"""
+    rates = get_rate_table(version)["options"]
+    for option, rule in OPTION_RULES.items():
+        value = (options or {}).get(option)
+        if not value:
+            continue
+        if rule["kind"] in ("per_unit", "amount"):
+            number = None
+            if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+                try:
+                    number = float(value)
+                except ValueError:
+                    pass
+            if number is None or not math.isfinite(number) or number < 0:
+                raise ValueError(f"Task option {option} must be a non-negative number, not {value!r}")
+        elif not isinstance(value, str) or value not in rates[option]:
+            raise ValueError(f"Task option {option} must be one of {', '.join(rates[option])}, not {value!r}")
+
+
+def _room_geometry(measurements, tiled_wall_fraction: float) -> Dict[str, float]:
+    length, width, height = measurements.length, measurements.width, measurements.height
+    wall = 2 * (length + width) * height
+    return {
+        "floor": length * width,
+        "wall": wall,
+        "tiled_wall": wall * tiled_wall_fraction,
+        "feature_wall": max(length, width) * height,
+        "perimeter": 2 * (length + width),
+    }
+
+
+def _selected_scope(request) -> Dict[str, Optional[set]]:
+    """Map each selected component to its selected subtasks (None when only legacy flags were sent)"""
+    if request.detailed_components:
+        return {
+            component: {k for k, v in details.get('subtasks', {}).items() if v}
+            for component, details in request.detailed_components.items()
+            if isinstance(details, dict) and details.get('enabled')
+        }
+    return {component: None for component, enabled in request.components.dict().items() if enabled}
+
+
+def _area_rate(rate, geometry: Dict[str, float]) -> float:
+    if isinstance(rate, dict):
+        return sum(value * geometry[key[len('per_'):-len('_sqm')]] for key, value in rate.items() if key.startswith('per_'))
+    return rate
+
+
+def _option_target(rule: Dict[str, Any], scope: Dict[str, Optional[set]]) -> Optional[str]:
+    """Breakdown line an option is priced on, or None when the option does not apply"""
+    component = rule["component"]
+    subtasks = scope.get(component)
+    if component in scope and subtasks is not None:
+        if rule["subtask"] is None or rule["subtask"] in subtasks:
+            return component
+        return None
+
+    # Legacy request without sub-task detail: price on the owning (or fallback) component if selected
+    for candidate in (component, rule.get("fallback")):
+        if candidate in scope and scope[candidate] is None:
+            return candidate
+    return None
+
+
+def estimate_quote(request, version: Optional[str] = None,
+                   corrections: Optional[Dict[Tuple[str, str], float]] = None) -> Dict[str, Any]:
+    """Price a RenovationQuoteRequest from the rate tables.
+
+    Returns the same shape the LLM path produces (total_cost, breakdown, analysis,
+    confidence) plus the rate table version used. `corrections` maps (component, state)
+    to a factor learned from cost adjustments; ("component", "*") applies to any state.
+    """
+    version = version or DEFAULT_RATE_TABLE_VERSION
+    table = get_rate_table(version)
+    validate_task_options(request.task_options, version)
+    scope = _selected_scope(request)
+
+    tiling_subtasks = scope.get("tiling") or set()
+    tiled_wall_fraction = 0.5 if "supply_install_half_height" in tiling_subtasks and "supply_install_floor_ceiling" not in tiling_subtasks else 1.0
+    geometry = _room_geometry(request.room_measurements, tiled_wall_fraction)
+
+    lines: Dict[str, Dict[str, Any]] = {}
+    for component, subtasks in scope.items():
+        base = table["components"].get(component)
+        if base is None:
+            continue
+        cost = base.get("fixed", 0) + _area_rate(base, geometry)
+        notes = [f"base ${cost:,.0f}"]
+
+        subtask_rates = table["subtasks"].get(component, {})
+        for subtask in sorted(subtasks or ()):
+            rate = subtask_rates.get(subtask)
+            if rate is None:
+                continue
+            amount = _area_rate(rate, geometry)
+            cost += amount
+            notes.append(f"{subtask.replace('_', ' ')} ${amount:,.0f}")
+        lines[component] = {"cost": cost, "tile_supply": 0.0, "notes": notes}
+
+    options = request.task_options or {}
+    deferred = []
+    for option, rule in OPTION_RULES.items():
+        value = options.get(option)
+        if not value:
+            continue
+        target = _option_target(rule, scope)
+        if target is None or target not in lines:
+            continue
+        if target == "shower_screens" and scope[target] is not None and not scope[target] & SCREEN_ENCLOSURE_SUBTASKS:
+            # Only enclosures are priced by screen grade; panels and curtains have flat rates
+            continue
+        if rule["kind"] in DEFERRED_KINDS:
+            deferred.append((option, rule, target, value))
+            continue
+
+        line = lines[target]
+        rates = table["options"].get(option)
+        if rule["kind"] == "lookup":
+            amount = rates[value]
+            note = f"{rule['label']} {value} ${amount:,.0f}"
+        elif rule["kind"] == "per_unit":
+            quantity = int(float(value))
+            amount = quantity * rates
+            note = f"{rule['label']} x{quantity} ${amount:,.0f}"
+        elif rule["kind"] == "amount":
+            amount = float(value)
+            note = f"{rule['label']} ${amount:,.0f}"
+        elif rule["kind"] == "per_lineal_metre":
+            amount = rates[value] * geometry["perimeter"]
+            note = f"{rule['label']} {value} {geometry['perimeter']:.1f}lm ${amount:,.0f}"
+        elif rule["kind"] == "tile_supply":
+            amount = rates[value] * geometry[rule["area"]]
+            line["tile_supply"] += amount
+            note = f"{rule['label']} {value.replace('_', ' ')} {geometry[rule['area']]:.1f}m² ${amount:,.0f}"
+        else:
+            raise ValueError(f"Unknown option kind: {rule['kind']}")
+
+        line["cost"] += amount
+        line["notes"].append(note)
+
+    for option, rule, target, value in deferred:
+        line = lines[target]
+        rates = table["options"].get(option)
+        factor = rates[value]
+        if rule["kind"] == "multiplier":
+            # Scale labour only; tile supply is priced per m2 regardless of grade or size
+            labour = line["cost"] - line["tile_supply"]
+            line["cost"] = labour * factor + line["tile_supply"]
+            line["notes"].append(f"{rule['label']} {value.replace('_', ' ')} x{factor:.2f}")
+        else:
+            tile_supply = sum(item["tile_supply"] for item in lines.values())
+            amount = tile_supply * factor
+            line["cost"] += amount
+            line["notes"].append(f"{rule['label']} {value.replace('_', ' ')} {factor:.0%} of ${tile_supply:,.0f}")
+
+    region = extract_region(request.client_info.address)
+    regional_factor = table["regional_factors"].get(region.split(' ')[0], 1.0)
+    range_min, range_max = table["range"]["min"], table["range"]["max"]
+    state = correction_region(region)
+    corrections = corrections or {}
+
+    breakdown = []
+    corrected = 0
+    for component, line in lines.items():
+        cost = line["cost"] * regional_factor
+        correction = corrections.get((component, state)) or corrections.get((component, "*"))
+        if correction:
+            cost *= correction
+            line["notes"].append(f"learned correction x{correction:.2f}")
+            corrected += 1
+        breakdown.append({
+            "component": component.replace('_', ' ').title(),
+            "estimated_cost": round(cost),
+            "cost_range_min": round(cost * range_min),
+            "cost_range_max": round(cost * range_max),
+            "notes": "; ".join(line["notes"]),
+            "correction_factor": correction
+        })
+
+    return {
+        "total_cost": sum(item["estimated_cost"] for item in breakdown),
+        "breakdown": breakdown,
+        "analysis": (
+            f"Instant estimate from rate table {version} for a {geometry['floor']:.1f}m² bathroom "
+            f"({geometry['wall']:.1f}m² wall area) with {len(breakdown)} components, priced from the selected "
+            f"sub-tasks and task options. Regional factor {regional_factor:.2f} applied for {region or 'unknown region'}."
+            + (f" Corrections learned from past adjustments applied to {corrected} components." if corrected else "")
+        ),
+        "confidence": "Medium",
+        "rate_table_version": version
+    }
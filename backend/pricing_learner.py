@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from pricing_engine import correction_region
+from quote_cache import extract_region
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = "state"
+ALL_REGIONS = "*"
+
+# Adjusted/estimated ratios outside this range are treated as typos, not pricing signal
+RATIO_LIMITS = (0.2, 5.0)
+# Learned factors are clamped so a run of odd adjustments cannot swing prices wildly
+FACTOR_LIMITS = (0.75, 1.35)
+
+
+def component_key(name: str) -> str:
+    """Breakdown label ("Plumbing Rough In") back to its rate table key ("plumbing_rough_in")"""
+    return re.sub(r'[^a-z0-9]+', '_', (name or '').lower()).strip('_')
+
+
+def _cell(component: str, region: str) -> str:
+    return f"{component}|{region}"
+
+
+class PricingCorrectionLearner:
+    """Turns human cost adjustments into per-component/per-region correction factors.
+
+    Each run reads only the adjustments added since the stored watermark, joins them to
+    their quotes and requests in one $in query each, and folds them into running sums
+    (sample count and sum of log ratios per cell). The state document is the same size
+    however much history there is, so a run costs O(new adjustments).
+
+    The resulting factors live in `corrections`, a plain dict the pricing engine reads on
+    every quote without touching the database. Several processes can run the learner: the
+    state is written with compare-and-set on its version, and a process that loses the race
+    simply picks up the winner's table on its next run.
+    """
+
+    def __init__(self, db, interval_seconds: float = 300, batch_size: int = 500,
+                 min_samples: int = 5, prior_samples: float = 5, settle_seconds: float = 5):
+        self.state_collection = db.pricing_corrections
+        self.adjustments = db.cost_adjustments
+        self.quotes = db.quotes
+        self.requests = db.quote_requests
+        self.revisions = db.quote_revisions
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.min_samples = min_samples
+        self.prior_samples = prior_samples
+        # Adjustments younger than this are left for the next run, so one committed late
+        # with an earlier created_at is not skipped by a watermark that already passed it
+        self.settle_seconds = settle_seconds
+        self.corrections: Dict[Tuple[str, str], float] = {}
+        self.cells = 0
+        self.runs = 0
+        self.processed = 0
+        self.skipped = 0
+        self.conflicts = 0
+        self.errors = 0
+        self.last_run_at = None
+        self.last_run_seconds = None
+        self.watermark = None
+        self._task = None
+
+    def start(self) -> None:
+        if self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                # A full batch means there is a backlog; keep going until it is drained
+                while await self.run_once() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Pricing correction run failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _load_state(self) -> Dict[str, Any]:
+        state = await self.state_collection.find_one({"_id": STATE_ID})
+        if state is None:
+            state = {"_id": STATE_ID, "version": 0, "watermark": None, "cells": {}}
+            try:
+                await self.state_collection.insert_one(dict(state))
+            except DuplicateKeyError:
+                state = await self.state_collection.find_one({"_id": STATE_ID})
+        return state
+
+    async def run_once(self) -> int:
+        """Fold new adjustments into the correction table; returns how many were read"""
+        started = time.perf_counter()
+        state = await self._load_state()
+        cells = state.get("cells") or {}
+        watermark = state.get("watermark")
+
+        settled = datetime.now(timezone.utc) - timedelta(seconds=self.settle_seconds)
+        query: Dict[str, Any] = {"created_at": {"$lte": settled}}
+        if watermark:
+            query["$or"] = [
+                {"created_at": {"$gt": watermark["created_at"]}},
+                {"created_at": watermark["created_at"], "id": {"$gt": watermark["id"]}},
+            ]
+        batch = await self.adjustments.find(
+            query, {"_id": 0, "id": 1, "quote_id": 1, "component_adjustments": 1, "created_at": 1}
+        ).sort([("created_at", 1), ("id", 1)]).limit(self.batch_size).to_list(self.batch_size)
+
+        used = 0
+        if batch:
+            used = await self._fold(batch, cells)
+            last = batch[-1]
+            result = await self.state_collection.update_one(
+                {"_id": STATE_ID, "version": state.get("version", 0)},
+                {"$set": {
+                    "cells": cells,
+                    "watermark": {"created_at": last["created_at"], "id": last["id"]},
+                    "updated_at": datetime.now(timezone.utc),
+                }, "$inc": {"version": 1}},
+            )
+            if result.matched_count == 0:
+                # Another process advanced the state first; its table is picked up next run
+                self.conflicts += 1
+                return 0
+            watermark = {"created_at": last["created_at"], "id": last["id"]}
+            self.processed += used
+            self.skipped += len(batch) - used
+
+        self._publish(cells)
+        self.watermark = watermark
+        self.runs += 1
+        self.last_run_at = datetime.now(timezone.utc)
+        self.last_run_seconds = round(time.perf_counter() - started, 3)
+        return len(batch)
+
+    async def _fold(self, batch: List[Dict[str, Any]], cells: Dict[str, Dict[str, float]]) -> int:
+        """Add each adjustment's per-component ratios to `cells`; returns how many were usable"""
+        quote_ids = list({adjustment.get("quote_id") for adjustment in batch if adjustment.get("quote_id")})
+        quotes = {
+            quote["id"]: quote
+            for quote in await self.quotes.find(
+                {"id": {"$in": quote_ids}},
+                {"_id": 0, "id": 1, "request_id": 1, "cost_breakdown": 1, "rate_table_version": 1},
+            ).to_list(None)
+        }
+        request_ids = list({quote["request_id"] for quote in quotes.values() if quote.get("request_id")})
+        addresses = {
+            request["id"]: (request.get("client_info") or {}).get("address")
+            for request in await self.requests.find(
+                {"id": {"$in": request_ids}}, {"_id": 0, "id": 1, "client_info.address": 1}
+            ).to_list(None)
+        }
+        # Adjusted quotes keep their priced breakdown as revision 0; the quote itself may
+        # already show later adjustments, so learn against the original where it is logged
+        originals = {
+            event["quote_id"]: event["cost_breakdown"]
+            for event in await self.revisions.find(
+                {"quote_id": {"$in": quote_ids}, "revision": 0}, {"_id": 0, "quote_id": 1, "cost_breakdown": 1}
+            ).to_list(None)
+        }
+
+        used = 0
+        for adjustment in batch:
+            quote = quotes.get(adjustment.get("quote_id"))
+            # Only quotes priced from the rate tables say anything about the rate tables
+            if not quote or not quote.get("rate_table_version") or not adjustment.get("component_adjustments"):
+                continue
+            region = correction_region(extract_region(addresses.get(quote.get("request_id"))))
+            breakdown = originals.get(quote["id"]) or quote.get("cost_breakdown") or []
+            samples = 0
+            for index, adjusted in adjustment["component_adjustments"].items():
+                try:
+                    line = breakdown[int(index)]
+                    adjusted = float(adjusted)
+                except (ValueError, TypeError, IndexError):
+                    continue
+                # Learn against the uncorrected price so factors do not compound
+                baseline = line["estimated_cost"] / (line.get("correction_factor") or 1.0)
+                if baseline <= 0:
+                    continue
+                ratio = adjusted / baseline
+                if not RATIO_LIMITS[0] <= ratio <= RATIO_LIMITS[1]:
+                    continue
+                component = component_key(line["component"])
+                for key in {_cell(component, region), _cell(component, ALL_REGIONS)}:
+                    cell = cells.setdefault(key, {"n": 0, "sum_log": 0.0})
+                    cell["n"] += 1
+                    cell["sum_log"] += math.log(ratio)
+                samples += 1
+            if samples:
+                used += 1
+        return used
+
+    def _publish(self, cells: Dict[str, Dict[str, float]]) -> None:
+        corrections = {}
+        for key, cell in cells.items():
+            if cell["n"] < self.min_samples:
+                continue
+            component, region = key.split('|', 1)
+            # Shrink towards 1.0 with `prior_samples` pseudo-observations of "no correction"
+            factor = math.exp(cell["sum_log"] / (cell["n"] + self.prior_samples))
+            corrections[(component, region)] = round(min(max(factor, FACTOR_LIMITS[0]), FACTOR_LIMITS[1]), 3)
+        self.corrections = corrections
+        self.cells = len(cells)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "conflicts": self.conflicts,
+            "errors": self.errors,
+            "cells": self.cells,
+            "active_corrections": len(self.corrections),
+            "watermark": self.watermark,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": self.last_run_seconds,
+        }
+
+
+def create_pricing_learner(db) -> PricingCorrectionLearner:
+    """Build the learner configured by PRICING_LEARNER_* (interval 0 disables it)"""
+    return PricingCorrectionLearner(
+        db,
+        interval_seconds=float(os.environ.get('PRICING_LEARNER_INTERVAL_SECONDS', 300)),
+        batch_size=int(os.environ.get('PRICING_LEARNER_BATCH_SIZE', 500)),
+        min_samples=int(os.environ.get('PRICING_CORRECTION_MIN_SAMPLES', 5)),
+    )
@@ -0,0 +1,39 @@
+from typing import Any, Dict, Optional
+
+# saved_projects -> quotes -> quote_requests joined server-side; both $lookup stages hit the
+# unique `id` indexes on the foreign collections.
+PROJECT_QUOTE_PIPELINE = [
+    {"$lookup": {"from": "quotes", "localField": "quote_id", "foreignField": "id", "as": "quote"}},
+    {"$unwind": {"path": "$quote", "preserveNullAndEmptyArrays": True}},
+    {"$lookup": {"from": "quote_requests", "localField": "quote.request_id", "foreignField": "id", "as": "request"}},
+    {"$unwind": {"path": "$request", "preserveNullAndEmptyArrays": True}},
+    {"$project": {"_id": 0, "quote._id": 0, "request._id": 0}},
+]
+
+
+async def fetch_project_quote(db, project_id: str, by: str = "id") -> Optional[Dict[str, Any]]:
+    """Project, quote and request for a saved project in a single round trip.
+
+    The project is matched on `by`; pass "quote_id" to find it from its quote. Returns None
+    when the project does not exist; `quote` / `request` are None when missing.
+    """
+    pipeline = [{"$match": {by: project_id}}, {"$limit": 1}, *PROJECT_QUOTE_PIPELINE]
+    docs = await db.saved_projects.aggregate(pipeline).to_list(1)
+    if not docs:
+        return None
+
+    project = docs[0]
+    quote = project.pop("quote", None)
+    request = project.pop("request", None)
+    return {"project": project, "quote": quote, "request": request}
+
+
+async def fetch_project_quote_sequential(db, project_id: str) -> Optional[Dict[str, Any]]:
+    """Previous three-round-trip read path, kept for benchmarking against fetch_project_quote"""
+    project = await db.saved_projects.find_one({"id": project_id}, {"_id": 0})
+    if not project:
+        return None
+
+    quote = await db.quotes.find_one({"id": project["quote_id"]}, {"_id": 0})
+    request = await db.quote_requests.find_one({"id": quote.get("request_id")}, {"_id": 0}) if quote else None
+    return {"project": project, "quote": quote, "request": request}
@@ -0,0 +1,258 @@
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Part of the quote cache key: bump whenever the wording or layout of either prompt changes
+PROMPT_VERSION = "3"
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', 1500))
+
+# Everything that is the same for every quote lives in the system message, so it is sent as
+# an identical prefix on each call and can be served from the provider's prompt cache.
+SYSTEM_PROMPT = """You are an expert bathroom renovation cost estimator with extensive knowledge of construction costs, labor rates, and material pricing.
+
+Your role is to provide accurate cost estimates for bathroom renovations based on:
+- Room dimensions and square footage
+- Selected renovation components (demolition, framing, plumbing, electrical, plastering, waterproofing, tiling, fit off)
+- Regional pricing variations
+- Current market rates for materials and labor
+
+Provide detailed breakdowns with cost ranges and explain your reasoning. Always consider:
+- Complexity factors that might affect pricing
+- Quality levels of materials and finishes
+- Labor intensity of each component
+- Potential complications or additional work needed
+
+IMPORTANT: Use the detailed sub-tasks to provide more accurate pricing. Each selected sub-task should influence the cost estimate for that component. Consider:
+- Complexity of selected sub-tasks
+- Labor time for specific tasks
+- Material requirements for each sub-task (INCLUDE SUPPLY COSTS - materials + delivery + labor)
+- Regional pricing variations
+
+CRITICAL PRICING NOTE: Tasks marked "Supply & Install" should include BOTH material costs AND installation labor.
+For example, "Supply & Install Wall Sheets" should include: sheet materials + screws + compounds + delivery + labor.
+Base your pricing on total project cost, not just labor rates.
+
+For each project provide:
+1. Total estimated cost based on selected sub-tasks
+2. Cost breakdown for each selected component (considering specific sub-tasks)
+3. Cost range (min-max) for each component
+4. Analysis notes explaining cost factors and how sub-tasks influence pricing
+5. Confidence level of the estimate
+
+Respond with a single JSON object and nothing else: no prose and no markdown fences.
+"confidence" is one of High, Medium or Low. The object must validate against this JSON schema:
+"""
+
+
+def _without_titles(schema: Any) -> Any:
+    """JSON schema minus the auto-generated "title" keys, which cost tokens and add nothing"""
+    if isinstance(schema, dict):
+        return {k: _without_titles(v) for k, v in schema.items() if k != "title"}
+    if isinstance(schema, list):
+        return [_without_titles(v) for v in schema]
+    return schema
+
+
+def build_system_prompt(response_schema: Dict[str, Any]) -> str:
+    """Static instructions plus the JSON schema every estimate reply must satisfy"""
+    return SYSTEM_PROMPT + json.dumps(_without_titles(response_schema), separators=(',', ':'))
+
+
+# How each task_options field is rendered into the prompt, in prompt order.
+#   text:   value as given          title: snake_case value as Title Case
+#   count:  only when above zero    money: dollar amount, only when above zero
+#   mixer:  value followed by "mixer"
+TASK_OPTION_SCHEMA = {
+    "skip_bin_size": {"label": "Skip Bin Size", "format": "text"},
+    "build_niches_quantity": {"label": "Niches Quantity", "format": "count"},
+    "swing_door_size": {"label": "Swing Door Size", "format": "text"},
+    "cavity_sliding_size": {"label": "Cavity Sliding Size", "format": "text"},
+    "minor_costs_amount": {"label": "Additional Costs Allowance", "format": "money"},
+    "water_feeds_type": {"label": "Water Feeds Type", "format": "mixer"},
+    "power_points_quantity": {"label": "Power Points Quantity", "format": "count"},
+    "plasterboard_grade": {"label": "Plasterboard Grade", "format": "title"},
+    "cornice_type": {"label": "Cornice Type", "format": "title"},
+    "floor_tile_grade": {"label": "Floor Tile Grade", "format": "title"},
+    "wall_tile_grade": {"label": "Wall Tile Grade", "format": "title"},
+    "tile_size": {"label": "Tile Size", "format": "text"},
+    "feature_tile_grade": {"label": "Feature Tile Grade", "format": "title"},
+    "vanity_grade": {"label": "Vanity Grade", "format": "title"},
+    "toilet_grade": {"label": "Toilet Grade", "format": "title"},
+    "shower_screen_grade": {"label": "Shower Screen Type", "format": "title"},
+    "tapware_grade": {"label": "Tapware Grade", "format": "title"},
+    "lighting_grade": {"label": "Lighting Grade", "format": "title"},
+    "mirror_grade": {"label": "Mirror/Cabinet Type", "format": "title"},
+    "tiles_supply_grade": {"label": "Tiles Supply Service", "format": "title"},
+}
+
+
+def _title(value: Any) -> str:
+    return str(value).replace('_', ' ').title()
+
+
+def format_task_option(field: str, value: Any) -> Optional[str]:
+    """Prompt line for one task option, or None when the option is unset"""
+    spec = TASK_OPTION_SCHEMA[field]
+    kind = spec["format"]
+    if kind in ("count", "money"):
+        try:
+            if float(value or 0) <= 0:
+                return None
+        except (TypeError, ValueError):
+            return None
+    elif not value:
+        return None
+
+    if kind == "title":
+        rendered = _title(value)
+    elif kind == "money":
+        rendered = f"${value}"
+    elif kind == "mixer":
+        rendered = f"{value} mixer"
+    else:
+        rendered = str(value)
+    return f"- {spec['label']}: {rendered}"
+
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encodings: Dict[str, Any] = {}
+
+
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except Exception as e:
+            # Unknown model, or the BPE files cannot be fetched in this environment
+            logger.warning(f"tiktoken unavailable for {model}, estimating tokens: {str(e)}")
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Token count for `text`; roughly four characters per token when tiktoken is unavailable"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text))
+
+
+@dataclass
+class QuotePrompt:
+    text: str
+    tokens: int
+    budget: int
+    truncated: bool = False
+
+    @property
+    def over_budget(self) -> bool:
+        return self.tokens > self.budget
+
+
+class PromptStats:
+    """Running token counts of the per-quote prompts sent to the model"""
+
+    def __init__(self, system_prompt: str):
+        self.system_tokens = count_tokens(system_prompt)
+        self.prompts = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+        self.truncated = 0
+        self.over_budget = 0
+
+    def record(self, prompt: QuotePrompt) -> None:
+        self.prompts += 1
+        self.total_tokens += prompt.tokens
+        self.max_tokens = max(self.max_tokens, prompt.tokens)
+        self.truncated += int(prompt.truncated)
+        self.over_budget += int(prompt.over_budget)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": PROMPT_VERSION,
+            "budget_tokens": PROMPT_TOKEN_BUDGET,
+            "system_tokens": self.system_tokens,
+            "prompts": self.prompts,
+            "avg_tokens": round(self.total_tokens / self.prompts, 1) if self.prompts else None,
+            "max_tokens": self.max_tokens,
+            "truncated": self.truncated,
+            "over_budget": self.over_budget,
+        }
+
+
+def selected_components(request) -> List[str]:
+    return [_title(k) for k, v in request.components.dict().items() if v]
+
+
+def _detailed_task_lines(request) -> List[str]:
+    lines = []
+    for component, details in (request.detailed_components or {}).items():
+        if isinstance(details, dict) and details.get('enabled'):
+            subtasks = [_title(k) for k, v in details.get('subtasks', {}).items() if v]
+            if subtasks:
+                lines.append(f"- {_title(component)}: {', '.join(subtasks)}")
+    return lines
+
+
+def _task_option_lines(request) -> List[str]:
+    options = request.task_options or {}
+    lines = []
+    for field in TASK_OPTION_SCHEMA:
+        line = format_task_option(field, options.get(field))
+        if line:
+            lines.append(line)
+    return lines
+
+
+def _render(request, notes: str) -> str:
+    measurements = request.room_measurements
+    components = selected_components(request)
+    sections = [
+        "Estimate this bathroom renovation.",
+        f"Room: {measurements.length}m x {measurements.width}m x {measurements.height}m "
+        f"(floor {measurements.square_meters:.2f} m2, volume {measurements.cubic_meters:.2f} m3)",
+        f"Components: {', '.join(components) if components else 'None selected'}",
+    ]
+    detailed = _detailed_task_lines(request)
+    if detailed:
+        sections.append("Sub-tasks:\n" + "\n".join(detailed))
+    options = _task_option_lines(request)
+    if options:
+        sections.append("Task options:\n" + "\n".join(options))
+    sections.append(f"Location: {request.client_info.address}")
+    sections.append(f"Notes: {notes or 'None'}")
+    return "\n".join(sections)
+
+
+def build_quote_prompt(request, budget: int = PROMPT_TOKEN_BUDGET) -> QuotePrompt:
+    """Compact per-quote user message, kept within `budget` tokens.
+
+    Free-text notes are the only unbounded input, so they are shortened first when the
+    prompt runs over budget. A prompt still over budget without them is returned as-is
+    with `over_budget` set, for the caller to decide.
+    """
+    notes = (request.additional_notes or '').strip()
+    text = _render(request, notes)
+    tokens = count_tokens(text)
+    if tokens <= budget or not notes:
+        return QuotePrompt(text, tokens, budget)
+
+    # Cut the notes by the overshoot (plus a margin) until the prompt fits or they are gone
+    while notes and tokens > budget:
+        keep = max(0, len(notes) - (tokens - budget) * 4 - 16)
+        notes = notes[:keep].rstrip()
+        text = _render(request, f"{notes} [truncated]" if notes else "")
+        tokens = count_tokens(text)
+    return QuotePrompt(text, tokens, budget, truncated=True)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import zipfile
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Dict, List, Tuple
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+async def fetch_proposal_data(db, quote_ids: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Quote + request documents for every id, one $in query per collection.
+
+    Returns the combined documents in the requested order and the ids that could not be
+    resolved (missing quote or missing request). Request fields win on merge, so `id` is
+    the request's; the quote's own id is kept as `quote_id`, since several quotes can
+    share one request.
+    """
+    quotes = {
+        quote["id"]: quote
+        async for quote in db.quotes.find({"id": {"$in": quote_ids}}, {"_id": 0})
+    }
+    request_ids = list({quote.get("request_id") for quote in quotes.values()})
+    requests = {
+        request["id"]: request
+        async for request in db.quote_requests.find({"id": {"$in": request_ids}}, {"_id": 0})
+    }
+
+    combined, missing = [], []
+    for quote_id in quote_ids:
+        quote = quotes.get(quote_id)
+        request = requests.get(quote.get("request_id")) if quote else None
+        if not request:
+            missing.append(quote_id)
+            continue
+        combined.append({**quote, **request, "quote_id": quote_id})
+    return combined, missing
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object that collects bytes until drained.
+
+    zipfile detects the missing seek() and switches to data descriptors, so entries are
+    written strictly front to back and the archive can be sent while it is being built.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def stream_zip(
+    proposals: List[Dict[str, Any]],
+    render: Callable[[Dict[str, Any]], Awaitable[BinaryIO]],
+    filename: Callable[[Dict[str, Any]], str],
+    window: int,
+) -> AsyncIterator[bytes]:
+    """Render proposals and stream them out as a ZIP archive.
+
+    `render` returns an open PDF file. At most `window` renders are in flight and each
+    finished PDF is copied into the archive chunk by chunk in request order, so memory
+    stays bounded regardless of the batch size or PDF size.
+    """
+    sink = _ChunkSink()
+    pending: List[asyncio.Task] = []
+    pending_data: List[Dict[str, Any]] = []
+    remaining = iter(proposals)
+
+    def schedule():
+        for quote_data in remaining:
+            pending.append(asyncio.ensure_future(render(quote_data)))
+            pending_data.append(quote_data)
+            if len(pending) >= window:
+                return
+
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+            schedule()
+            while pending:
+                pdf_file = await pending.pop(0)
+                quote_data = pending_data.pop(0)
+                schedule()
+                with pdf_file, archive.open(filename(quote_data), mode="w") as entry:
+                    while True:
+                        chunk = await asyncio.to_thread(pdf_file.read, STREAM_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        entry.write(chunk)
+                        yield sink.drain()
+        yield sink.drain()
+    finally:
+        # Client went away: stop outstanding renders and close anything already opened
+        for task in pending:
+            if task.done() and not task.cancelled() and task.exception() is None:
+                task.result().close()
+            else:
+                task.cancel()
+
+
+async def stream_file(pdf_file: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE, delete: bool = False) -> AsyncIterator[bytes]:
+    """Yield an open file in chunks and close it, optionally removing it once sent (or abandoned)"""
+    try:
+        while True:
+            chunk = await asyncio.to_thread(pdf_file.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        pdf_file.close()
+        if delete:
+            try:
+                os.remove(pdf_file.name)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+
+from prompt_builder import PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Australian state/territory followed by an optional postcode, e.g. "Sydney NSW 2000"
+REGION_PATTERN = re.compile(r'\b(NSW|VIC|QLD|WA|SA|TAS|ACT|NT)\b\.?\s*(\d{4})?', re.IGNORECASE)
+POSTCODE_PATTERN = re.compile(r'\b(\d{4})\b')
+
+
+def extract_region(address: Optional[str]) -> str:
+    """Reduce a street address to the region that drives pricing (state + postcode)"""
+    address = (address or '').strip()
+    match = REGION_PATTERN.search(address)
+    if match:
+        state, postcode = match.group(1).upper(), match.group(2)
+        return f"{state} {postcode}" if postcode else state
+
+    postcodes = POSTCODE_PATTERN.findall(address)
+    if postcodes:
+        return postcodes[-1]
+
+    # No recognisable region - fall back to the last address segment (usually the suburb)
+    return address.split(',')[-1].strip().lower()
+
+
+def _canonical_detailed_components(detailed_components: Optional[Dict[str, Any]]) -> Dict[str, list]:
+    """Keep only what reaches the prompt: enabled components and their selected subtasks"""
+    canonical = {}
+    for component, details in (detailed_components or {}).items():
+        if isinstance(details, dict) and details.get('enabled'):
+            canonical[component] = sorted(k for k, v in details.get('subtasks', {}).items() if v)
+    return canonical
+
+
+def quote_cache_key(request) -> str:
+    """Content hash of the inputs that shape an LLM estimate.
+
+    Client name, email and phone are deliberately excluded so that re-submitting the same
+    room with different contact details hits the cache. The prompt version is included so
+    a prompt change never serves estimates produced by the old prompt.
+    """
+    measurements = request.room_measurements
+    payload = {
+        "room_measurements": [round(measurements.length, 3), round(measurements.width, 3), round(measurements.height, 3)],
+        "components": sorted(k for k, v in request.components.dict().items() if v),
+        "detailed_components": _canonical_detailed_components(request.detailed_components),
+        "task_options": {k: v for k, v in (request.task_options or {}).items() if v},
+        "additional_notes": (request.additional_notes or '').strip() or None,
+        "region": extract_region(request.client_info.address),
+        "prompt_version": PROMPT_VERSION,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class InMemoryCacheBackend:
+    """Process-local LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+class MongoCacheBackend:
+    """Cache shared between workers, stored in a Mongo collection.
+
+    Expiry is handled by a TTL index on ``expires_at``; LRU eviction trims the least
+    recently accessed entries once the collection grows past ``max_entries``.
+    """
+
+    EVICTION_CHECK_INTERVAL = 50
+
+    def __init__(self, collection, max_entries: int, ttl_seconds: float):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._indexes_ready = False
+        self._writes_since_eviction = 0
+
+    async def _ensure_indexes(self) -> None:
+        if self._indexes_ready:
+            return
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index("last_accessed")
+        self._indexes_ready = True
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        entry = await self.collection.find_one_and_update(
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_accessed": now}}
+        )
+        return entry["value"] if entry else None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        await self._ensure_indexes()
+        now = datetime.now(timezone.utc)
+        await self.collection.replace_one(
+            {"_id": key},
+            {"value": value, "last_accessed": now, "expires_at": now + timedelta(seconds=self.ttl_seconds)},
+            upsert=True
+        )
+
+        self._writes_since_eviction += 1
+        if self._writes_since_eviction >= self.EVICTION_CHECK_INTERVAL:
+            self._writes_since_eviction = 0
+            await self._evict()
+
+    async def _evict(self) -> None:
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        stale = await self.collection.find({}, {"_id": 1}).sort("last_accessed", 1).limit(excess).to_list(excess)
+        await self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in stale]}})
+
+    async def clear(self) -> None:
+        await self.collection.delete_many({})
+
+    async def size(self) -> int:
+        return await self.collection.estimated_document_count()
+
+
+class QuoteCache:
+    """Hit/miss accounting around a cache backend.
+
+    Backend failures are logged and treated as misses so a cache outage never blocks quoting.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Quote cache lookup failed: {str(e)}")
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Quote cache store failed: {str(e)}")
+
+    def record_bypass(self) -> None:
+        self.bypassed += 1
+
+    async def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        try:
+            size = await self.backend.size()
+        except Exception:
+            size = None
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": size,
+        }
+
+
+def create_quote_cache(db) -> QuoteCache:
+    """Build the quote cache configured by QUOTE_CACHE_* environment variables"""
+    backend_name = os.environ.get('QUOTE_CACHE_BACKEND', 'memory').lower()
+    ttl_seconds = float(os.environ.get('QUOTE_CACHE_TTL_SECONDS', 24 * 60 * 60))
+    max_entries = int(os.environ.get('QUOTE_CACHE_MAX_ENTRIES', 1000))
+
+    if backend_name == 'mongo':
+        backend = MongoCacheBackend(db.quote_estimate_cache, max_entries, ttl_seconds)
+    elif backend_name == 'memory':
+        backend = InMemoryCacheBackend(max_entries, ttl_seconds)
+    else:
+        raise ValueError(f"Unknown QUOTE_CACHE_BACKEND: {backend_name}")
+
+    return QuoteCache(backend)
@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class RateLimiter:
+    """Token bucket allowing `rate_per_minute` acquisitions per minute with bursts up to `burst`"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = burst or max(1, int(rate_per_minute // 6))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_second)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate_per_second)
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """Parse "openai=60,anthropic=30" into requests-per-minute per provider"""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        provider, _, rate = entry.partition('=')
+        limits[provider.strip()] = float(rate)
+    return limits
+
+
+class QuoteJobQueue:
+    """Durable quote job queue backed by a Mongo collection.
+
+    Jobs are claimed atomically with a lease. A job whose worker dies (process restart,
+    crash) becomes claimable again once its lease expires, so queued and in-flight work
+    survives restarts. Each provider has its own rate limiter shared by all workers.
+    """
+
+    def __init__(
+        self,
+        collection,
+        process: Callable[[Dict[str, Any], Callable[..., Awaitable[None]]], Awaitable[Dict[str, Any]]],
+        concurrency: int = 4,
+        rate_limits: Optional[Dict[str, float]] = None,
+        lease_seconds: float = 300,
+        poll_interval: float = 2.0,
+        max_attempts: int = 3,
+    ):
+        self.collection = collection
+        self.process = process
+        self.concurrency = concurrency
+        self.rate_limiters = {provider: RateLimiter(rate) for provider, rate in (rate_limits or {}).items()}
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._workers = []
+        self._wakeup = asyncio.Event()
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        self._workers = [asyncio.create_task(self._worker(n)) for n in range(self.concurrency)]
+        logger.info(f"Quote job queue started with {self.concurrency} workers")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, payload: Dict[str, Any], provider: str) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": JOB_QUEUED,
+            "provider": provider,
+            "payload": payload,
+            "progress": {"stage": "queued", "percent": 0},
+            "attempts": 0,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "lease_expires_at": None,
+        }
+        await self.collection.insert_one(dict(job))
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": job_id}, {"_id": 0, "payload": 0, "lease_expires_at": 0})
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": JOB_QUEUED},
+                {"status": JOB_RUNNING, "lease_expires_at": {"$lt": now}},
+            ]},
+            {
+                "$set": {
+                    "status": JOB_RUNNING,
+                    "progress": {"stage": "started", "percent": 5},
+                    "updated_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        fields["updated_at"] = datetime.now(timezone.utc)
+        await self.collection.update_one({"id": job_id}, {"$set": fields})
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Quote job worker {number} failed to claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Recording the outcome failed; the lease expires and the job is picked up again
+                logger.error(f"Quote job worker {number} failed to record job {job['id']}: {str(e)}")
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+
+        async def report_progress(stage: str, percent: int) -> None:
+            # Progress updates double as lease renewals for long-running jobs
+            await self._update(job_id, {
+                "progress": {"stage": stage, "percent": percent},
+                "lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds),
+            })
+
+        self._running += 1
+        try:
+            limiter = self.rate_limiters.get(job.get("provider"))
+            if limiter is not None:
+                await report_progress("waiting_for_provider", 5)
+                await limiter.acquire()
+
+            result = await self.process(job, report_progress)
+            await self._update(job_id, {
+                "status": JOB_COMPLETED,
+                "progress": {"stage": "completed", "percent": 100},
+                "result": result,
+                "error": None,
+                "lease_expires_at": None,
+            })
+            self.completed += 1
+        except asyncio.CancelledError:
+            # Shutting down: leave the lease to expire so another worker picks the job up
+            raise
+        except Exception as e:
+            logger.error(f"Quote job {job_id} failed (attempt {job['attempts']}): {str(e)}")
+            if job["attempts"] < self.max_attempts:
+                await self._update(job_id, {"status": JOB_QUEUED, "error": str(e), "lease_expires_at": None})
+            else:
+                await self._update(job_id, {
+                    "status": JOB_FAILED,
+                    "progress": {"stage": "failed", "percent": 100},
+                    "error": str(e),
+                    "lease_expires_at": None,
+                })
+                self.failed += 1
+        finally:
+            self._running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "running": self._running,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+def create_quote_job_queue(collection, process) -> QuoteJobQueue:
+    """Build the job queue configured by QUOTE_JOB_* environment variables"""
+    return QuoteJobQueue(
+        collection,
+        process,
+        concurrency=int(os.environ.get('QUOTE_JOB_CONCURRENCY', 4)),
+        rate_limits=parse_rate_limits(os.environ.get('QUOTE_JOB_RATE_LIMITS', 'openai=60')),
+        lease_seconds=float(os.environ.get('QUOTE_JOB_LEASE_SECONDS', 300)),
+        max_attempts=int(os.environ.get('QUOTE_JOB_MAX_ATTEMPTS', 3)),
+    )
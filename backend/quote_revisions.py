@@ -0,0 +1,139 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+# Fields of a quote that every revision snapshots
+REVISED_FIELDS = ("total_cost", "cost_breakdown")
+
+
+def match_revision(revision: int) -> Any:
+    """Query value for a quote's `revision` field; quotes stored before revisions existed have none and are at 0"""
+    return {"$in": [0, None]} if revision == 0 else revision
+
+
+class RevisionConflict(Exception):
+    """The quote moved past the revision the caller based its change on"""
+
+    def __init__(self, quote_id: str, expected: int, current: int):
+        super().__init__(f"Quote {quote_id} is at revision {current}, not {expected}")
+        self.expected = expected
+        self.current = current
+
+
+def apply_adjustment(
+    breakdown: List[Dict[str, Any]],
+    component_adjustments: Optional[Dict[str, float]],
+    adjusted_total: float,
+) -> Tuple[List[Dict[str, Any]], float]:
+    """New breakdown and total for an adjustment, kept consistent with each other.
+
+    `component_adjustments` maps breakdown index -> new cost; the total is then the sum of
+    the lines. Without component detail the adjusted total is spread over the lines pro rata.
+    """
+    lines = [dict(line) for line in breakdown]
+    if component_adjustments:
+        for index, cost in component_adjustments.items():
+            try:
+                line = lines[int(index)]
+            except (ValueError, IndexError):
+                raise ValueError(f"No breakdown line {index}")
+            _set_cost(line, float(cost))
+        return lines, round(sum(line["estimated_cost"] for line in lines), 2)
+
+    current = sum(line["estimated_cost"] for line in lines)
+    if current > 0:
+        for line in lines:
+            _set_cost(line, line["estimated_cost"] * adjusted_total / current)
+    return lines, adjusted_total
+
+
+def _set_cost(line: Dict[str, Any], cost: float) -> None:
+    # The range keeps its width relative to the estimate
+    if line["estimated_cost"]:
+        scale = cost / line["estimated_cost"]
+        line["cost_range_min"] = round(line["cost_range_min"] * scale, 2)
+        line["cost_range_max"] = round(line["cost_range_max"] * scale, 2)
+    else:
+        line["cost_range_min"] = line["cost_range_max"] = cost
+    line["estimated_cost"] = round(cost, 2)
+
+
+def revision_event(quote: Dict[str, Any], revision: int, event: str, **details) -> Dict[str, Any]:
+    return {
+        "quote_id": quote["id"],
+        "revision": revision,
+        "event": event,
+        **{field: quote.get(field) for field in REVISED_FIELDS},
+        **details,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+async def append_revision(db, quote: Dict[str, Any], expected_revision: int, changes: Dict[str, Any],
+                          event: str, **details) -> int:
+    """Record `changes` to a quote as revision expected_revision + 1 and return that number.
+
+    The event is appended to quote_revisions first; the unique (quote_id, revision) index
+    lets exactly one writer claim each revision number, and a loser gets RevisionConflict.
+    The quote document is then moved forward with compare-and-set on its revision, so it
+    stays the materialised latest view. A writer that died between the two steps leaves
+    the view one revision behind; the next conflicting writer rolls it forward.
+    """
+    current = quote.get("revision", 0)
+    if current != expected_revision:
+        raise RevisionConflict(quote["id"], expected_revision, current)
+
+    if current == 0:
+        # Quotes are created without a log entry; snapshot the original before the first change
+        try:
+            await db.quote_revisions.insert_one(revision_event(quote, 0, "created"))
+        except DuplicateKeyError:
+            pass
+
+    revision = expected_revision + 1
+    try:
+        await db.quote_revisions.insert_one(revision_event({**quote, **changes}, revision, event, **details))
+    except DuplicateKeyError:
+        await roll_forward(db, quote["id"])
+        latest = await db.quotes.find_one({"id": quote["id"]}, {"revision": 1})
+        raise RevisionConflict(quote["id"], expected_revision, (latest or {}).get("revision", revision))
+
+    await db.quotes.update_one(
+        {"id": quote["id"], "revision": match_revision(expected_revision)},
+        {"$set": {**changes, "revision": revision, "updated_at": datetime.now(timezone.utc)}},
+    )
+    return revision
+
+
+async def roll_forward(db, quote_id: str) -> None:
+    """Bring the quote view up to its newest logged revision if a writer left it behind"""
+    latest = await db.quote_revisions.find_one({"quote_id": quote_id}, {"_id": 0}, sort=[("revision", DESCENDING)])
+    if latest is None:
+        return
+    await db.quotes.update_one(
+        {"id": quote_id, "$or": [{"revision": {"$lt": latest["revision"]}}, {"revision": None}]},
+        {"$set": {
+            **{field: latest[field] for field in REVISED_FIELDS},
+            "revision": latest["revision"],
+            "updated_at": latest["created_at"],
+        }},
+    )
+
+
+async def get_revision(db, quote_id: str, revision: int) -> Optional[Dict[str, Any]]:
+    """One revision of a quote by its number (a single indexed lookup)"""
+    event = await db.quote_revisions.find_one({"quote_id": quote_id, "revision": revision}, {"_id": 0})
+    if event is not None:
+        return event
+
+    # Never-adjusted quotes (and ones adjusted before the log existed) have no entry for
+    # their current state; the quote document itself is that revision
+    quote = await db.quotes.find_one({"id": quote_id, "revision": match_revision(revision)}, {"_id": 0})
+    if quote is None:
+        return None
+    return {
+        **revision_event(quote, revision, "created" if revision == 0 else "unlogged"),
+        "created_at": quote.get("updated_at") or quote.get("created_at"),
+    }
@@ -1,17 +1,45 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Header, Request
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Optional, Dict, Any, Literal
 import uuid
+import json
+import tempfile
+import time
 from datetime import datetime, timezone
 from emergentintegrations.llm.chat import LlmChat, UserMessage
-from pdf_generator import BathroomProposalPDF
-from fastapi.responses import Response
+from pdf_pool import PdfPoolSaturated, create_pdf_render_pool, render_batch_proposal, render_proposal_file
+from proposal_batch import fetch_proposal_data, stream_file, stream_zip
+from pdf_cache import create_pdf_cache, proposal_cache_key
+from quote_cache import create_quote_cache, quote_cache_key
+from pricing_engine import estimate_quote, validate_task_options
+from pricing_learner import create_pricing_learner
+from supplier_index import SupplierIndex
+from supplier_store import SupplierStore
+from geocoding import create_geocoder
+from prompt_builder import PromptStats, build_quote_prompt, build_system_prompt, count_tokens
+from ai_output import StructuredOutputStats, build_repair_prompt, parse_structured
+from llm_pool import create_llm_pool
+from llm_guard import create_llm_guard, hedged
+from model_router import create_model_router
+from mongo_codec import CODEC_OPTIONS, coerce_datetimes
+from quote_jobs import create_quote_job_queue
+from db_indexes import IndexManager
+from project_reads import fetch_project_quote
+from draft_store import create_draft_store, split_draft
+from draft_autosave import DraftChangesLost, create_draft_autosave
+from json_patch import JSON_PATCH_TYPE, MERGE_PATCH_TYPE, PatchError, PatchTestFailed
+from idempotency import IdempotencyError, create_idempotency_store
+from quote_revisions import RevisionConflict, append_revision, apply_adjustment, get_revision
+from pagination import MAX_PAGE_SIZE, encode_cursor, keyset_query, keyset_sort, parse_fields
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -19,7 +47,31 @@ load_dotenv(ROOT_DIR / '.env')
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+db = client.get_database(os.environ['DB_NAME'], codec_options=CODEC_OPTIONS)
+
+# Indexes are built on startup; API requests get a 503 until they are ready
+index_manager = IndexManager(db)
+REQUIRE_INDEXES = os.environ.get('REQUIRE_INDEXES', 'true').lower() == 'true'
+
+# Correction factors learned from cost adjustments, refreshed in the background and applied
+# by the pricing engine from memory (PRICING_LEARNER_INTERVAL_SECONDS=0 disables learning)
+pricing_learner = create_pricing_learner(db)
+
+# Drafts write quote, request and project together (in a transaction where MongoDB supports
+# it); Idempotency-Key replays are answered from idempotency_keys
+draft_store = create_draft_store(client, db)
+idempotency_store = create_idempotency_store(db)
+# PATCHed drafts are held in memory and written back through draft_store once editing pauses
+draft_autosave = create_draft_autosave(draft_store, db)
+
+# Cache of LLM estimates keyed on the room/spec inputs (QUOTE_CACHE_BACKEND=memory|mongo)
+quote_cache = create_quote_cache(db)
+
+# Rendered proposal PDFs (PDF_CACHE_DIR, PDF_CACHE_MAX_MB)
+pdf_cache = create_pdf_cache()
+
+# Proposal rendering runs in a bounded worker pool (PDF_RENDER_EXECUTOR=process|thread)
+pdf_render_pool = create_pdf_render_pool()
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -27,27 +79,6 @@ app = FastAPI()
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Initialize LLM Chat
-llm_chat = LlmChat(
-    api_key=os.environ.get('EMERGENT_LLM_KEY'),
-    session_id="renovation-pricing",
-    system_message="""You are an expert bathroom renovation cost estimator with extensive knowledge of construction costs, labor rates, and material pricing. 
-
-Your role is to provide accurate cost estimates for bathroom renovations based on:
-- Room dimensions and square footage
-- Selected renovation components (demolition, framing, plumbing, electrical, plastering, waterproofing, tiling, fit off)
-- Regional pricing variations
-- Current market rates for materials and labor
-
-Provide detailed breakdowns with cost ranges and explain your reasoning. Always consider:
-- Complexity factors that might affect pricing
-- Quality levels of materials and finishes
-- Labor intensity of each component
-- Potential complications or additional work needed
-
-Format your response as JSON with detailed cost breakdowns."""
-).with_model("openai", "gpt-4o")
-
 # Models
 class RenovationComponent(BaseModel):
     demolition: bool = False
@@ -94,6 +125,26 @@ class CostBreakdown(BaseModel):
     cost_range_min: float
     cost_range_max: float
     notes: str
+    correction_factor: Optional[float] = None  # Learned adjustment factor the pricing engine applied
+
+class AIEstimate(BaseModel):
+    """Reply the model must produce; validated before a quote is built from it"""
+    total_cost: float = Field(ge=0)
+    breakdown: List[CostBreakdown] = Field(min_length=1)
+    analysis: str
+    confidence: Literal["High", "Medium", "Low"]
+    
+    @field_validator("confidence", mode="before")
+    @classmethod
+    def normalise_confidence(cls, value):
+        return value.strip().title() if isinstance(value, str) else value
+    
+    @model_validator(mode="after")
+    def check_ranges(self):
+        for item in self.breakdown:
+            if item.cost_range_min > item.cost_range_max:
+                raise ValueError(f"cost_range_min exceeds cost_range_max for {item.component}")
+        return self
 
 class RenovationQuote(BaseModel):
     id: str
@@ -102,6 +153,10 @@ class RenovationQuote(BaseModel):
     cost_breakdown: List[CostBreakdown]
     ai_analysis: str
     confidence_level: str
+    rate_table_version: Optional[str] = None  # Set when priced by the local pricing engine
+    fallback_reason: Optional[str] = None  # Why the model's estimate was not used, if it was not
+    revision: int = 0  # Bumped on every cost adjustment; history is in quote_revisions
+    draft_revision: int = 0  # Bumped on every draft save; guards draft autosaves
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CostAdjustment(BaseModel):
@@ -111,8 +166,20 @@ class CostAdjustment(BaseModel):
     adjusted_cost: float
     adjustment_reason: str
     component_adjustments: Optional[Dict[str, float]] = None
+    expected_revision: Optional[int] = None  # Quote revision the adjustment was made against; 409 if it moved on
+    revision: Optional[int] = None  # Revision the adjustment produced (set by the server)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class QuoteRevision(BaseModel):
+    quote_id: str
+    revision: int
+    event: str
+    total_cost: float
+    cost_breakdown: List[CostBreakdown]
+    adjustment_id: Optional[str] = None
+    reason: Optional[str] = None
+    created_at: Optional[datetime] = None
+
 class UserProfile(BaseModel):
     company_name: str = "Professional Bathroom Renovations"
     contact_name: str = "Project Manager"
@@ -122,6 +189,11 @@ class UserProfile(BaseModel):
     years_experience: str = "5+"
     projects_completed: str = "100+"
 
+class ProposalBatchRequest(BaseModel):
+    quote_ids: List[str]
+    user_profile: UserProfile = Field(default_factory=UserProfile)
+    format: str = "zip"  # "zip" of individual PDFs or one merged "pdf"
+
 class SavedProject(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     project_name: str
@@ -133,6 +205,14 @@ class SavedProject(BaseModel):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     notes: Optional[str] = None
 
+class DraftSave(BaseModel):
+    """An autosaved, possibly incomplete quote request and its saved-project entry"""
+    draft_id: Optional[str] = None  # Omit on the first save; send the returned id on every later one
+    project_name: str
+    notes: Optional[str] = None
+    request: Dict[str, Any]  # RenovationQuoteRequest fields filled in so far
+    expected_revision: Optional[int] = None  # Draft revision this save is based on; 409 if it moved on
+
 class ProjectUpdate(BaseModel):
     project_name: Optional[str] = None
     category: Optional[str] = None
@@ -143,280 +223,461 @@ class MaterialSupplier(BaseModel):
     address: str
     phone: str
     specialties: List[str]
-    estimated_distance: str
+    estimated_distance: Optional[str] = None  # Only on /suppliers/nearby results
 
-# Static material suppliers data (MVP approach)
+# Built-in supplier catalogue. It seeds the suppliers collection when that is empty; every
+# supplier endpoint serves from the collection, so imported suppliers show up everywhere.
 MATERIAL_SUPPLIERS = {
     "demolition": [
-        MaterialSupplier(name="Demo Pro Supplies", address="123 Industrial Ave", phone="02-1234-5678", specialties=["Demolition tools", "Waste disposal"], estimated_distance="2.5km"),
-        MaterialSupplier(name="Construction Depot", address="456 Trade St", phone="02-2345-6789", specialties=["Tools", "Safety equipment"], estimated_distance="4.1km")
+        MaterialSupplier(name="Demo Pro Supplies", address="123 Industrial Ave, Alexandria NSW 2015", phone="02-1234-5678", specialties=["Demolition tools", "Waste disposal"]),
+        MaterialSupplier(name="Construction Depot", address="456 Trade St, Mascot NSW 2020", phone="02-2345-6789", specialties=["Tools", "Safety equipment"])
     ],
     "framing": [
-        MaterialSupplier(name="Timber Masters", address="789 Lumber Rd", phone="02-3456-7890", specialties=["Timber framing", "Steel frames"], estimated_distance="3.2km"),
-        MaterialSupplier(name="Frame & Build", address="321 Builder Ave", phone="02-4567-8901", specialties=["Framing materials", "Insulation"], estimated_distance="5.8km")
+        MaterialSupplier(name="Timber Masters", address="789 Lumber Rd, Wetherill Park NSW 2164", phone="02-3456-7890", specialties=["Timber framing", "Steel frames"]),
+        MaterialSupplier(name="Frame & Build", address="321 Builder Ave, Lidcombe NSW 2141", phone="02-4567-8901", specialties=["Framing materials", "Insulation"])
     ],
     "plumbing_rough_in": [
-        MaterialSupplier(name="Plumb Perfect", address="654 Pipe Lane", phone="02-5678-9012", specialties=["Pipes", "Fittings", "Fixtures"], estimated_distance="1.9km"),
-        MaterialSupplier(name="Water Works Supply", address="987 Flow St", phone="02-6789-0123", specialties=["Plumbing supplies", "Drainage"], estimated_distance="3.7km")
+        MaterialSupplier(name="Plumb Perfect", address="654 Pipe Lane, Marrickville NSW 2204", phone="02-5678-9012", specialties=["Pipes", "Fittings", "Fixtures"]),
+        MaterialSupplier(name="Water Works Supply", address="987 Flow St, Parramatta NSW 2150", phone="02-6789-0123", specialties=["Plumbing supplies", "Drainage"])
     ],
     "electrical_rough_in": [
-        MaterialSupplier(name="Sparky Supplies", address="159 Electric Blvd", phone="02-7890-1234", specialties=["Wiring", "Switches", "Outlets"], estimated_distance="2.8km"),
-        MaterialSupplier(name="Current Solutions", address="753 Voltage Ave", phone="02-8901-2345", specialties=["Electrical components", "Safety switches"], estimated_distance="4.5km")
+        MaterialSupplier(name="Sparky Supplies", address="159 Electric Blvd, Ryde NSW 2112", phone="02-7890-1234", specialties=["Wiring", "Switches", "Outlets"]),
+        MaterialSupplier(name="Current Solutions", address="753 Voltage Ave, Blacktown NSW 2148", phone="02-8901-2345", specialties=["Electrical components", "Safety switches"])
     ],
     "plastering": [
-        MaterialSupplier(name="Smooth Finish Supplies", address="852 Render Rd", phone="02-9012-3456", specialties=["Plaster", "Render", "Tools"], estimated_distance="3.1km"),
-        MaterialSupplier(name="Wall Perfect", address="741 Surface St", phone="02-0123-4567", specialties=["Plastering materials", "Finishing supplies"], estimated_distance="6.2km")
+        MaterialSupplier(name="Smooth Finish Supplies", address="852 Render Rd, Homebush NSW 2140", phone="02-9012-3456", specialties=["Plaster", "Render", "Tools"]),
+        MaterialSupplier(name="Wall Perfect", address="741 Surface St, Sutherland NSW 2232", phone="02-0123-4567", specialties=["Plastering materials", "Finishing supplies"])
     ],
     "waterproofing": [
-        MaterialSupplier(name="Seal Tight", address="963 Barrier Blvd", phone="02-1357-9246", specialties=["Waterproof membranes", "Sealants"], estimated_distance="2.3km"),
-        MaterialSupplier(name="Dry Solutions", address="258 Protect Ave", phone="02-2468-0135", specialties=["Waterproofing", "Moisture control"], estimated_distance="4.9km")
+        MaterialSupplier(name="Seal Tight", address="963 Barrier Blvd, Chatswood NSW 2067", phone="02-1357-9246", specialties=["Waterproof membranes", "Sealants"]),
+        MaterialSupplier(name="Dry Solutions", address="258 Protect Ave, Liverpool NSW 2170", phone="02-2468-0135", specialties=["Waterproofing", "Moisture control"])
     ],
     "tiling": [
-        MaterialSupplier(name="Tile World", address="147 Ceramic St", phone="02-3691-4725", specialties=["Tiles", "Adhesives", "Grout"], estimated_distance="1.5km"),
-        MaterialSupplier(name="Surface Specialists", address="369 Mosaic Rd", phone="02-4714-5826", specialties=["Premium tiles", "Natural stone"], estimated_distance="3.8km")
+        MaterialSupplier(name="Tile World", address="147 Ceramic St, Surry Hills NSW 2010", phone="02-3691-4725", specialties=["Tiles", "Adhesives", "Grout"]),
+        MaterialSupplier(name="Surface Specialists", address="369 Mosaic Rd, Brookvale NSW 2100", phone="02-4714-5826", specialties=["Premium tiles", "Natural stone"])
     ],
     "fit_off": [
-        MaterialSupplier(name="Finish Line", address="582 Complete Ave", phone="02-5825-9637", specialties=["Fixtures", "Fittings", "Accessories"], estimated_distance="2.7km"),
-        MaterialSupplier(name="Final Touch", address="714 Detail St", phone="02-6936-7418", specialties=["Bathroom accessories", "Hardware"], estimated_distance="5.1km")
+        MaterialSupplier(name="Finish Line", address="582 Complete Ave, Macquarie Park NSW 2113", phone="02-5825-9637", specialties=["Fixtures", "Fittings", "Accessories"]),
+        MaterialSupplier(name="Final Touch", address="714 Detail St, Dee Why NSW 2099", phone="02-6936-7418", specialties=["Bathroom accessories", "Hardware"])
     ]
 }
 
-# Helper functions
-def prepare_for_mongo(data):
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-            elif isinstance(value, dict):
-                data[key] = prepare_for_mongo(value)
-            elif isinstance(value, list):
-                data[key] = [prepare_for_mongo(item) if isinstance(item, dict) else item for item in value]
-    return data
-
-def parse_from_mongo(item):
-    if isinstance(item, dict):
-        for key, value in item.items():
-            if isinstance(value, str) and 'T' in value and value.endswith('Z'):
-                try:
-                    item[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                except:
-                    pass
-            elif isinstance(value, dict):
-                item[key] = parse_from_mongo(value)
-            elif isinstance(value, list):
-                item[key] = [parse_from_mongo(subitem) if isinstance(subitem, dict) else subitem for subitem in value]
-    return item
+# Catalogue responses are serialized once and served with strong ETags. The index starts
+# from the built-in catalogue and is replaced by the suppliers collection's contents once
+# that has loaded, then reloaded every SUPPLIER_INDEX_REFRESH_SECONDS to pick up imports.
+SUPPLIER_CACHE_MAX_AGE = int(os.environ.get('SUPPLIER_CACHE_MAX_AGE', 300))
+SUPPLIER_INDEX_REFRESH_SECONDS = float(os.environ.get('SUPPLIER_INDEX_REFRESH_SECONDS', 300))
+supplier_index = SupplierIndex(jsonable_encoder(MATERIAL_SUPPLIERS), max_age=SUPPLIER_CACHE_MAX_AGE)
+SUPPLIER_BULK_MAX_COMPONENTS = 50
+
+# Geo-indexed supplier collection (seeded from MATERIAL_SUPPLIERS when empty) and the
+# offline postcode geocoder used to place clients and suppliers
+geocoder = create_geocoder()
+supplier_store = SupplierStore(db.suppliers, geocoder)
+
+# Initialize LLM Chat
+LLM_PROVIDER = "openai"
+LLM_MODEL = "gpt-4o"
+
+LLM_SYSTEM_PROMPT = build_system_prompt(AIEstimate.model_json_schema())
+
+def new_llm_chat(session_id: str, model: Optional[str] = None) -> LlmChat:
+    """Chat client for one session; `model` is "provider/model", defaulting to LLM_PROVIDER/LLM_MODEL"""
+    provider, model_name = model.split("/", 1) if model else (LLM_PROVIDER, LLM_MODEL)
+    return LlmChat(
+        api_key=os.environ.get('EMERGENT_LLM_KEY'),
+        session_id=session_id,
+        system_message=LLM_SYSTEM_PROMPT
+    ).with_model(provider, model_name)
+
+# One isolated session per quote, at most LLM_MAX_CONCURRENCY calls in flight
+llm_pool = create_llm_pool(new_llm_chat)
+llm_guard = create_llm_guard()
+model_router = create_model_router(f"{LLM_PROVIDER}/{LLM_MODEL}")
+prompt_stats = PromptStats(LLM_SYSTEM_PROMPT)
+estimate_output_stats = StructuredOutputStats()
+
+# Quote estimation helpers
+def parse_ai_estimate(ai_response):
+    """Validate a model reply against AIEstimate; raises ValueError when it does not fit"""
+    return parse_structured(ai_response, AIEstimate).dict()
+
+def build_quote(request, ai_data, quote_id=None):
+    cost_breakdown = [
+        CostBreakdown(
+            component=item["component"],
+            estimated_cost=item["estimated_cost"],
+            cost_range_min=item["cost_range_min"],
+            cost_range_max=item["cost_range_max"],
+            notes=item["notes"],
+            correction_factor=item.get("correction_factor")
+        ) for item in ai_data["breakdown"]
+    ]
+    
+    return RenovationQuote(
+        id=quote_id or str(uuid.uuid4()),
+        request_id=request.id,
+        total_cost=ai_data["total_cost"],
+        cost_breakdown=cost_breakdown,
+        ai_analysis=ai_data["analysis"],
+        confidence_level=ai_data["confidence"],
+        rate_table_version=ai_data.get("rate_table_version"),
+        fallback_reason=ai_data.get("fallback_reason")
+    )
+
+def check_task_options(request):
+    """400 for task options the rate tables cannot price; checked before any estimate is attempted"""
+    try:
+        validate_task_options(request.task_options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def fallback_estimate(request, reason):
+    """Rate table estimate returned in place of the model's, labelled with the reason"""
+    llm_guard.outcomes[f"fallback_{reason}"] += 1
+    return {**estimate_quote(request, corrections=pricing_learner.corrections), "fallback_reason": reason}
+
+async def request_llm_estimate(request, prompt, session_id, model=None):
+    """One model session: the prompt plus at most one repair round trip.
+    
+    Returns the validated estimate, or None when the reply never validated.
+    """
+    model = model or f"{LLM_PROVIDER}/{LLM_MODEL}"
+    async with llm_pool.session(session_id, model=model) as chat:
+        async def send(text, context_tokens=0):
+            started = time.perf_counter()
+            reply = await chat.send_message(UserMessage(text=text))
+            input_tokens = prompt_stats.system_tokens + context_tokens + count_tokens(text)
+            model_router.record_call(model, time.perf_counter() - started, input_tokens, count_tokens(reply))
+            return reply
+        
+        ai_response = await send(prompt.text)
+        
+        # Parse AI response; one repair round trip when it does not validate
+        attempts = 1
+        try:
+            ai_data = parse_ai_estimate(ai_response)
+        except ValueError as e:
+            logger.warning(f"AI response for request {request.id} from {model} failed validation, requesting a repair: {str(e)}")
+            attempts = 2
+            ai_response = await send(build_repair_prompt(ai_response, e), prompt.tokens + count_tokens(ai_response))
+            try:
+                ai_data = parse_ai_estimate(ai_response)
+            except ValueError as e:
+                estimate_output_stats.record(attempts, parsed=False)
+                logger.error(f"AI response for request {request.id} from {model} still invalid after repair: {str(e)}")
+                return None
+    
+    estimate_output_stats.record(attempts, parsed=True)
+    return ai_data
+
+async def routed_llm_estimate(request, prompt):
+    """Small model for simple requests, large model for complex ones or weak small-model answers"""
+    tier, reasons = model_router.choose(request)
+    model_router.record_tier(tier)
+    ai_data = await request_llm_estimate(request, prompt, f"quote-{request.id}", model_router.models[tier])
+    
+    escalation = model_router.should_escalate(tier, ai_data)
+    if escalation:
+        model_router.record_escalation(escalation)
+        logger.info(f"Escalating request {request.id} to {model_router.models['large']}: {escalation}")
+        ai_data = await request_llm_estimate(request, prompt, f"quote-{request.id}-large", model_router.models["large"])
+    return ai_data
+
+async def generate_ai_estimate(request, bypass_cache=False):
+    """Estimate via the LLM, reusing cached estimates for identical room/spec inputs.
+    
+    The model call is bounded by LLM_DEADLINE_SECONDS and skipped while the circuit
+    breaker is open; in those cases the labelled rate table estimate is returned.
+    """
+    cache_key = quote_cache_key(request)
+    if bypass_cache:
+        quote_cache.record_bypass()
+    else:
+        ai_data = await quote_cache.get(cache_key)
+        if ai_data is not None:
+            return ai_data
+    
+    # Generate AI-powered cost estimate with detailed subtask analysis
+    prompt = build_quote_prompt(request)
+    prompt_stats.record(prompt)
+    logger.info(f"Quote prompt for request {request.id}: {prompt.tokens} tokens (budget {prompt.budget}{', notes truncated' if prompt.truncated else ''})")
+    if prompt.over_budget:
+        logger.warning(f"Quote prompt for request {request.id} exceeds the token budget, using the rate table estimate")
+        return fallback_estimate(request, "prompt_budget")
+    
+    if not llm_guard.breaker.allow():
+        return fallback_estimate(request, "circuit_open")
+    
+    primary = lambda: routed_llm_estimate(request, prompt)
+    hedge = lambda: request_llm_estimate(request, prompt, f"quote-{request.id}-hedge", llm_guard.hedge_model or model_router.models["large"])
+    try:
+        ai_data, answered_by = await asyncio.wait_for(
+            hedged(primary, hedge, llm_guard.hedge_after_seconds),
+            timeout=llm_guard.deadline_seconds
+        )
+    except asyncio.TimeoutError:
+        llm_guard.breaker.record_failure()
+        logger.warning(f"LLM estimate for request {request.id} missed the {llm_guard.deadline_seconds}s deadline, using the rate table estimate")
+        return fallback_estimate(request, "deadline")
+    except asyncio.CancelledError:
+        llm_guard.breaker.record_cancelled()
+        raise
+    except Exception as e:
+        llm_guard.breaker.record_failure()
+        logger.error(f"LLM estimate for request {request.id} failed, using the rate table estimate: {str(e)}")
+        return fallback_estimate(request, "llm_error")
+    
+    if ai_data is None:
+        # A reply that never validated counts against the model like an error does
+        llm_guard.breaker.record_failure()
+        return fallback_estimate(request, "invalid_response")
+    llm_guard.breaker.record_success()
+    llm_guard.outcomes[f"answered_by_{answered_by}"] += 1
+    
+    await quote_cache.set(cache_key, ai_data)
+    return ai_data
+
+async def list_documents(collection, query, sort_field, model, limit, cursor, fields, stream):
+    """Keyset-paginated listing with optional field projection or a streamed full export"""
+    try:
+        projection = parse_fields(fields, model.model_fields, ["id", sort_field])
+        query = keyset_query(query, sort_field, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if projection is None:
+        serialize = lambda doc: jsonable_encoder(model(**doc))
+    else:
+        serialize = jsonable_encoder
+    
+    documents = collection.find(query, projection or {"_id": 0}).sort(keyset_sort(sort_field))
+    
+    if stream:
+        async def export():
+            # Emit a JSON array one document at a time so the full history never sits in memory
+            yield "["
+            separator = ""
+            async for doc in documents.batch_size(500):
+                yield separator + json.dumps(serialize(doc))
+                separator = ","
+            yield "]"
+        
+        return StreamingResponse(export(), media_type="application/json")
+    
+    docs = await documents.limit(limit + 1).to_list(limit + 1)
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(docs[-1], sort_field)
+    
+    return JSONResponse(content=[serialize(doc) for doc in docs], headers=headers)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+async def process_quote_job(job, report_progress):
+    """Worker-side quote generation for jobs submitted with ?async=true"""
+    request = RenovationQuoteRequest(**job["payload"]["request"])
+    
+    await report_progress("estimating", 20)
+    ai_data = await generate_ai_estimate(request, job["payload"].get("bypass_cache", False))
+    
+    await report_progress("storing", 90)
+    # The quote takes the job's id, so a retried job replaces its earlier quote instead of adding one
+    quote = build_quote(request, ai_data, quote_id=job["id"])
+    await db.quotes.replace_one({"id": quote.id}, quote.dict(), upsert=True)
+    
+    return quote.dict()
+
+quote_jobs = create_quote_job_queue(db.quote_jobs, process_quote_job)
 
 # Routes
 @api_router.post("/quotes/request", response_model=RenovationQuote)
-async def create_quote_request(request: RenovationQuoteRequest):
+async def create_quote_request(
+    request: RenovationQuoteRequest,
+    bypass_cache: bool = False,
+    async_mode: bool = Query(False, alias="async")
+):
+    check_task_options(request)
     try:
         # Store the request
-        request_dict = prepare_for_mongo(request.dict())
+        request_dict = request.dict()
         await db.quote_requests.insert_one(request_dict)
         
-        # Generate AI-powered cost estimate with detailed subtask analysis
-        components_list = [k.replace('_', ' ').title() for k, v in request.components.dict().items() if v]
-        
-        # Extract detailed subtasks for enhanced analysis
-        detailed_tasks = {}
-        if request.detailed_components:
-            for component, details in request.detailed_components.items():
-                if details.get('enabled'):
-                    selected_subtasks = [k for k, v in details.get('subtasks', {}).items() if v]
-                    if selected_subtasks:
-                        detailed_tasks[component] = selected_subtasks
-        
-        detailed_task_text = ""
-        if detailed_tasks:
-            detailed_task_text = "\nDetailed Sub-tasks Selected:\n"
-            for component, subtasks in detailed_tasks.items():
-                detailed_task_text += f"- {component.replace('_', ' ').title()}: {', '.join([s.replace('_', ' ').title() for s in subtasks])}\n"
+        if async_mode:
+            job = await quote_jobs.submit({"request": request_dict, "bypass_cache": bypass_cache}, provider=LLM_PROVIDER)
+            return JSONResponse(status_code=202, content={
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": f"/api/quotes/jobs/{job['id']}"
+            })
         
-        # Add task options for enhanced pricing
-        task_options_text = ""
-        if request.task_options:
-            task_options_text = "\nSpecific Task Options:\n"
-            options = request.task_options
-            if options.get('skip_bin_size'):
-                task_options_text += f"- Skip Bin Size: {options['skip_bin_size']}\n"
-            if options.get('build_niches_quantity', 0) > 0:
-                task_options_text += f"- Niches Quantity: {options['build_niches_quantity']}\n"
-            if options.get('swing_door_size'):
-                task_options_text += f"- Swing Door Size: {options['swing_door_size']}\n"
-            if options.get('cavity_sliding_size'):
-                task_options_text += f"- Cavity Sliding Size: {options['cavity_sliding_size']}\n"
-            if options.get('minor_costs_amount', 0) > 0:
-                task_options_text += f"- Additional Costs Allowance: ${options['minor_costs_amount']}\n"
-            if options.get('water_feeds_type'):
-                task_options_text += f"- Water Feeds Type: {options['water_feeds_type']} mixer\n"
-            if options.get('power_points_quantity', 0) > 0:
-                task_options_text += f"- Power Points Quantity: {options['power_points_quantity']}\n"
-            if options.get('plasterboard_grade'):
-                task_options_text += f"- Plasterboard Grade: {options['plasterboard_grade'].replace('_', ' ').title()}\n"
-            if options.get('cornice_type'):
-                task_options_text += f"- Cornice Type: {options['cornice_type'].replace('_', ' ').title()}\n"
-            if options.get('floor_tile_grade'):
-                task_options_text += f"- Floor Tile Grade: {options['floor_tile_grade'].replace('_', ' ').title()}\n"
-            if options.get('wall_tile_grade'):
-                task_options_text += f"- Wall Tile Grade: {options['wall_tile_grade'].replace('_', ' ').title()}\n"
-            if options.get('tile_size'):
-                task_options_text += f"- Tile Size: {options['tile_size']}\n"
-            if options.get('feature_tile_grade'):
-                task_options_text += f"- Feature Tile Grade: {options['feature_tile_grade'].replace('_', ' ').title()}\n"
-            if options.get('vanity_grade'):
-                task_options_text += f"- Vanity Grade: {options['vanity_grade'].replace('_', ' ').title()}\n"
-            if options.get('toilet_grade'):
-                task_options_text += f"- Toilet Grade: {options['toilet_grade'].replace('_', ' ').title()}\n"
-            if options.get('shower_screen_grade'):
-                task_options_text += f"- Shower Screen Type: {options['shower_screen_grade'].replace('_', ' ').title()}\n"
-            if options.get('tapware_grade'):
-                task_options_text += f"- Tapware Grade: {options['tapware_grade'].replace('_', ' ').title()}\n"
-            if options.get('lighting_grade'):
-                task_options_text += f"- Lighting Grade: {options['lighting_grade'].replace('_', ' ').title()}\n"
-            if options.get('mirror_grade'):
-                task_options_text += f"- Mirror/Cabinet Type: {options['mirror_grade'].replace('_', ' ').title()}\n"
-            if options.get('tiles_supply_grade'):
-                task_options_text += f"- Tiles Supply Service: {options['tiles_supply_grade'].replace('_', ' ').title()}\n"
+        ai_data = await generate_ai_estimate(request, bypass_cache)
         
-        prompt = f"""
-        Analyze this bathroom renovation project and provide a detailed cost estimate using the specific sub-tasks selected:
-        
-        Room Details:
-        - Dimensions: {request.room_measurements.length}m x {request.room_measurements.width}m x {request.room_measurements.height}m
-        - Floor Area: {request.room_measurements.square_meters:.2f} square meters
-        - Volume: {request.room_measurements.cubic_meters:.2f} cubic meters
-        
-        Selected Main Components: {', '.join(components_list) if components_list else 'None selected'}
-        {detailed_task_text}
-        {task_options_text}
-        
-        Client Location: {request.client_info.address}
-        Additional Notes: {request.additional_notes or 'None'}
-        
-        IMPORTANT: Use the detailed sub-tasks to provide more accurate pricing. Each selected sub-task should influence the cost estimate for that component. Consider:
-        - Complexity of selected sub-tasks
-        - Labor time for specific tasks
-        - Material requirements for each sub-task (INCLUDE SUPPLY COSTS - materials + delivery + labor)
-        - Regional pricing variations
-        
-        CRITICAL PRICING NOTE: Tasks marked "Supply & Install" should include BOTH material costs AND installation labor. 
-        For example, "Supply & Install Wall Sheets" should include: sheet materials + screws + compounds + delivery + labor.
-        Base your pricing on total project cost, not just labor rates.
-        
-        Please provide:
-        1. Total estimated cost based on selected sub-tasks
-        2. Cost breakdown for each selected component (considering specific sub-tasks)
-        3. Cost range (min-max) for each component
-        4. Analysis notes explaining cost factors and how sub-tasks influence pricing
-        5. Confidence level of the estimate
+        # Create quote
+        quote = build_quote(request, ai_data)
         
-        Return the response in this JSON format:
-        {{
-            "total_cost": 0,
-            "breakdown": [
-                {{
-                    "component": "component_name",
-                    "estimated_cost": 0,
-                    "cost_range_min": 0,
-                    "cost_range_max": 0,
-                    "notes": "explanation including sub-task analysis"
-                }}
-            ],
-            "analysis": "detailed analysis text mentioning specific sub-tasks and their impact on pricing",
-            "confidence": "High/Medium/Low"
-        }}
-        """
+        # Store the quote
+        quote_dict = quote.dict()
+        await db.quotes.insert_one(quote_dict)
         
-        ai_message = UserMessage(text=prompt)
-        ai_response = await llm_chat.send_message(ai_message)
+        return quote
         
-        # Parse AI response
-        import json
-        import re
+    except Exception as e:
+        logging.error(f"Error creating quote: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating quote: {str(e)}")
+
+SSE_HEARTBEAT_SECONDS = 5
+
+@api_router.post("/quotes/request/stream")
+async def stream_quote_request(request: RenovationQuoteRequest, bypass_cache: bool = False):
+    """Server-Sent Events variant of /quotes/request.
+
+    Emits `request` once the request is stored, a `preliminary` rate-table estimate,
+    a `breakdown` event per LLM cost line and finally the validated `quote`.
+    """
+    check_task_options(request)
+    
+    async def event_stream():
+        llm_task = None
         try:
-            # Try to extract JSON from the AI response
-            json_match = re.search(r'\{[\s\S]*\}', ai_response)
-            if json_match:
-                ai_data = json.loads(json_match.group())
-            else:
-                raise ValueError("No JSON found in response")
+            await db.quote_requests.insert_one(request.dict())
+            yield sse_event("request", {"request_id": request.id})
             
-            # Validate required fields
-            if not all(key in ai_data for key in ['total_cost', 'breakdown', 'analysis', 'confidence']):
-                raise ValueError("Missing required fields in AI response")
-                
-        except Exception as e:
-            print(f"AI JSON parsing error: {e}")
-            print(f"AI Response: {ai_response}")
+            yield sse_event("preliminary", estimate_quote(request, corrections=pricing_learner.corrections))
             
-            # Fallback with more intelligent pricing based on components
-            base_cost_per_sqm = 1200  # Base cost per square meter
-            area = request.room_measurements.square_meters
-            base_total = base_cost_per_sqm * area
+            llm_task = asyncio.create_task(generate_ai_estimate(request, bypass_cache))
+            while True:
+                done, _ = await asyncio.wait({llm_task}, timeout=SSE_HEARTBEAT_SECONDS)
+                if done:
+                    break
+                # Comment line keeps proxies from closing an idle connection while the model works
+                yield ": waiting for estimate\n\n"
+            ai_data = llm_task.result()
             
-            # Component-specific cost multipliers
-            component_costs = {
-                "Demolition": base_total * 0.15,
-                "Framing": base_total * 0.20,
-                "Plumbing Rough In": base_total * 0.25,
-                "Electrical Rough In": base_total * 0.15,
-                "Plastering": base_total * 0.18,
-                "Waterproofing": base_total * 0.12,
-                "Tiling": base_total * 0.30,
-                "Fit Off": base_total * 0.20
-            }
+            quote = build_quote(request, ai_data)
+            for item in quote.cost_breakdown:
+                yield sse_event("breakdown", item)
             
-            breakdown_items = []
-            total_fallback_cost = 0
-            
-            for comp in components_list:
-                cost = component_costs.get(comp, base_total * 0.15)
-                total_fallback_cost += cost
-                breakdown_items.append({
-                    "component": comp,
-                    "estimated_cost": round(cost),
-                    "cost_range_min": round(cost * 0.8),
-                    "cost_range_max": round(cost * 1.3),
-                    "notes": f"Standard pricing for {comp.lower()} based on {area:.1f}m² area"
-                })
+            await db.quotes.insert_one(quote.dict())
+            yield sse_event("quote", quote)
+        except Exception as e:
+            logger.error(f"Error streaming quote: {str(e)}")
+            yield sse_event("error", {"detail": f"Error generating quote: {str(e)}"})
+        finally:
+            if llm_task is not None and not llm_task.done():
+                llm_task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+QUOTE_BATCH_MAX_SIZE = int(os.environ.get('QUOTE_BATCH_MAX_SIZE', 500))
+QUOTE_BATCH_CONCURRENCY = int(os.environ.get('QUOTE_BATCH_CONCURRENCY', 8))
+
+@api_router.post("/quotes/batch")
+async def create_quote_batch(requests: List[RenovationQuoteRequest], bypass_cache: bool = False):
+    """Price many rooms at once, streaming one NDJSON line per request as it completes.
+
+    Requests with identical room/spec inputs are priced once and share the estimate.
+    """
+    if len(requests) > QUOTE_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large: {len(requests)} requests (max {QUOTE_BATCH_MAX_SIZE})")
+    if not requests:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    for index, request in enumerate(requests):
+        try:
+            validate_task_options(request.task_options)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Request {index}: {str(e)}")
+    
+    try:
+        await db.quote_requests.insert_many([request.dict() for request in requests], ordered=False)
+    except Exception as e:
+        logger.error(f"Error storing quote batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error storing quote batch: {str(e)}")
+    
+    groups = {}
+    for index, request in enumerate(requests):
+        groups.setdefault(quote_cache_key(request), []).append(index)
+    
+    semaphore = asyncio.Semaphore(QUOTE_BATCH_CONCURRENCY)
+    
+    async def price_group(indexes):
+        async with semaphore:
+            return indexes, await generate_ai_estimate(requests[indexes[0]], bypass_cache)
+    
+    async def result_stream():
+        pending = {asyncio.create_task(price_group(indexes)): indexes for indexes in groups.values()}
+        failed = 0
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                
+                lines, quote_docs = [], []
+                for task in done:
+                    indexes = pending.pop(task)
+                    if task.exception() is not None:
+                        failed += len(indexes)
+                        for index in indexes:
+                            lines.append({"index": index, "request_id": requests[index].id, "error": str(task.exception())})
+                        continue
+                    
+                    _, ai_data = task.result()
+                    for index in indexes:
+                        quote = build_quote(requests[index], ai_data)
+                        quote_docs.append(quote.dict())
+                        lines.append({"index": index, "request_id": requests[index].id, "quote": quote})
+                
+                # Everything that finished together is written in one round trip before it is reported
+                if quote_docs:
+                    await db.quotes.insert_many(quote_docs, ordered=False)
+                for line in lines:
+                    yield json.dumps(jsonable_encoder(line)) + "\n"
             
-            ai_data = {
-                "total_cost": round(total_fallback_cost),
-                "breakdown": breakdown_items,
-                "analysis": f"Cost estimate based on {area:.1f}m² bathroom with {len(components_list)} selected components. Pricing includes materials and labor at standard market rates.",
-                "confidence": "Medium"
-            }
-        
-        # Create quote
-        cost_breakdown = [
-            CostBreakdown(
-                component=item["component"],
-                estimated_cost=item["estimated_cost"],
-                cost_range_min=item["cost_range_min"],
-                cost_range_max=item["cost_range_max"],
-                notes=item["notes"]
-            ) for item in ai_data["breakdown"]
-        ]
-        
-        quote = RenovationQuote(
-            id=str(uuid.uuid4()),
-            request_id=request.id,
-            total_cost=ai_data["total_cost"],
-            cost_breakdown=cost_breakdown,
-            ai_analysis=ai_data["analysis"],
-            confidence_level=ai_data["confidence"]
-        )
-        
-        # Store the quote
-        quote_dict = prepare_for_mongo(quote.dict())
-        await db.quotes.insert_one(quote_dict)
-        
+            yield json.dumps({"summary": {"requests": len(requests), "unique": len(groups), "failed": failed}}) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming quote batch: {str(e)}")
+            yield json.dumps({"error": f"Error generating quote batch: {str(e)}"}) + "\n"
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+@api_router.get("/quotes/jobs/{job_id}")
+async def get_quote_job(job_id: str):
+    """Status, progress and (once completed) the quote for an async quote job"""
+    job = await quote_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return jsonable_encoder(job)
+
+@api_router.post("/quotes/estimate", response_model=RenovationQuote)
+async def estimate_quote_request(request: RenovationQuoteRequest, mode: str = "fast", rate_table: Optional[str] = None, bypass_cache: bool = False):
+    """Price a request instantly from the rate tables (mode=fast) or via the LLM (mode=full)"""
+    check_task_options(request)
+    if mode == "full":
+        return await create_quote_request(request, bypass_cache=bypass_cache, async_mode=False)
+    if mode != "fast":
+        raise HTTPException(status_code=400, detail=f"Unknown estimate mode: {mode}")
+    
+    try:
+        quote = build_quote(request, estimate_quote(request, version=rate_table, corrections=pricing_learner.corrections))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        await db.quote_requests.insert_one(request.dict())
+        await db.quotes.insert_one(quote.dict())
         return quote
-        
     except Exception as e:
-        logging.error(f"Error creating quote: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error generating quote: {str(e)}")
+        logger.error(f"Error storing fast estimate: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating estimate: {str(e)}")
 
 @api_router.get("/quotes/{quote_id}", response_model=RenovationQuote)
 async def get_quote(quote_id: str):
@@ -424,42 +685,131 @@ async def get_quote(quote_id: str):
     if not quote:
         raise HTTPException(status_code=404, detail="Quote not found")
     
-    quote = parse_from_mongo(quote)
     return RenovationQuote(**quote)
 
 @api_router.post("/quotes/{quote_id}/adjust")
 async def adjust_quote_cost(quote_id: str, adjustment: CostAdjustment):
-    # Store the adjustment for learning (remove quote_id from model, use path parameter)
+    """Adjust a quote's costs as a new revision; 409 if `expected_revision` is out of date"""
+    quote = await db.quotes.find_one({"id": quote_id}, {"_id": 0})
+    if not quote:
+        raise HTTPException(status_code=404, detail="Quote not found")
+    
+    try:
+        cost_breakdown, total_cost = apply_adjustment(quote["cost_breakdown"], adjustment.component_adjustments, adjustment.adjusted_cost)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    expected = quote.get("revision", 0) if adjustment.expected_revision is None else adjustment.expected_revision
+    try:
+        revision = await append_revision(
+            db, quote, expected, {"total_cost": total_cost, "cost_breakdown": cost_breakdown},
+            "adjusted", adjustment_id=adjustment.id, reason=adjustment.adjustment_reason
+        )
+    except RevisionConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "current_revision": e.current})
+    
+    # Store the adjustment for learning (quote_id comes from the path); the recorded
+    # total is the one applied, which always matches the breakdown
     adjustment.quote_id = quote_id
-    adjustment_dict = prepare_for_mongo(adjustment.dict())
-    await db.cost_adjustments.insert_one(adjustment_dict)
+    adjustment.original_cost = quote["total_cost"]
+    adjustment.adjusted_cost = total_cost
+    adjustment.revision = revision
+    await db.cost_adjustments.insert_one(adjustment.dict())
     
-    # Update the quote with adjusted cost
-    await db.quotes.update_one(
-        {"id": quote_id},
-        {"$set": {"total_cost": adjustment.adjusted_cost, "updated_at": datetime.now(timezone.utc).isoformat()}}
-    )
+    return {
+        "message": "Quote adjusted successfully",
+        "new_total": total_cost,
+        "revision": revision,
+        "cost_breakdown": cost_breakdown
+    }
+
+@api_router.get("/quotes/{quote_id}/revisions", response_model=List[QuoteRevision])
+async def get_quote_revisions(quote_id: str, limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), before: Optional[int] = None):
+    """Revision history of a quote, newest first; page with `before` (a revision number)"""
+    query: Dict[str, Any] = {"quote_id": quote_id}
+    if before is not None:
+        query["revision"] = {"$lt": before}
+    revisions = await db.quote_revisions.find(query, {"_id": 0}).sort("revision", -1).limit(limit).to_list(limit)
+    if not revisions and before is None:
+        # Nothing logged yet: the quote's current state is its only revision
+        quote = await db.quotes.find_one({"id": quote_id}, {"revision": 1})
+        if not quote:
+            raise HTTPException(status_code=404, detail="Quote not found")
+        revisions = [await get_revision(db, quote_id, quote.get("revision", 0))]
+    return revisions
+
+@api_router.get("/quotes/{quote_id}/revisions/{revision}", response_model=QuoteRevision)
+async def get_quote_revision(quote_id: str, revision: int):
+    """A single revision of a quote"""
+    event = await get_revision(db, quote_id, revision)
+    if event is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return event
+
+def cached_json(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": supplier_index.cache_control}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/suppliers")
+async def get_suppliers(components: Optional[str] = None, if_none_match: Optional[str] = Header(None)):
+    """Suppliers for several components in one response (all components when none are given)"""
+    names = supplier_index.parse_components(components)
+    if len(names) > SUPPLIER_BULK_MAX_COMPONENTS:
+        raise HTTPException(status_code=400, detail=f"At most {SUPPLIER_BULK_MAX_COMPONENTS} components per request")
+    
+    body, etag = supplier_index.bulk(names)
+    return cached_json(body, etag, if_none_match)
+
+@api_router.get("/suppliers/nearby")
+async def get_nearby_suppliers(
+    component: str,
+    address: str,
+    limit: int = Query(5, ge=1, le=50),
+    max_km: float = Query(100, gt=0, le=5000)
+):
+    """Suppliers for a component nearest the given address, by straight-line distance"""
+    origin = geocoder.geocode(address)
+    if origin is None:
+        raise HTTPException(status_code=400, detail="Could not locate address; include a postcode or state")
+    
+    try:
+        suppliers = await supplier_store.nearby(component, origin, limit, max_km)
+    except Exception as e:
+        logger.error(f"Error finding nearby suppliers: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error finding nearby suppliers: {str(e)}")
     
-    return {"message": "Quote adjusted successfully", "new_total": adjustment.adjusted_cost}
+    return {
+        "component": component,
+        "origin": {"postcode": origin.postcode, "latitude": origin.latitude, "longitude": origin.longitude, "precision": origin.precision},
+        "suppliers": suppliers
+    }
 
 @api_router.get("/suppliers/{component}")
-async def get_suppliers_for_component(component: str):
-    if component not in MATERIAL_SUPPLIERS:
+async def get_suppliers_for_component(component: str, if_none_match: Optional[str] = Header(None)):
+    cached = supplier_index.component(component)
+    if cached is None:
         raise HTTPException(status_code=404, detail="Component not found")
     
-    return {"component": component, "suppliers": MATERIAL_SUPPLIERS[component]}
+    return cached_json(*cached, if_none_match)
 
 @api_router.get("/quotes", response_model=List[RenovationQuote])
-async def get_all_quotes():
-    quotes = await db.quotes.find().to_list(1000)
-    return [RenovationQuote(**parse_from_mongo(quote)) for quote in quotes]
+async def get_all_quotes(
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: bool = False
+):
+    """List quotes newest first; pass the X-Next-Cursor response header back as ?cursor= for the next page"""
+    return await list_documents(db.quotes, {}, "created_at", RenovationQuote, limit, cursor, fields, stream)
 
 # Project Management Endpoints
 @api_router.post("/projects/save", response_model=SavedProject)
 async def save_project(project: SavedProject):
     """Save a project for future reference"""
     try:
-        project_dict = prepare_for_mongo(project.dict())
+        project_dict = project.dict()
         await db.saved_projects.insert_one(project_dict)
         return project
     except Exception as e:
@@ -467,15 +817,22 @@ async def save_project(project: SavedProject):
         raise HTTPException(status_code=500, detail=f"Error saving project: {str(e)}")
 
 @api_router.get("/projects", response_model=List[SavedProject])
-async def get_saved_projects(category: Optional[str] = None):
-    """Get all saved projects, optionally filtered by category"""
+async def get_saved_projects(
+    category: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: bool = False
+):
+    """Get saved projects (most recently updated first), optionally filtered by category"""
+    query = {}
+    if category and category != "All":
+        query["category"] = category
+    
     try:
-        query = {}
-        if category and category != "All":
-            query["category"] = category
-        
-        projects = await db.saved_projects.find(query).sort("updated_at", -1).to_list(1000)
-        return [SavedProject(**parse_from_mongo(project)) for project in projects]
+        return await list_documents(db.saved_projects, query, "updated_at", SavedProject, limit, cursor, fields, stream)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching projects: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching projects: {str(e)}")
@@ -485,7 +842,7 @@ async def update_project(project_id: str, update: ProjectUpdate):
     """Update project name, category, or notes"""
     try:
         update_data = {k: v for k, v in update.dict().items() if v is not None}
-        update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+        update_data["updated_at"] = datetime.now(timezone.utc)
         
         result = await db.saved_projects.update_one(
             {"id": project_id},
@@ -527,35 +884,33 @@ async def get_project_categories():
 async def get_project_quote(project_id: str):
     """Get the full quote data for a saved project"""
     try:
-        project = await db.saved_projects.find_one({"id": project_id})
-        if not project:
+        bundle = await fetch_project_quote(db, project_id)
+        if not bundle:
             raise HTTPException(status_code=404, detail="Project not found")
-        
-        quote = await db.quotes.find_one({"id": project["quote_id"]})
-        if not quote:
+        if not bundle["quote"]:
             raise HTTPException(status_code=404, detail="Quote not found")
         
-        request_data = await db.quote_requests.find_one({"id": quote.get("request_id")})
-        
         return {
-            "project": SavedProject(**parse_from_mongo(project)),
-            "quote": RenovationQuote(**parse_from_mongo(quote)),
-            "request": parse_from_mongo(request_data) if request_data else None
+            "project": SavedProject(**bundle["project"]),
+            "quote": RenovationQuote(**bundle["quote"]),
+            "request": bundle["request"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching project quote: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching project quote: {str(e)}")
 
 @api_router.post("/quotes/save-draft")
 async def save_draft_quote(draft_data: Dict[str, Any]):
-    """Save a draft quote and request for incomplete projects"""
+    """Save a draft quote and request for incomplete projects (superseded by POST /quotes/drafts)"""
     try:
-        quote_dict = prepare_for_mongo(draft_data["quote"])
-        request_dict = prepare_for_mongo(draft_data["request"])
+        quote_dict = coerce_datetimes(draft_data["quote"])
+        request_dict = coerce_datetimes(draft_data["request"])
         
-        # Store both draft quote and request
-        await db.quotes.insert_one(quote_dict)
-        await db.quote_requests.insert_one(request_dict)
+        # Upsert by id so a retried save does not store the draft twice
+        await db.quotes.replace_one({"id": quote_dict["id"]}, quote_dict, upsert=True)
+        await db.quote_requests.replace_one({"id": request_dict["id"]}, request_dict, upsert=True)
         
         return {"message": "Draft saved successfully"}
         
@@ -563,8 +918,124 @@ async def save_draft_quote(draft_data: Dict[str, Any]):
         logger.error(f"Error saving draft: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error saving draft: {str(e)}")
 
+async def write_draft(draft: DraftSave, idempotency_key: Optional[str]) -> Dict[str, Any]:
+    """Save a draft through the draft store, answering repeats of an Idempotency-Key from the first response"""
+    if idempotency_key:
+        try:
+            replay = await idempotency_store.begin("drafts", idempotency_key, draft.dict())
+        except IdempotencyError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        if replay is not None:
+            return replay
+    
+    draft_id = draft.draft_id or f"draft_{uuid.uuid4()}"
+    request, project = split_draft(draft.dict())
+    # A full save replaces the draft, so write out any patches it is based on first
+    await draft_autosave.flush(draft_id)
+    try:
+        result = await draft_store.save(draft_id, request, project, draft.expected_revision)
+    except Exception as e:
+        # Free the key so the client can retry; a cancelled save is freed by the key's lock timeout
+        if idempotency_key:
+            await idempotency_store.release("drafts", idempotency_key)
+        if isinstance(e, RevisionConflict):
+            raise HTTPException(status_code=409, detail={"message": str(e), "current_revision": e.current})
+        logger.error(f"Error saving draft: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error saving draft: {str(e)}")
+    
+    draft_autosave.replaced(draft_id)
+    response = {"message": "Draft saved successfully", **result}
+    if idempotency_key:
+        await idempotency_store.complete("drafts", idempotency_key, response)
+    return response
+
+@api_router.post("/quotes/drafts")
+async def save_draft(draft: DraftSave, idempotency_key: Optional[str] = Header(None)):
+    """Save a draft's quote, request and saved project in one call.
+
+    Repeat saves with the returned draft_id update the same three documents. A retried
+    request with the same Idempotency-Key gets the original response without writing again.
+    """
+    return await write_draft(draft, idempotency_key)
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Draft revision from an If-Match header such as "7" or W/"7" """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a draft revision")
+
+@api_router.get("/quotes/drafts/{draft_id}")
+async def get_draft(draft_id: str):
+    """The draft as the server holds it, including patches not yet written to the database"""
+    held = await draft_autosave.get(draft_id)
+    if held is None:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    
+    document, revision = held
+    return JSONResponse(
+        {"draft_id": draft_id, "revision": revision, "draft": jsonable_encoder(document)},
+        headers={"ETag": f'"{revision}"'}
+    )
+
+@api_router.patch("/quotes/drafts/{draft_id}")
+async def patch_draft(draft_id: str, request: Request, if_match: Optional[str] = Header(None)):
+    """Apply a JSON Patch or merge patch to a draft ({project_name, notes, request}).
+
+    Send If-Match with the revision the patch was made against; a stale one gets 412.
+    Patches are coalesced in memory and written to MongoDB once editing pauses. If that
+    write lost to a change made elsewhere, the next patch gets 412 with `lost_revision`.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in (JSON_PATCH_TYPE, MERGE_PATCH_TYPE):
+        raise HTTPException(status_code=415, detail=f"Use {JSON_PATCH_TYPE} or {MERGE_PATCH_TYPE}")
+    expected = parse_if_match(if_match)
+    try:
+        patch = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Patch body is not valid JSON")
+    
+    try:
+        revision = await draft_autosave.patch(draft_id, patch, content_type, expected)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    except DraftChangesLost as e:
+        raise HTTPException(status_code=412, detail={"message": str(e), "current_revision": e.current, "lost_revision": e.expected})
+    except RevisionConflict as e:
+        raise HTTPException(status_code=412, detail={"message": str(e), "current_revision": e.current})
+    except PatchTestFailed as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return JSONResponse({"draft_id": draft_id, "revision": revision}, headers={"ETag": f'"{revision}"'})
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+async def render_into_cache(quote_data: Dict[str, Any], user_profile: Dict[str, Any], cache_key: str, run):
+    """Render a proposal into the disk cache and return it as an open file.
+
+    The worker writes the PDF to a scratch file next to the cache, so the bytes never pass
+    through this process. The handle stays valid if the cache declines or evicts the file.
+    """
+    path = pdf_cache.new_temp_path()
+    try:
+        await run(render_proposal_file, quote_data, user_profile, path)
+        pdf_file = open(path, 'rb')
+    except BaseException:
+        os.remove(path)
+        raise
+    pdf_cache.put_file(cache_key, path)
+    return pdf_file
+
 @api_router.post("/quotes/{quote_id}/generate-proposal")
-async def generate_proposal_pdf(quote_id: str, user_profile: UserProfile):
+async def generate_proposal_pdf(quote_id: str, user_profile: UserProfile, if_none_match: Optional[str] = Header(None)):
     """Generate a professional scope of works PDF proposal"""
     try:
         # Get the quote data
@@ -572,34 +1043,159 @@ async def generate_proposal_pdf(quote_id: str, user_profile: UserProfile):
         if not quote:
             raise HTTPException(status_code=404, detail="Quote not found")
         
-        # Get the original request data
-        request_data = await db.quote_requests.find_one({"id": quote.get("request_id")})
-        if not request_data:
-            raise HTTPException(status_code=404, detail="Quote request data not found")
-        
-        # Combine quote and request data
-        combined_data = {
-            **parse_from_mongo(quote),
-            **parse_from_mongo(request_data)
+        # Rendered proposals are cached per quote revision (bumped by /adjust) and profile
+        cache_key = proposal_cache_key(quote_id, quote.get("revision", 0), user_profile.dict(), datetime.now().strftime('%Y-%m-%d'))
+        etag = f'"{cache_key}"'
+        headers = {
+            "Content-Disposition": f"attachment; filename=Bathroom_Proposal_{quote_id[:8]}.pdf",
+            "ETag": etag,
+            "Cache-Control": "private, no-cache"
         }
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
         
-        # Generate PDF
-        pdf_generator = BathroomProposalPDF()
-        pdf_bytes = pdf_generator.create_proposal(combined_data, user_profile.dict())
+        pdf_file = pdf_cache.open(cache_key)
+        if pdf_file is None:
+            # Get the original request data
+            request_data = await db.quote_requests.find_one({"id": quote.get("request_id")})
+            if not request_data:
+                raise HTTPException(status_code=404, detail="Quote request data not found")
+            
+            # Combine quote and request data
+            combined_data = {
+                **quote,
+                **request_data
+            }
+            
+            combined_data.pop("_id", None)
+            
+            # Generate PDF off the event loop; a saturated pool answers 503 + Retry-After
+            try:
+                pdf_file = await render_into_cache(combined_data, user_profile.dict(), cache_key, pdf_render_pool.run)
+            except PdfPoolSaturated as e:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Proposal renderer is busy, please retry",
+                    headers={"Retry-After": str(e.retry_after)}
+                )
         
-        # Return PDF as response
-        return Response(
-            content=pdf_bytes,
+        # Stream the PDF from disk rather than holding it in memory
+        headers["Content-Length"] = str(os.fstat(pdf_file.fileno()).st_size)
+        return StreamingResponse(
+            stream_file(pdf_file),
             media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=Bathroom_Proposal_{quote_id[:8]}.pdf"
-            }
+            headers=headers
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating proposal PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating proposal: {str(e)}")
 
+PROPOSAL_BATCH_MAX_SIZE = int(os.environ.get('PROPOSAL_BATCH_MAX_SIZE', 200))
+# A merged PDF is laid out as one story held in a single worker's memory (several passes
+# for the table of contents), so it grows with the batch; larger batches should use the ZIP format
+PROPOSAL_BATCH_PDF_MAX_SIZE = int(os.environ.get('PROPOSAL_BATCH_PDF_MAX_SIZE', 25))
+
+async def render_for_batch(func, *args):
+    """Pool render for batch exports: waits out a saturated pool instead of failing mid-stream"""
+    while True:
+        try:
+            return await pdf_render_pool.run(func, *args)
+        except PdfPoolSaturated as e:
+            await asyncio.sleep(min(e.retry_after, 5))
+
+@api_router.post("/proposals/batch")
+async def generate_proposal_batch(batch: ProposalBatchRequest):
+    """Proposals for many quotes, streamed as a ZIP or as one merged PDF with a table of contents.
+
+    ZIP batches are rendered per quote and allow up to PROPOSAL_BATCH_MAX_SIZE quotes; a
+    merged PDF is built in one piece and is capped at PROPOSAL_BATCH_PDF_MAX_SIZE.
+    """
+    if batch.format not in ("zip", "pdf"):
+        raise HTTPException(status_code=400, detail=f"Unknown batch format: {batch.format}")
+    
+    quote_ids = list(dict.fromkeys(batch.quote_ids))
+    if not quote_ids:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(quote_ids) > PROPOSAL_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large: {len(quote_ids)} quotes (max {PROPOSAL_BATCH_MAX_SIZE})")
+    if batch.format == "pdf" and len(quote_ids) > PROPOSAL_BATCH_PDF_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large for a merged PDF: {len(quote_ids)} quotes (max {PROPOSAL_BATCH_PDF_MAX_SIZE}); use format=zip"
+        )
+    
+    try:
+        proposals, missing = await fetch_proposal_data(db, quote_ids)
+        if missing:
+            raise HTTPException(status_code=404, detail={"message": "Quotes not found", "quote_ids": missing})
+        
+        user_profile = batch.user_profile.dict()
+        proposal_date = datetime.now().strftime('%Y-%m-%d')
+        
+        if batch.format == "zip":
+            async def render(quote_data):
+                # Same cache entries as the single-proposal endpoint
+                cache_key = proposal_cache_key(quote_data["quote_id"], quote_data.get("revision", 0), user_profile, proposal_date)
+                return pdf_cache.open(cache_key) or await render_into_cache(quote_data, user_profile, cache_key, render_for_batch)
+            
+            return StreamingResponse(
+                stream_zip(proposals, render, lambda quote_data: f"Bathroom_Proposal_{quote_data['quote_id']}.pdf", pdf_render_pool.max_workers),
+                media_type="application/zip",
+                headers={"Content-Disposition": "attachment; filename=Bathroom_Proposals.zip"}
+            )
+        
+        # One document with a single table of contents cannot be split across workers;
+        # the worker writes it to disk and it is streamed back from there
+        fd, path = tempfile.mkstemp(suffix=".pdf", prefix="proposal_batch_")
+        os.close(fd)
+        try:
+            await render_for_batch(render_batch_proposal, proposals, user_profile, path)
+            pdf_file = open(path, 'rb')
+        except BaseException:
+            os.remove(path)
+            raise
+        
+        return StreamingResponse(
+            stream_file(pdf_file, delete=True),
+            media_type="application/pdf",
+            headers={"Content-Disposition": "attachment; filename=Bathroom_Proposals.pdf"}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating proposal batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating proposals: {str(e)}")
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Operational counters for the quoting pipeline"""
+    return {
+        "quote_cache": await quote_cache.stats(),
+        "prompt": prompt_stats.stats(),
+        "estimate_output": estimate_output_stats.stats(),
+        "llm": llm_pool.stats(),
+        "llm_guard": llm_guard.stats(),
+        "model_router": model_router.stats(),
+        "pricing_corrections": pricing_learner.stats(),
+        "suppliers": {**supplier_index.stats(), "nearby": supplier_store.stats()},
+        "drafts": {**draft_store.stats(), "idempotency": idempotency_store.stats(), "autosave": draft_autosave.stats()},
+        "quote_jobs": quote_jobs.stats(),
+        "pdf_cache": pdf_cache.stats(),
+        "pdf_render": pdf_render_pool.stats()
+    }
+
+@api_router.get("/health/indexes")
+async def get_index_status():
+    """Index build status; 503 until every index is in place"""
+    return JSONResponse(
+        status_code=200 if index_manager.ready else 503,
+        content=jsonable_encoder(index_manager.status())
+    )
+
 @api_router.get("/")
 async def root():
     return {"message": "Bathroom Renovation Quoting API"}
@@ -607,12 +1203,24 @@ async def root():
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.middleware("http")
+async def require_indexes(request, call_next):
+    path = request.url.path
+    if REQUIRE_INDEXES and not index_manager.ready and path.startswith("/api") and path != "/api/health/indexes":
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"Database indexes not ready ({index_manager.state})"},
+            headers={"Retry-After": "5"}
+        )
+    return await call_next(request)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -622,6 +1230,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def load_supplier_catalogue():
+    """Seed the suppliers collection if it is empty, then serve the catalogue from it"""
+    global supplier_index
+    catalogue = None
+    while True:
+        try:
+            await supplier_store.seed(jsonable_encoder(MATERIAL_SUPPLIERS))
+            latest = await supplier_store.catalogue()
+            if latest != catalogue:
+                supplier_index = SupplierIndex(latest, max_age=SUPPLIER_CACHE_MAX_AGE)
+                catalogue = latest
+                logger.info(f"Supplier catalogue loaded: {sum(map(len, latest.values()))} listings across {len(latest)} components")
+        except Exception as e:
+            logger.error(f"Loading the supplier catalogue failed: {str(e)}")
+        if SUPPLIER_INDEX_REFRESH_SECONDS <= 0:
+            return
+        await asyncio.sleep(SUPPLIER_INDEX_REFRESH_SECONDS)
+
+@app.on_event("startup")
+async def start_background_services():
+    index_manager.start()
+    await quote_jobs.start()
+    pricing_learner.start()
+    # Kept on the app so the task is not garbage collected before it finishes
+    app.state.supplier_catalogue = asyncio.create_task(load_supplier_catalogue())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await index_manager.stop()
+    await quote_jobs.stop()
+    await pricing_learner.stop()
+    await draft_autosave.stop()
+    app.state.supplier_catalogue.cancel()
+    pdf_render_pool.shutdown()
     client.close()
\ No newline at end of file
@@ -0,0 +1,69 @@
+import hashlib
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+
+def _dumps(value) -> bytes:
+    # Same encoding FastAPI's JSONResponse uses, so cached bodies match what it would send
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class SupplierIndex:
+    """Supplier lists serialized once, with a strong ETag per response body.
+
+    The per-component bodies are built when the index is created. Bulk bodies are
+    stitched together from the already-encoded supplier arrays, and cached per
+    component set, so no request re-serializes a model.
+    """
+
+    def __init__(self, suppliers: Dict[str, List], max_age: int = 3600):
+        self.max_age = max_age
+        self._arrays: Dict[str, bytes] = {
+            component: _dumps(jsonable_encoder(items)) for component, items in suppliers.items()
+        }
+        self._bodies: Dict[str, Tuple[bytes, str]] = {}
+        for component, array in self._arrays.items():
+            body = b'{"component":' + _dumps(component) + b',"suppliers":' + array + b'}'
+            self._bodies[component] = (body, _etag(body))
+        self.components = sorted(self._arrays)
+        self.bulk = lru_cache(maxsize=256)(self._bulk)
+
+    @property
+    def cache_control(self) -> str:
+        return f"public, max-age={self.max_age}"
+
+    def component(self, component: str) -> Optional[Tuple[bytes, str]]:
+        """(body, etag) for one component, or None when it has no suppliers"""
+        return self._bodies.get(component)
+
+    def parse_components(self, components: Optional[str]) -> Tuple[str, ...]:
+        """Normalise a comma separated component list into a sorted, de-duplicated cache key"""
+        if not components:
+            return tuple(self.components)
+        return tuple(sorted({name.strip() for name in components.split(',') if name.strip()}))
+
+    def _bulk(self, components: Tuple[str, ...]) -> Tuple[bytes, str]:
+        found = [name for name in components if name in self._arrays]
+        unknown = [name for name in components if name not in self._arrays]
+        body = (
+            b'{"suppliers":{'
+            + b','.join(_dumps(name) + b':' + self._arrays[name] for name in found)
+            + b'},"unknown":' + _dumps(unknown) + b'}'
+        )
+        return body, _etag(body)
+
+    def stats(self) -> Dict[str, int]:
+        info = self.bulk.cache_info()
+        return {
+            "components": len(self._bodies),
+            "bulk_cached": info.currsize,
+            "bulk_hits": info.hits,
+            "bulk_misses": info.misses,
+        }
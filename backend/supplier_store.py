@@ -0,0 +1,123 @@
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, Iterable, List
+
+from pymongo import UpdateOne
+
+from geocoding import GeoPoint, PostcodeGeocoder
+
+logger = logging.getLogger(__name__)
+
+SUPPLIER_ID_NAMESPACE = uuid.UUID('5b0f6d1e-3a8c-4d2b-9f1e-7c6a2d9e4b10')
+
+
+def supplier_id(name: str, address: str) -> str:
+    """Stable id so re-importing the same supplier updates it instead of duplicating it"""
+    return str(uuid.uuid5(SUPPLIER_ID_NAMESPACE, f"{name}|{address}".lower()))
+
+
+class SupplierStore:
+    """Suppliers in MongoDB with a GeoJSON location, queried nearest-first with $geoNear.
+
+    The (location 2dsphere, components) index lets $geoNear walk outwards from the client
+    and filter by component inside the index, so a query touches roughly `limit` documents
+    whether the collection holds a hundred suppliers or tens of thousands.
+    """
+
+    def __init__(self, collection, geocoder: PostcodeGeocoder):
+        self.collection = collection
+        self.geocoder = geocoder
+        self.queries = 0
+        self._query_seconds = deque(maxlen=500)
+
+    async def upsert(self, suppliers: Iterable[Dict[str, Any]], batch_size: int = 1000) -> Dict[str, int]:
+        """Insert or update suppliers (name, address, phone, specialties, components).
+
+        Each one is located from its address; suppliers that cannot be located are skipped.
+        Writes go out as unordered bulk batches so large imports stay a handful of round trips.
+        """
+        written, skipped, batch = 0, 0, []
+        for supplier in suppliers:
+            point = self.geocoder.geocode(supplier["address"])
+            if point is None:
+                skipped += 1
+                continue
+            document = {
+                **supplier,
+                "id": supplier.get("id") or supplier_id(supplier["name"], supplier["address"]),
+                "postcode": point.postcode,
+                "location": point.geojson(),
+            }
+            batch.append(UpdateOne({"id": document["id"]}, {"$set": document}, upsert=True))
+            if len(batch) >= batch_size:
+                await self.collection.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        if batch:
+            await self.collection.bulk_write(batch, ordered=False)
+            written += len(batch)
+        return {"written": written, "skipped": skipped}
+
+    async def seed(self, catalogue: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Load the built-in catalogue into an empty collection"""
+        if await self.collection.count_documents({}, limit=1):
+            return
+        merged: Dict[str, Dict[str, Any]] = {}
+        for component, suppliers in catalogue.items():
+            for supplier in suppliers:
+                key = supplier_id(supplier["name"], supplier["address"])
+                entry = merged.setdefault(key, {
+                    "name": supplier["name"], "address": supplier["address"], "phone": supplier["phone"],
+                    "specialties": supplier["specialties"], "components": [],
+                })
+                entry["components"].append(component)
+        result = await self.upsert(merged.values())
+        logger.info(f"Seeded supplier store: {result}")
+
+    async def catalogue(self, per_component: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+        """Suppliers grouped by component, alphabetical, at most `per_component` each"""
+        results = await self.collection.aggregate([
+            {"$unwind": "$components"},
+            {"$sort": {"components": 1, "name": 1, "id": 1}},
+            {"$group": {"_id": "$components", "suppliers": {"$push": {
+                "id": "$id", "name": "$name", "address": "$address", "phone": "$phone",
+                "specialties": "$specialties", "postcode": "$postcode",
+            }}}},
+            {"$project": {"suppliers": {"$slice": ["$suppliers", per_component]}}},
+        ]).to_list(None)
+        return {group["_id"]: group["suppliers"] for group in sorted(results, key=lambda group: group["_id"])}
+
+    async def nearby(self, component: str, origin: GeoPoint, limit: int = 5, max_km: float = 100) -> List[Dict[str, Any]]:
+        """The `limit` nearest suppliers for a component within `max_km`, closest first"""
+        started = time.perf_counter()
+        results = await self.collection.aggregate([
+            {"$geoNear": {
+                "near": origin.geojson(),
+                "key": "location",
+                "distanceField": "distance_m",
+                "maxDistance": max_km * 1000,
+                "spherical": True,
+                "query": {"components": component},
+            }},
+            {"$limit": limit},
+            {"$project": {"_id": 0, "location": 0}},
+        ]).to_list(limit)
+        self.queries += 1
+        self._query_seconds.append(time.perf_counter() - started)
+
+        for supplier in results:
+            distance_km = supplier.pop("distance_m") / 1000
+            supplier["distance_km"] = round(distance_km, 1)
+            supplier["estimated_distance"] = f"{distance_km:.1f}km"
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        latency = sorted(self._query_seconds)
+        return {
+            "queries": self.queries,
+            "avg_ms": round(sum(latency) / len(latency) * 1000, 1) if latency else None,
+            "p95_ms": round(latency[min(len(latency) - 1, int(len(latency) * 0.95))] * 1000, 1) if latency else None,
+            "geocoder": self.geocoder.stats(),
+        }
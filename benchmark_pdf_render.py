@@ -0,0 +1,94 @@
+"""Measure proposal PDF render throughput.
+
+Renders the same proposal repeatedly in one process and reports renders/sec, the
+per-render latency, the process peak RSS and the peak Python allocation of a single
+render into memory versus straight to a file. Point PDF_GENERATOR_DIR at another
+checkout's backend/ directory to compare against an older pdf_generator.py.
+
+    python benchmark_pdf_render.py [renders] [warmup]
+"""
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.environ.get("PDF_GENERATOR_DIR", str(Path(__file__).parent / "backend")))
+
+from pdf_generator import BathroomProposalPDF
+
+QUOTE = {
+    "id": "BQS-BENCH-001",
+    "client_info": {"name": "Benchmark Client", "email": "client@example.com", "phone": "0400000000", "address": "1 Test St, Sydney NSW 2000"},
+    "room_measurements": {"length": 3000, "width": 2500, "height": 2400},
+    "components": {"demolition": True, "framing": True, "plumbing_rough_in": True, "tiling": True, "waterproofing": True},
+    "detailed_components": {
+        "demolition": {"enabled": True, "subtasks": {"remove_tiles": True, "remove_vanity": True}},
+        "tiling": {"enabled": True, "subtasks": {"wall_tiling": True, "floor_tiling": True}},
+    },
+    "total_cost": 28450.0,
+    "cost_breakdown": [
+        {"component": "Demolition", "estimated_cost": 3200, "cost_range_min": 2800, "cost_range_max": 3600, "notes": "Strip out and disposal"},
+        {"component": "Framing", "estimated_cost": 2100, "cost_range_min": 1800, "cost_range_max": 2400, "notes": "Wall framing"},
+        {"component": "Plumbing Rough In", "estimated_cost": 4500, "cost_range_min": 4000, "cost_range_max": 5000, "notes": "Relocate waste"},
+        {"component": "Waterproofing", "estimated_cost": 1650, "cost_range_min": 1400, "cost_range_max": 1900, "notes": "Membrane"},
+        {"component": "Tiling", "estimated_cost": 17000, "cost_range_min": 15000, "cost_range_max": 19000, "notes": "Floor and walls"},
+    ],
+    "ai_analysis": "Standard full renovation of a mid-sized bathroom.",
+}
+
+PROFILE = {
+    "company_name": "Benchmark Renovations",
+    "license_number": "123456C",
+    "contact_name": "Sam Builder",
+    "phone": "0400111222",
+    "email": "sam@example.com",
+    "years_experience": "12",
+    "projects_completed": "350+",
+}
+
+
+def allocation_peak_kib(render) -> float:
+    tracemalloc.start()
+    try:
+        render()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def render_to_file():
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+        BathroomProposalPDF().create_proposal(QUOTE, PROFILE, output=f.name)
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    warmup = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    for _ in range(warmup):
+        BathroomProposalPDF().create_proposal(QUOTE, PROFILE)
+
+    timings = []
+    started = time.perf_counter()
+    for _ in range(renders):
+        render_started = time.perf_counter()
+        BathroomProposalPDF().create_proposal(QUOTE, PROFILE)
+        timings.append(time.perf_counter() - render_started)
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    print(f"{renders} renders in {elapsed:.2f}s: {renders / elapsed:.1f} renders/sec")
+    print(f"  p50 {statistics.median(timings) * 1000:.2f}ms  "
+          f"p99 {timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000:.2f}ms  "
+          f"mean {statistics.mean(timings) * 1000:.2f}ms")
+    print(f"  peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    print(f"  peak allocation per render: bytes {allocation_peak_kib(lambda: BathroomProposalPDF().create_proposal(QUOTE, PROFILE)):.0f} KiB, "
+          f"file {allocation_peak_kib(render_to_file):.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
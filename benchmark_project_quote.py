@@ -0,0 +1,92 @@
+"""Compare p50/p99 latency of the project quote read paths.
+
+Seeds a scratch database with saved projects, quotes and requests, then times the
+sequential three-query path against the single $lookup aggregation.
+
+    MONGO_URL=mongodb://localhost:27017 python benchmark_project_quote.py [projects] [iterations]
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db_indexes import INDEX_SPECS
+from project_reads import fetch_project_quote, fetch_project_quote_sequential
+
+
+async def seed(db, count):
+    for name, indexes in INDEX_SPECS.items():
+        await db[name].create_indexes(indexes)
+
+    projects, quotes, requests = [], [], []
+    for n in range(count):
+        request_id, quote_id = str(uuid.uuid4()), str(uuid.uuid4())
+        requests.append({
+            "id": request_id,
+            "client_info": {"name": f"Client {n}", "email": "c@example.com", "phone": "0400000000", "address": "1 Test St, Sydney NSW 2000"},
+            "room_measurements": {"length": 2.5, "width": 2.0, "height": 2.4},
+            "components": {"demolition": True, "tiling": True},
+        })
+        quotes.append({
+            "id": quote_id, "request_id": request_id, "total_cost": 15000.0,
+            "cost_breakdown": [{"component": "Tiling", "estimated_cost": 9000, "cost_range_min": 8000, "cost_range_max": 10000, "notes": "n"}],
+            "ai_analysis": "benchmark", "confidence_level": "High",
+        })
+        projects.append({"id": str(uuid.uuid4()), "project_name": f"Project {n}", "category": "General",
+                         "quote_id": quote_id, "client_name": f"Client {n}", "total_cost": 15000.0})
+
+    await db.quote_requests.insert_many(requests)
+    await db.quotes.insert_many(quotes)
+    await db.saved_projects.insert_many(projects)
+    return [project["id"] for project in projects]
+
+
+async def measure(fetch, db, project_ids, iterations):
+    samples = []
+    for _ in range(iterations):
+        project_id = random.choice(project_ids)
+        started = time.perf_counter()
+        await fetch(db, project_id)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "mean": statistics.fmean(samples),
+    }
+
+
+async def main():
+    project_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    db_name = os.environ.get("BENCH_DB_NAME", "bathroom_benchmark")
+    await client.drop_database(db_name)
+    db = client[db_name]
+
+    try:
+        project_ids = await seed(db, project_count)
+        # Warm up connections and caches before timing
+        await measure(fetch_project_quote_sequential, db, project_ids, 100)
+        await measure(fetch_project_quote, db, project_ids, 100)
+
+        print(f"{project_count} projects, {iterations} reads per path (ms)")
+        for label, fetch in (("sequential (3 queries)", fetch_project_quote_sequential), ("$lookup aggregation", fetch_project_quote)):
+            result = await measure(fetch, db, project_ids, iterations)
+            print(f"{label:<24} p50={result['p50']:.2f} p99={result['p99']:.2f} mean={result['mean']:.2f}")
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -19,6 +19,27 @@ import { toast, Toaster } from 'sonner';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+const isPlainObject = (value) => value !== null && typeof value === 'object' && !Array.isArray(value);
+
+// RFC 7396 merge patch that turns `source` into `target`; null when they are equal
+const createMergePatch = (source, target) => {
+  const patch = {};
+  const base = isPlainObject(source) ? source : {};
+  Object.keys(base).forEach(key => {
+    if (!(key in target)) patch[key] = null;
+  });
+  Object.entries(target).forEach(([key, value]) => {
+    if (value === undefined) return;
+    if (isPlainObject(base[key]) && isPlainObject(value)) {
+      const nested = createMergePatch(base[key], value);
+      if (nested !== null) patch[key] = nested;
+    } else if (JSON.stringify(base[key]) !== JSON.stringify(value)) {
+      patch[key] = value;
+    }
+  });
+  return Object.keys(patch).length ? patch : null;
+};
+
 const RenovationQuotingApp = () => {
   const [formData, setFormData] = useState({
     clientInfo: {
@@ -169,6 +190,8 @@ const RenovationQuotingApp = () => {
   const [selectedSuppliers, setSelectedSuppliers] = useState({});
   const [adjustmentMode, setAdjustmentMode] = useState(false);
   const [adjustedCosts, setAdjustedCosts] = useState({});
+  const [draft, setDraft] = useState(null); // { id, revision } of the server-side draft once saved
+  const syncedDraft = React.useRef(null); // Draft request as last sent to (or loaded from) the server
   const [expandedComponents, setExpandedComponents] = useState({});
   const [generatingPDF, setGeneratingPDF] = useState(false);
   const [userProfile, setUserProfile] = useState({
@@ -234,7 +257,7 @@ const RenovationQuotingApp = () => {
         shower_screen_grade: 'standard',
         tapware_grade: 'standard',
         lighting_grade: 'standard',
-        mirror_grade: 'standard',
+        mirror_grade: 'standard_cabinet',
         tiles_supply_grade: 'standard'
       },
       additionalNotes: '',
@@ -279,7 +302,7 @@ const RenovationQuotingApp = () => {
     shower_screen_grade: 'standard',
     tapware_grade: 'standard',
     lighting_grade: 'standard',
-    mirror_grade: 'standard',
+    mirror_grade: 'standard_cabinet',
     tiles_supply_grade: 'standard'
   });
 
@@ -483,7 +506,7 @@ const RenovationQuotingApp = () => {
         shower_screen_grade: 'standard',
         tapware_grade: 'standard',
         lighting_grade: 'standard',
-        mirror_grade: 'standard',
+        mirror_grade: 'standard_cabinet',
         tiles_supply_grade: 'standard'
       },
       additionalNotes: '',
@@ -632,16 +655,36 @@ const RenovationQuotingApp = () => {
     }
   };
 
+  const supplierKey = (component) => component.toLowerCase().replace(/ /g, '_');
+
+  // One round trip for every component on the quote; the dialogs then open from state
+  React.useEffect(() => {
+    if (!quote?.cost_breakdown?.length) return;
+    const components = [...new Set(quote.cost_breakdown.map(item => supplierKey(item.component)))];
+    axios.get(`${API}/suppliers`, { params: { components: components.join(',') } })
+      .then(response => setSelectedSuppliers(prev => ({ ...prev, ...response.data.suppliers })))
+      .catch(error => console.error('Error fetching suppliers:', error));
+  }, [quote?.id]);
+
   const fetchSuppliers = async (component) => {
+    // With a client address, replace the catalogue list with the suppliers nearest the job
+    const address = formData.clientInfo?.address;
+    if (!address && selectedSuppliers[component]) return;
     try {
-      const response = await axios.get(`${API}/suppliers/${component}`);
-      setSelectedSuppliers(prev => ({
-        ...prev,
-        [component]: response.data.suppliers
-      }));
+      const response = address
+        ? await axios.get(`${API}/suppliers/nearby`, { params: { component, address } })
+        : await axios.get(`${API}/suppliers/${component}`);
+      if (response.data.suppliers.length) {
+        setSelectedSuppliers(prev => ({
+          ...prev,
+          [component]: response.data.suppliers
+        }));
+      }
     } catch (error) {
       console.error('Error fetching suppliers:', error);
-      toast.error('Failed to fetch suppliers');
+      if (!selectedSuppliers[component]) {
+        toast.error('Failed to fetch suppliers');
+      }
     }
   };
 
@@ -662,14 +705,17 @@ const RenovationQuotingApp = () => {
         original_cost: quote.total_cost,
         adjusted_cost: totalAdjusted,
         adjustment_reason: 'Manual adjustment based on project specifics',
-        component_adjustments: adjustedCosts
+        component_adjustments: adjustedCosts,
+        expected_revision: quote.revision ?? 0
       };
 
-      await axios.post(`${API}/quotes/${quote.id}/adjust`, adjustmentData);
+      const response = await axios.post(`${API}/quotes/${quote.id}/adjust`, adjustmentData);
       
       setQuote(prev => ({
         ...prev,
-        total_cost: totalAdjusted
+        total_cost: response.data.new_total,
+        cost_breakdown: response.data.cost_breakdown,
+        revision: response.data.revision
       }));
       
       setAdjustmentMode(false);
@@ -677,7 +723,11 @@ const RenovationQuotingApp = () => {
       toast.success('Quote adjusted successfully! The system has learned from your changes.');
     } catch (error) {
       console.error('Error adjusting quote:', error);
-      toast.error('Failed to adjust quote');
+      if (error.response?.status === 409) {
+        toast.error('This quote was changed elsewhere. Reload it before adjusting again.');
+      } else {
+        toast.error('Failed to adjust quote');
+      }
     }
   };
 
@@ -722,8 +772,15 @@ const RenovationQuotingApp = () => {
   // Project Management Functions
   const fetchSavedProjects = async () => {
     try {
-      const response = await axios.get(`${API}/projects`);
-      setSavedProjects(response.data);
+      // The list is paginated; follow X-Next-Cursor until the last page
+      const projects = [];
+      let cursor = null;
+      do {
+        const response = await axios.get(`${API}/projects`, { params: cursor ? { cursor } : {} });
+        projects.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+      } while (cursor);
+      setSavedProjects(projects);
     } catch (error) {
       console.error('Error fetching projects:', error);
     }
@@ -783,6 +840,9 @@ const RenovationQuotingApp = () => {
       }
       
       setQuote(loadedQuote);
+      // Saving a loaded draft again should update it rather than start a new one
+      setDraft(loadedQuote?.confidence_level === 'Draft' ? { id: loadedQuote.id, revision: loadedQuote.draft_revision } : null);
+      syncedDraft.current = null; // The autosave takes the form as loaded as its starting point
       setSidebarOpen(false);
       toast.success(`Loaded project: ${project.project_name}`);
       
@@ -860,68 +920,61 @@ const RenovationQuotingApp = () => {
     }
   };
 
+  const buildDraftDocument = () => ({
+    project_name: `DRAFT: ${formData.clientInfo.name} - ${new Date().toLocaleDateString()}`,
+    notes: 'Draft project - incomplete form data saved',
+    request: {
+      client_info: formData.clientInfo,
+      room_measurements: {
+        length: parseFloat(formData.roomMeasurements.length) / 1000 || 0,
+        width: parseFloat(formData.roomMeasurements.width) / 1000 || 0,
+        height: parseFloat(formData.roomMeasurements.height) / 1000 || 0
+      },
+      components: {},
+      detailed_components: formData.components,
+      task_options: taskOptions,
+      additional_notes: formData.additionalNotes
+    }
+  });
+
   const saveDraftProject = async () => {
     if (!formData.clientInfo.name) {
       toast.error('Please enter client name first');
       return;
     }
 
-    const draftName = `DRAFT: ${formData.clientInfo.name} - ${new Date().toLocaleDateString()}`;
+    const draftDocument = buildDraftDocument();
     
     try {
-      // Create a mock quote for draft saving
-      const draftQuote = {
-        id: `draft_${Date.now()}`,
-        request_id: `draft_req_${Date.now()}`,
-        total_cost: 0,
-        cost_breakdown: [],
-        ai_analysis: 'Draft project - not yet estimated',
-        confidence_level: 'Draft',
-        created_at: new Date().toISOString()
-      };
-
-      // Save draft request data
-      const draftRequest = {
-        id: draftQuote.request_id,
-        client_info: formData.clientInfo,
-        room_measurements: {
-          length: parseFloat(formData.roomMeasurements.length) / 1000 || 0,
-          width: parseFloat(formData.roomMeasurements.width) / 1000 || 0,
-          height: parseFloat(formData.roomMeasurements.height) / 1000 || 0
-        },
-        components: {},
-        detailed_components: formData.components,
-        task_options: taskOptions,
-        additional_notes: formData.additionalNotes,
-        created_at: new Date().toISOString()
-      };
-
-      // Store both in database
-      await axios.post(`${API}/quotes/save-draft`, {
-        quote: draftQuote,
-        request: draftRequest
-      });
-
-      const projectData = {
-        project_name: draftName,
-        category: 'Draft',
-        quote_id: draftQuote.id,
-        client_name: formData.clientInfo.name,
-        total_cost: 0,
-        notes: 'Draft project - incomplete form data saved'
-      };
-
-      await axios.post(`${API}/projects/save`, projectData);
+      // Quote, request and project are written together; re-saving updates the same draft.
+      // A network failure is retried once with the same key so it cannot save twice.
+      const payload = { ...draftDocument, draft_id: draft?.id, expected_revision: draft?.revision };
+      const config = { headers: { 'Idempotency-Key': crypto.randomUUID() } };
+      let response;
+      try {
+        response = await axios.post(`${API}/quotes/drafts`, payload, config);
+      } catch (error) {
+        if (error.response) throw error;
+        response = await axios.post(`${API}/quotes/drafts`, payload, config);
+      }
+      setDraft({ id: response.data.draft_id, revision: response.data.revision });
+      syncedDraft.current = draftDocument.request;
       
       // Clear auto-save after successful draft save
       clearLocalStorage();
       
-      toast.success(`Draft saved: ${draftName}`);
+      toast.success(`Draft saved: ${draftDocument.project_name}`);
       fetchSavedProjects();
       
     } catch (error) {
       console.error('Error saving draft:', error);
-      toast.error('Failed to save draft project');
+      if (error.response?.status === 409) {
+        // Rebase on the stored revision so the next save replaces it with this version
+        setDraft({ id: draft.id, revision: error.response.data.detail.current_revision });
+        toast.error('This draft was changed elsewhere. Save again to overwrite it with your changes.');
+      } else {
+        toast.error('Failed to save draft project');
+      }
     }
   };
 
@@ -938,6 +991,46 @@ const RenovationQuotingApp = () => {
     return () => clearTimeout(timeoutId);
   }, [formData, taskOptions, userProfile]);
 
+  // Once a draft exists on the server, send only the request fields the user changed; the
+  // server batches the writes. The project name and notes are left to explicit saves.
+  React.useEffect(() => {
+    if (!draft?.id) return;
+    const { request } = buildDraftDocument();
+    if (syncedDraft.current === null) {
+      syncedDraft.current = request;
+      return;
+    }
+    const timeoutId = setTimeout(async () => {
+      const changes = createMergePatch(syncedDraft.current, request);
+      if (!changes) return;
+      try {
+        const response = await axios.patch(`${API}/quotes/drafts/${draft.id}`, { request: changes }, {
+          headers: { 'Content-Type': 'application/merge-patch+json', 'If-Match': `"${draft.revision}"` }
+        });
+        syncedDraft.current = request;
+        setDraft({ id: draft.id, revision: response.data.revision });
+      } catch (error) {
+        if (error.response?.status !== 412) {
+          console.error('Error autosaving draft:', error);
+          return;
+        }
+        if (error.response.data.detail?.lost_revision) {
+          toast.error('Recent draft changes were overwritten elsewhere; sending your version again.');
+        }
+        try {
+          // Rebase on the server's copy; the next run sends the form's differences from it
+          const current = await axios.get(`${API}/quotes/drafts/${draft.id}`);
+          syncedDraft.current = current.data.draft.request;
+          setDraft({ id: draft.id, revision: current.data.revision });
+        } catch (reloadError) {
+          console.error('Error reloading draft:', reloadError);
+        }
+      }
+    }, 2000);
+
+    return () => clearTimeout(timeoutId);
+  }, [formData, taskOptions, draft]);
+
   // Google Maps Address Functions
   const searchAddresses = async (query) => {
     if (!query || query.length < 3) {
@@ -1057,7 +1150,7 @@ const RenovationQuotingApp = () => {
                   <h3 className="font-semibold text-lg">{supplier.name}</h3>
                   <p className="text-gray-600 flex items-center mt-1">
                     <MapPin className="w-4 h-4 mr-1" />
-                    {supplier.address} ({supplier.estimated_distance})
+                    {supplier.address}{supplier.estimated_distance && ` (${supplier.estimated_distance})`}
                   </p>
                   <p className="text-gray-600 flex items-center mt-1">
                     <Phone className="w-4 h-4 mr-1" />
@@ -2500,6 +2593,7 @@ const RenovationQuotingApp = () => {
                   <Button
                     onClick={() => {
                       setQuote(null);
+                      setDraft(null);
                       setFormData({
                         clientInfo: { name: '', email: '', phone: '', address: '' },
                         roomMeasurements: { length: '', width: '', height: '' },
@@ -2536,7 +2630,7 @@ const RenovationQuotingApp = () => {
                         shower_screen_grade: 'standard',
                         tapware_grade: 'standard',
                         lighting_grade: 'standard',
-                        mirror_grade: 'standard',
+                        mirror_grade: 'standard_cabinet',
                         tiles_supply_grade: 'standard'
                       });
                     }}
@@ -2580,7 +2674,7 @@ const RenovationQuotingApp = () => {
                             </span>
                           )}
                           <SupplierDialog 
-                            component={item.component.toLowerCase().replace(' ', '_')} 
+                            component={supplierKey(item.component)} 
                             componentLabel={item.component}
                           />
                         </div>
@@ -0,0 +1,48 @@
+"""Bulk-load suppliers into the geo-indexed `suppliers` collection.
+
+The CSV needs the columns name, address, phone, specialties and components (the last two
+separated by ";"). Each supplier is placed at its address's postcode centroid, and rows are
+upserted by a stable id, so running the import again updates suppliers instead of
+duplicating them.
+
+    MONGO_URL=... DB_NAME=... python import_suppliers.py suppliers.csv
+"""
+import asyncio
+import csv
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from geocoding import create_geocoder  # noqa: E402
+from supplier_store import SupplierStore  # noqa: E402
+
+
+def read_rows(path):
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield {
+                "name": row["name"].strip(),
+                "address": row["address"].strip(),
+                "phone": row.get("phone", "").strip(),
+                "specialties": [s.strip() for s in row.get("specialties", "").split(";") if s.strip()],
+                "components": [c.strip() for c in row["components"].split(";") if c.strip()],
+            }
+
+
+async def main(path):
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    store = SupplierStore(client[os.environ["DB_NAME"]].suppliers, create_geocoder())
+    started = time.perf_counter()
+    result = await store.upsert(read_rows(path))
+    print(f"{result['written']} suppliers written, {result['skipped']} without a known location, "
+          f"{time.perf_counter() - started:.1f}s")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1]))
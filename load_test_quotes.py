@@ -0,0 +1,81 @@
+"""Quote latency under increasing concurrency.
+
+Sends quote requests to a running backend at each concurrency level and reports
+p50/p95/p99 latency and throughput. Every request has distinct notes and bypasses the
+quote cache, so each one reaches the LLM. With per-quote sessions latency should stay
+flat until LLM_MAX_CONCURRENCY is reached.
+
+    BASE_URL=http://localhost:8001 python load_test_quotes.py [levels] [requests_per_level]
+
+e.g. `python load_test_quotes.py 1,5,10,25,50 100`
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8001")
+
+REQUEST = {
+    "client_info": {"name": "Load Test", "email": "load@example.com", "phone": "0400000000", "address": "1 Test St, Sydney NSW 2000"},
+    "room_measurements": {"length": 2.5, "width": 2.0, "height": 2.4},
+    "components": {"demolition": True, "tiling": True, "waterproofing": True},
+    "task_options": {"skip_bin_size": "6 meter bin", "floor_tile_grade": "porcelain"},
+}
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_level(client, concurrency, total):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            payload = dict(REQUEST, additional_notes=f"load test {uuid.uuid4()}")
+            started = time.perf_counter()
+            response = await client.post(f"{BASE_URL}/api/quotes/request", json=payload, params={"bypass_cache": "true"})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "throughput": total / elapsed,
+        "failures": failures,
+    }
+
+
+async def main():
+    levels = [int(level) for level in (sys.argv[1] if len(sys.argv) > 1 else "1,2,5,10,20,50").split(",")]
+    per_level = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(timeout=300, limits=limits) as client:
+        baseline = None
+        print(f"{'concurrency':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7} {'vs 1':>6} {'failed':>6}")
+        for concurrency in levels:
+            result = await run_level(client, concurrency, max(per_level, concurrency))
+            baseline = baseline or result["p50"]
+            print(f"{concurrency:>11} {result['p50'] * 1000:>8.0f} {result['p95'] * 1000:>8.0f} {result['p99'] * 1000:>8.0f} "
+                  f"{result['throughput']:>7.1f} {result['p50'] / baseline:>5.2f}x {result['failures']:>6}")
+
+        metrics = (await client.get(f"{BASE_URL}/api/metrics")).json()
+        print("llm:", metrics.get("llm"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
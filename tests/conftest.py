@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other as top-level modules, the way uvicorn runs them
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def db():
+    """An empty in-memory MongoDB database"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["test"]
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from draft_autosave import DraftAutosave, DraftChangesLost
+from draft_store import DraftStore, split_draft
+from json_patch import JSON_PATCH_TYPE, MERGE_PATCH_TYPE, PatchError
+from quote_revisions import RevisionConflict
+
+REQUEST = {"client_info": {"name": "Ann"}, "room_measurements": {"length": 2, "width": 2, "height": 2.4}, "components": {}}
+
+
+class CountingStore(DraftStore):
+    def __init__(self, db):
+        super().__init__(None, db, transactions="off")
+        self.calls = []
+
+    async def save(self, *args, **kwargs):
+        self.calls.append(kwargs)
+        return await super().save(*args, **kwargs)
+
+
+async def setup(db, quiet=0.05, max_delay=0.5):
+    await db.quotes.create_index("id", unique=True)
+    store = CountingStore(db)
+    await store.save("draft_1", *split_draft({"project_name": "DRAFT: Ann", "request": REQUEST}))
+    store.calls.clear()
+    return store, DraftAutosave(store, db, quiet_seconds=quiet, max_delay_seconds=max_delay)
+
+
+def rename(name):
+    return {"request": {"client_info": {"name": name}}}
+
+
+def test_burst_of_patches_is_one_write(db):
+    async def scenario():
+        store, autosave = await setup(db)
+        revision = 1
+        for name in ("A", "An", "Ann", "Anne"):
+            revision = await autosave.patch("draft_1", rename(name), MERGE_PATCH_TYPE, revision)
+        revision = await autosave.patch("draft_1", [{"op": "add", "path": "/notes", "value": "hi"}], JSON_PATCH_TYPE, revision)
+        held = await autosave.get("draft_1")
+        writes_before = len(store.calls)
+        await asyncio.sleep(0.2)
+        return store.calls, writes_before, held, await autosave.get("draft_1"), autosave.stats()
+
+    calls, writes_before, held, stored, stats = asyncio.run(scenario())
+    assert writes_before == 0
+    assert held == ({"project_name": "DRAFT: Ann", "notes": "hi", "request": {**REQUEST, "client_info": {"name": "Anne"}}}, 6)
+    assert calls == [{"expected_revision": 1, "new_revision": 6}]
+    assert stored == held
+    assert stats["drafts_pending"] == 0
+
+
+def test_reads_and_rejected_patches_hold_nothing(db):
+    async def scenario():
+        _, autosave = await setup(db)
+        await autosave.get("draft_1")
+        for patch, content_type, revision in (
+            (rename("B"), MERGE_PATCH_TYPE, 7),
+            ([{"op": "remove", "path": "/nope"}], JSON_PATCH_TYPE, None),
+            ({"extra": 1}, MERGE_PATCH_TYPE, None),
+        ):
+            with pytest.raises((RevisionConflict, PatchError)):
+                await autosave.patch("draft_1", patch, content_type, revision)
+        with pytest.raises(KeyError):
+            await autosave.patch("missing", {}, MERGE_PATCH_TYPE)
+        return autosave._drafts, autosave._locks
+
+    drafts, locks = asyncio.run(scenario())
+    assert drafts == {} and locks == {}
+
+
+def test_lost_patches_are_reported_once(db):
+    async def scenario():
+        store, autosave = await setup(db, quiet=10)
+        await autosave.patch("draft_1", rename("B"), MERGE_PATCH_TYPE, 1)
+        # Saved elsewhere while the patch is held
+        await DraftStore(None, db, transactions="off").save("draft_1", *split_draft({"project_name": "Other", "request": REQUEST}))
+        await autosave.flush("draft_1")
+        with pytest.raises(DraftChangesLost) as lost:
+            await autosave.patch("draft_1", rename("C"), MERGE_PATCH_TYPE, 2)
+        revision = await autosave.patch("draft_1", rename("C"), MERGE_PATCH_TYPE, 2)
+        await autosave.stop()
+        return lost.value, revision, await autosave.get("draft_1")
+
+    lost, revision, stored = asyncio.run(scenario())
+    assert (lost.expected, lost.current) == (2, 2)
+    assert revision == 3
+    assert stored[0]["request"]["client_info"] == {"name": "C"}
+    assert stored[1] == 3
+
+
+def test_legacy_draft_is_found_by_quote_id(db):
+    async def scenario():
+        store, autosave = await setup(db)
+        # Cost-adjusted once: its revision belongs to quote_revisions, the draft itself is at 0
+        await db.quotes.insert_one({"id": "draft_170", "request_id": "draft_req_170", "confidence_level": "Draft", "revision": 1})
+        await db.quote_requests.insert_one({"id": "draft_req_170", **REQUEST})
+        await db.saved_projects.insert_one({"id": "project-uuid", "quote_id": "draft_170", "project_name": "Old"})
+        revision = await autosave.patch("draft_170", rename("B"), MERGE_PATCH_TYPE, 0)
+        await autosave.stop()
+        return (revision, await db.quote_requests.find_one({"id": "draft_req_170"}),
+                await db.saved_projects.count_documents({}), await db.quotes.find_one({"id": "draft_170"}))
+
+    revision, request, projects, quote = asyncio.run(scenario())
+    assert revision == 1
+    assert (quote["revision"], quote["draft_revision"]) == (1, 1)
+    assert request["client_info"] == {"name": "B"}
+    assert projects == 2  # draft_1 and the legacy project; no new one
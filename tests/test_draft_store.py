@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from draft_store import DraftStore, split_draft
+from quote_revisions import RevisionConflict
+
+REQUEST = {"client_info": {"name": "Ann"}, "room_measurements": {"length": 2, "width": 2, "height": 2.4}, "components": {}}
+
+
+async def make_store(db):
+    await db.quotes.create_index("id", unique=True)
+    return DraftStore(None, db, transactions="off")
+
+
+async def counts(db):
+    return [await db[name].count_documents({}) for name in ("quotes", "quote_requests", "saved_projects")]
+
+
+def test_split_draft_drops_server_fields():
+    request, project = split_draft({
+        "project_name": "DRAFT: Ann", "notes": None,
+        "request": {**REQUEST, "id": "x", "created_at": "then", "_id": 1},
+    })
+    assert request == REQUEST
+    assert project == {"project_name": "DRAFT: Ann", "client_name": "Ann", "notes": None}
+
+
+def test_repeated_saves_update_one_draft(db):
+    async def scenario():
+        store = await make_store(db)
+        request, project = split_draft({"project_name": "DRAFT: Ann", "request": REQUEST})
+        first = await store.save("draft_1", request, project)
+        second = await store.save("draft_1", {**request, "additional_notes": "more"}, project, expected_revision=1)
+        return first, second, await counts(db), await db.quote_requests.find_one({"id": "draft_1"})
+
+    first, second, stored, request = asyncio.run(scenario())
+    assert (first["revision"], second["revision"]) == (1, 2)
+    assert stored == [1, 1, 1]
+    assert request["additional_notes"] == "more"
+
+
+def test_stale_save_conflicts(db):
+    async def scenario():
+        store = await make_store(db)
+        request, project = split_draft({"project_name": "DRAFT: Ann", "request": REQUEST})
+        await store.save("draft_1", request, project)
+        await store.save("draft_1", request, project)
+        await store.save("draft_1", request, project, expected_revision=1)
+
+    with pytest.raises(RevisionConflict) as error:
+        asyncio.run(scenario())
+    assert (error.value.expected, error.value.current) == (1, 2)
+
+
+def test_legacy_draft_keeps_its_request_and_project(db):
+    # Saved by /save-draft and /projects/save: no revision, and ids that differ from the quote's
+    async def scenario():
+        store = await make_store(db)
+        await db.quotes.insert_one({"id": "draft_170", "request_id": "draft_req_170", "total_cost": 0,
+                                    "cost_breakdown": [], "confidence_level": "Draft"})
+        await db.quote_requests.insert_one({"id": "draft_req_170", **REQUEST})
+        await db.saved_projects.insert_one({"id": "project-uuid", "quote_id": "draft_170", "project_name": "Old",
+                                            "category": "Draft", "total_cost": 0})
+        request, project = split_draft({"project_name": "DRAFT: Ann", "request": {**REQUEST, "additional_notes": "new"}})
+        result = await store.save("draft_170", request, project, expected_revision=0)
+        return (result, await counts(db), await db.quote_requests.find_one({"id": "draft_req_170"}),
+                await db.saved_projects.find_one({"quote_id": "draft_170"}))
+
+    result, stored, request, project = asyncio.run(scenario())
+    assert result["revision"] == 1
+    assert stored == [1, 1, 1]
+    assert request["additional_notes"] == "new"
+    assert (project["id"], project["project_name"]) == ("project-uuid", "DRAFT: Ann")
+
+
+def test_draft_saves_leave_the_adjustment_revision_alone(db):
+    # `revision` numbers the quote_revisions log; draft saves count in draft_revision
+    async def scenario():
+        store = await make_store(db)
+        await db.quotes.insert_one({"id": "draft_1", "request_id": "draft_1", "revision": 3, "confidence_level": "Draft"})
+        request, project = split_draft({"project_name": "DRAFT: Ann", "request": REQUEST})
+        result = await store.save("draft_1", request, project, expected_revision=0)
+        return result, await db.quotes.find_one({"id": "draft_1"})
+
+    result, quote = asyncio.run(scenario())
+    assert result["revision"] == 1
+    assert (quote["revision"], quote["draft_revision"]) == (3, 1)
@@ -0,0 +1,99 @@
+import pytest
+
+from json_patch import PatchError, PatchTestFailed, apply_json_patch, apply_merge_patch
+
+
+# RFC 7396 appendix A
+@pytest.mark.parametrize("target, patch, expected", [
+    ({"a": "b"}, {"a": "c"}, {"a": "c"}),
+    ({"a": "b"}, {"b": "c"}, {"a": "b", "b": "c"}),
+    ({"a": "b"}, {"a": None}, {}),
+    ({"a": "b", "b": "c"}, {"a": None}, {"b": "c"}),
+    ({"a": ["b"]}, {"a": "c"}, {"a": "c"}),
+    ({"a": "c"}, {"a": ["b"]}, {"a": ["b"]}),
+    ({"a": {"b": "c"}}, {"a": {"b": "d", "c": None}}, {"a": {"b": "d"}}),
+    ({"a": [{"b": "c"}]}, {"a": [1]}, {"a": [1]}),
+    (["a", "b"], ["c", "d"], ["c", "d"]),
+    ({"a": "b"}, ["c"], ["c"]),
+    ({"a": "foo"}, None, None),
+    ({"a": "foo"}, "bar", "bar"),
+    ({"e": None}, {"a": 1}, {"e": None, "a": 1}),
+    ([1, 2], {"a": "b", "c": None}, {"a": "b"}),
+    ({}, {"a": {"bb": {"ccc": None}}}, {"a": {"bb": {}}}),
+])
+def test_merge_patch(target, patch, expected):
+    assert apply_merge_patch(target, patch) == expected
+
+
+def test_merge_patch_leaves_target_untouched():
+    target = {"a": {"b": 1}}
+    apply_merge_patch(target, {"a": {"b": 2}})
+    assert target == {"a": {"b": 1}}
+
+
+# RFC 6902 appendix A
+@pytest.mark.parametrize("document, ops, expected", [
+    ({"foo": "bar"}, [{"op": "add", "path": "/baz", "value": "qux"}], {"foo": "bar", "baz": "qux"}),
+    ({"foo": ["bar", "baz"]}, [{"op": "add", "path": "/foo/1", "value": "qux"}], {"foo": ["bar", "qux", "baz"]}),
+    ({"foo": ["bar"]}, [{"op": "add", "path": "/foo/-", "value": ["abc"]}], {"foo": ["bar", ["abc"]]}),
+    ({"baz": "qux", "foo": "bar"}, [{"op": "remove", "path": "/baz"}], {"foo": "bar"}),
+    ({"foo": ["bar", "qux", "baz"]}, [{"op": "remove", "path": "/foo/1"}], {"foo": ["bar", "baz"]}),
+    ({"baz": "qux"}, [{"op": "replace", "path": "/baz", "value": "boo"}], {"baz": "boo"}),
+    ({"foo": {"bar": "baz", "waldo": "fred"}, "qux": {"corge": "grault"}},
+     [{"op": "move", "from": "/foo/waldo", "path": "/qux/thud"}],
+     {"foo": {"bar": "baz"}, "qux": {"corge": "grault", "thud": "fred"}}),
+    ({"foo": ["all", "grass", "cows", "eat"]}, [{"op": "move", "from": "/foo/1", "path": "/foo/3"}],
+     {"foo": ["all", "cows", "eat", "grass"]}),
+    ({"foo": {"bar": 1}}, [{"op": "copy", "from": "/foo", "path": "/baz"}], {"foo": {"bar": 1}, "baz": {"bar": 1}}),
+    ({"/": 1, "m~n": 2}, [{"op": "replace", "path": "/~1", "value": 3}, {"op": "remove", "path": "/m~0n"}], {"/": 3}),
+    ({"baz": "qux", "foo": ["a", 2, "c"]},
+     [{"op": "test", "path": "/baz", "value": "qux"}, {"op": "test", "path": "/foo/1", "value": 2}],
+     {"baz": "qux", "foo": ["a", 2, "c"]}),
+    ({"foo": 1}, [{"op": "test", "path": "/foo", "value": 1.0}], {"foo": 1}),
+])
+def test_json_patch(document, ops, expected):
+    assert apply_json_patch(document, ops) == expected
+
+
+@pytest.mark.parametrize("document, value", [
+    ({"baz": "qux"}, "bar"),
+    ({"baz": 1}, True),
+    ({"baz": 0}, False),
+    ({"baz": None}, 0),
+    ({"baz": [1]}, [True]),
+    ({"baz": {"a": 1}}, {"a": 1, "b": 2}),
+])
+def test_failed_test_operation(document, value):
+    with pytest.raises(PatchTestFailed):
+        apply_json_patch(document, [{"op": "test", "path": "/baz", "value": value}])
+
+
+@pytest.mark.parametrize("ops", [
+    {"op": "add", "path": "/a", "value": 1},
+    [{"op": "add", "path": "/a"}],
+    [{"op": "add", "path": 5, "value": 1}],
+    [{"op": "move", "path": "/b"}],
+    [{"op": "copy", "from": ["a"], "path": "/b"}],
+    [{"op": "remove", "path": "/missing"}],
+    [{"op": "replace", "path": "/missing", "value": 1}],
+    [{"op": "add", "path": "/a/b", "value": 1}],
+    [{"op": "add", "path": "a", "value": 1}],
+    [{"op": "add", "path": "", "value": 1}],
+    [{"op": "add", "path": "/list/01", "value": 1}],
+    [{"op": "add", "path": "/list/2", "value": 1}],
+    [{"op": "add", "path": "/list/²", "value": 1}],
+    [{"op": "remove", "path": "/list/-"}],
+    [{"op": "move", "from": "/obj", "path": "/obj/child"}],
+    [{"op": "frobnicate", "path": "/a"}],
+    ["not an operation"],
+])
+def test_invalid_patch(ops):
+    with pytest.raises(PatchError):
+        apply_json_patch({"a": 1, "list": [0], "obj": {}}, ops)
+
+
+def test_failed_patch_leaves_document_untouched():
+    document = {"a": 1}
+    with pytest.raises(PatchError):
+        apply_json_patch(document, [{"op": "replace", "path": "/a", "value": 2}, {"op": "remove", "path": "/b"}])
+    assert document == {"a": 1}
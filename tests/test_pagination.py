@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_query, keyset_sort, parse_fields
+
+
+@pytest.mark.parametrize("value", [
+    datetime(2025, 3, 1, 9, 30, 15, 123000, tzinfo=timezone.utc),
+    "General",
+    42,
+    None,
+])
+def test_cursor_round_trip(value):
+    assert decode_cursor(encode_cursor({"created_at": value, "id": "q/1+="}, "created_at")) == (value, "q/1+=")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bm90IGpzb24", "WzFd"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_keyset_query_without_cursor_is_unchanged():
+    assert keyset_query({"category": "Draft"}, "updated_at", None) == {"category": "Draft"}
+
+
+def test_pages_cover_every_document_once(db):
+    # Ties on the sort field are broken by id, so no page boundary drops or repeats one
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    docs = [{"id": f"p{n:02d}", "updated_at": start + timedelta(minutes=n // 3), "category": "Draft" if n % 2 else "General"}
+            for n in range(20)]
+
+    async def paginate(query):
+        await db.saved_projects.insert_many([dict(doc) for doc in docs])
+        seen, cursor = [], None
+        while True:
+            page = await db.saved_projects.find(keyset_query(query, "updated_at", cursor)).sort(
+                keyset_sort("updated_at")).limit(4).to_list(4)
+            seen += [doc["id"] for doc in page]
+            if len(page) < 4:
+                return seen
+            cursor = encode_cursor(page[-1], "updated_at")
+
+    seen = asyncio.run(paginate({"category": "Draft"}))
+    expected = sorted((doc for doc in docs if doc["category"] == "Draft"), key=lambda doc: (doc["updated_at"], doc["id"]), reverse=True)
+    assert seen == [doc["id"] for doc in expected]
+
+
+def test_parse_fields():
+    assert parse_fields(None, ["a", "b"], ["id"]) is None
+    assert parse_fields(" b, a ,", ["a", "b"], ["id"]) == {"id": 1, "b": 1, "a": 1, "_id": 0}
+    with pytest.raises(ValueError):
+        parse_fields("a,secret", ["a"], ["id"])
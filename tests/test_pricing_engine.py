@@ -0,0 +1,140 @@
+from types import SimpleNamespace
+
+import pytest
+
+from pricing_engine import estimate_quote, validate_task_options
+from quote_cache import extract_region, quote_cache_key
+
+
+class Flags(dict):
+    def dict(self):
+        return dict(self)
+
+
+# The default room is 2 x 2 x 2.4m: 4m² of floor and 19.2m² of wall
+def make_request(components=(), detailed=None, options=None, address="1 Test St", size=(2, 2, 2.4), **contact):
+    return SimpleNamespace(
+        client_info=SimpleNamespace(address=address, **contact),
+        room_measurements=SimpleNamespace(length=size[0], width=size[1], height=size[2]),
+        components=Flags({name: True for name in components}),
+        detailed_components=detailed,
+        task_options=options,
+        additional_notes=None,
+    )
+
+
+def line(estimate, component):
+    return next(item for item in estimate["breakdown"] if item["component"] == component)
+
+
+def test_base_cost_from_fixed_and_area_rates():
+    estimate = estimate_quote(make_request(["demolition"]))
+    demolition = line(estimate, "Demolition")
+    assert demolition["estimated_cost"] == 800 + 90 * 4 + 20 * 19.2
+    assert (demolition["cost_range_min"], demolition["cost_range_max"]) == (1312, 1853)
+    assert estimate["total_cost"] == 1544
+    assert estimate["rate_table_version"] == "2025.1"
+
+
+def test_regional_factor_and_learned_correction():
+    request = make_request(["demolition", "framing"], address="1 Test St, Sydney NSW 2000")
+    estimate = estimate_quote(request, corrections={("demolition", "NSW"): 1.1, ("framing", "*"): 0.9})
+    assert line(estimate, "Demolition")["estimated_cost"] == round(1544 * 1.08 * 1.1)
+    assert line(estimate, "Framing")["correction_factor"] == 0.9
+
+
+@pytest.mark.parametrize("quantity", [2, "2", 2.0])
+def test_per_unit_option(quantity):
+    estimate = estimate_quote(make_request(["framing"], options={"build_niches_quantity": quantity}))
+    assert line(estimate, "Framing")["estimated_cost"] == 600 + 35 * 19.2 + 2 * 380
+
+
+def test_option_needs_its_subtask_when_detail_is_sent():
+    detailed = {"framing": {"enabled": True, "subtasks": {"recessed_mirror_cabinet": True}}}
+    estimate = estimate_quote(make_request(detailed=detailed, options={"build_niches_quantity": 2}))
+    assert line(estimate, "Framing")["estimated_cost"] == 600 + 35 * 19.2 + 380
+
+
+def test_frontend_default_options_are_all_priced():
+    # Defaults the quote form starts with (frontend/src/App.js)
+    options = {
+        "skip_bin_size": "6 meter bin", "build_niches_quantity": 1, "swing_door_size": "720mm",
+        "cavity_sliding_size": "720mm", "minor_costs_amount": 0, "water_feeds_type": "single",
+        "power_points_quantity": 1, "plasterboard_grade": "standard", "cornice_type": "standard",
+        "floor_tile_grade": "standard_ceramic", "wall_tile_grade": "standard_ceramic", "tile_size": "300x300mm",
+        "feature_tile_grade": "premium", "vanity_grade": "standard", "toilet_grade": "standard",
+        "shower_screen_grade": "standard", "tapware_grade": "standard", "lighting_grade": "standard",
+        "mirror_grade": "standard_cabinet", "tiles_supply_grade": "standard",
+    }
+    components = ["demolition", "framing", "plumbing_rough_in", "electrical_rough_in", "plastering",
+                  "tiling", "pc_items_tile_supply", "shower_screens", "fit_off"]
+    validate_task_options(options)
+    estimate = estimate_quote(make_request(components, options=options))
+    assert not [item["notes"] for item in estimate["breakdown"] if "not in rate table" in item["notes"]]
+
+
+def test_multiplier_scales_labour_but_not_tile_supply():
+    detailed = {"tiling": {"enabled": True, "subtasks": {"supply_install_floor_tiles": True}}}
+    options = {"floor_tile_grade": "porcelain", "tile_size": "600x600mm"}
+    estimate = estimate_quote(make_request(detailed=detailed, options=options))
+    assert line(estimate, "Tiling")["estimated_cost"] == round((500 + 95 * 4) * 1.08 + 85 * 4)
+
+
+def test_unknown_rate_table_version():
+    with pytest.raises(ValueError):
+        estimate_quote(make_request(["demolition"]), version="1999.1")
+
+
+@pytest.mark.parametrize("options", [
+    {"build_niches_quantity": "two"},
+    {"build_niches_quantity": -1},
+    {"build_niches_quantity": True},
+    {"minor_costs_amount": float("inf")},
+    {"power_points_quantity": [3]},
+    {"floor_tile_grade": ["porcelain"]},
+    {"skip_bin_size": {"size": 6}},
+    {"tile_size": 600},
+    {"skip_bin_size": "40 meter bin"},
+    {"mirror_grade": "standard"},
+    {"tile_size": "601x601mm"},
+])
+def test_unpriceable_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        validate_task_options(options)
+    with pytest.raises(ValueError):
+        estimate_quote(make_request(["framing", "demolition", "tiling"], options=options))
+
+
+def test_falsy_and_unrelated_options_are_allowed():
+    validate_task_options({"build_niches_quantity": 0, "floor_tile_grade": "", "custom_field": [1]})
+    validate_task_options(None)
+
+
+@pytest.mark.parametrize("address, region", [
+    ("1 Test St, Sydney NSW 2000", "NSW 2000"),
+    ("1 Test St, Hobart tas", "TAS"),
+    ("1 Test St, Somewhere 6000", "6000"),
+    ("1 Test St, Springfield", "springfield"),
+])
+def test_extract_region(address, region):
+    assert extract_region(address) == region
+
+
+def test_cache_key_ignores_contact_details_and_component_order():
+    base = make_request(["tiling", "demolition"], options={"floor_tile_grade": "porcelain", "skip_bin_size": ""},
+                        address="1 Test St, Sydney NSW 2000", name="Ann", email="a@example.com")
+    same = make_request(["demolition", "tiling"], options={"floor_tile_grade": "porcelain"},
+                        address="99 Other Rd, Sydney NSW 2000", name="Bob", email="b@example.com")
+    assert quote_cache_key(base) == quote_cache_key(same)
+
+
+@pytest.mark.parametrize("change", [
+    {"size": (2, 2.5, 2.4)},
+    {"options": {"floor_tile_grade": "natural_stone"}},
+    {"address": "1 Test St, Melbourne VIC 3000"},
+    {"components": ["tiling"]},
+])
+def test_cache_key_changes_with_pricing_inputs(change):
+    inputs = {"components": ["tiling", "demolition"], "options": {"floor_tile_grade": "porcelain"},
+              "address": "1 Test St, Sydney NSW 2000"}
+    assert quote_cache_key(make_request(**inputs)) != quote_cache_key(make_request(**{**inputs, **change}))
@@ -0,0 +1,30 @@
+import asyncio
+import io
+import zipfile
+
+from proposal_batch import fetch_proposal_data, stream_zip
+
+
+def test_quotes_sharing_a_request_keep_their_own_ids(db):
+    async def run():
+        await db.quote_requests.insert_one({"id": "r1", "client_info": {"name": "Smith"}})
+        await db.quotes.insert_many([
+            {"id": "q1", "request_id": "r1", "total_cost": 1000},
+            {"id": "q2", "request_id": "r1", "total_cost": 2000},
+        ])
+        proposals, missing = await fetch_proposal_data(db, ["q2", "q1", "q3"])
+
+        async def render(quote_data):
+            return io.BytesIO(quote_data["quote_id"].encode())
+
+        archive = b"".join([chunk async for chunk in stream_zip(
+            proposals, render, lambda quote_data: f"Bathroom_Proposal_{quote_data['quote_id']}.pdf", 2)])
+        return proposals, missing, archive
+
+    proposals, missing, archive = asyncio.run(run())
+    assert [proposal["quote_id"] for proposal in proposals] == ["q2", "q1"]
+    assert [proposal["total_cost"] for proposal in proposals] == [2000, 1000]
+    assert missing == ["q3"]
+    with zipfile.ZipFile(io.BytesIO(archive)) as zipped:
+        assert zipped.namelist() == ["Bathroom_Proposal_q2.pdf", "Bathroom_Proposal_q1.pdf"]
+        assert zipped.read("Bathroom_Proposal_q1.pdf") == b"q1"
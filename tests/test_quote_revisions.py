@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from quote_revisions import RevisionConflict, append_revision, apply_adjustment, get_revision
+
+
+def line(component, cost):
+    return {"component": component, "estimated_cost": cost, "cost_range_min": cost * 0.8,
+            "cost_range_max": cost * 1.2, "notes": ""}
+
+
+def make_quote(quote_id="q1", revision=0):
+    quote = {"id": quote_id, "total_cost": 3000, "cost_breakdown": [line("Tiling", 1000), line("Plumbing", 2000)]}
+    if revision is not None:
+        quote["revision"] = revision
+    return quote
+
+
+async def store(db, quote):
+    await db.quote_revisions.create_index([("quote_id", 1), ("revision", 1)], unique=True)
+    await db.quotes.insert_one(dict(quote))
+
+
+def test_component_adjustment_sets_lines_and_sums_total():
+    lines, total = apply_adjustment(make_quote()["cost_breakdown"], {"1": 2500}, 9999)
+    assert total == 3500
+    assert lines[1]["estimated_cost"] == 2500
+    assert (lines[1]["cost_range_min"], lines[1]["cost_range_max"]) == (2000, 3000)
+    assert lines[0] == line("Tiling", 1000)
+
+
+def test_total_adjustment_is_spread_pro_rata():
+    lines, total = apply_adjustment(make_quote()["cost_breakdown"], None, 4500)
+    assert total == 4500
+    assert [item["estimated_cost"] for item in lines] == [1500, 3000]
+    assert lines[0]["cost_range_max"] == 1800
+
+
+def test_adjustment_of_zero_cost_line_collapses_its_range():
+    lines, _ = apply_adjustment([line("Tiling", 0)], {0: 300}, 0)
+    assert lines[0]["cost_range_min"] == lines[0]["cost_range_max"] == lines[0]["estimated_cost"] == 300
+
+
+def test_adjustment_of_missing_line_is_rejected():
+    with pytest.raises(ValueError):
+        apply_adjustment(make_quote()["cost_breakdown"], {"7": 100}, 0)
+
+
+@pytest.mark.parametrize("stored_revision", [0, None])
+def test_append_revision_logs_original_and_updates_view(db, stored_revision):
+    async def scenario():
+        quote = make_quote(revision=stored_revision)
+        await store(db, quote)
+        revision = await append_revision(db, quote, 0, {"total_cost": 3500}, "adjusted", reason="client")
+        view = await db.quotes.find_one({"id": "q1"})
+        log = await db.quote_revisions.find({"quote_id": "q1"}).sort("revision", 1).to_list(None)
+        return revision, view, log
+
+    revision, view, log = asyncio.run(scenario())
+    assert revision == 1
+    assert (view["revision"], view["total_cost"]) == (1, 3500)
+    assert [(event["revision"], event["event"], event["total_cost"]) for event in log] == [
+        (0, "created", 3000), (1, "adjusted", 3500)
+    ]
+    assert log[1]["reason"] == "client"
+
+
+def test_stale_expected_revision_conflicts(db):
+    async def scenario():
+        quote = make_quote(revision=2)
+        await store(db, quote)
+        await append_revision(db, quote, 1, {"total_cost": 1}, "adjusted")
+
+    with pytest.raises(RevisionConflict) as error:
+        asyncio.run(scenario())
+    assert (error.value.expected, error.value.current) == (1, 2)
+
+
+@pytest.mark.parametrize("stored_revision", [0, None])
+def test_lost_race_rolls_the_view_forward(db, stored_revision):
+    # Another writer logged revision 1 but died before updating the quote
+    async def scenario():
+        quote = make_quote(revision=stored_revision)
+        await store(db, quote)
+        await db.quote_revisions.insert_one({"quote_id": "q1", "revision": 1, "event": "adjusted", "total_cost": 4000,
+                                             "cost_breakdown": [], "created_at": None})
+        with pytest.raises(RevisionConflict) as error:
+            await append_revision(db, quote, 0, {"total_cost": 3500}, "adjusted")
+        return error.value, await db.quotes.find_one({"id": "q1"})
+
+    conflict, view = asyncio.run(scenario())
+    assert conflict.current == 1
+    assert (view["revision"], view["total_cost"]) == (1, 4000)
+
+
+def test_get_revision_falls_back_to_unlogged_quote(db):
+    async def scenario():
+        await store(db, make_quote(revision=None))
+        return await get_revision(db, "q1", 0), await get_revision(db, "q1", 1)
+
+    current, missing = asyncio.run(scenario())
+    assert (current["revision"], current["event"], current["total_cost"]) == (0, "created", 3000)
+    assert missing is None